@@ -0,0 +1,80 @@
+"""
+Disk bytes written and wall-clock time of validating a downloaded zip by
+extracting it (OSWValidation) vs reading the members straight out of the
+archive (ArchiveOSWValidation, VALIDATE_IN_ARCHIVE=True).
+
+Bytes written are the write_chars counter of this process, i.e. everything
+passed to write() while validating, which for the extracting validator is the
+unpacked dataset.
+
+Usage:
+    python benchmarks/bench_archive.py --features 10000 100000 --runs 3
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_osw_zip  # noqa: E402
+from python_osw_validation import OSWValidation  # noqa: E402
+from src.archive_validation import ArchiveOSWValidation  # noqa: E402
+
+VALIDATORS = {'extract': OSWValidation, 'in_archive': ArchiveOSWValidation}
+
+
+def written_chars():
+    return psutil.Process().io_counters().write_chars
+
+
+def measure(validator_class, zipfile_path, runs, max_errors):
+    timings, written = [], []
+    for _ in range(runs):
+        before = written_chars()
+        start = time.perf_counter()
+        result = validator_class(zipfile_path=zipfile_path).validate(max_errors)
+        timings.append(time.perf_counter() - start)
+        written.append(written_chars() - before)
+    return {
+        'is_valid': result.is_valid,
+        'seconds': round(min(timings), 3),
+        'mb_written': round(min(written) / (1024 * 1024), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extracting vs in-archive validation')
+    parser.add_argument('--features', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--max-errors', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for features in args.features:
+            zipfile_path = generate_osw_zip(os.path.join(directory, f'osw_{features}.zip'), features)
+            row = {'features': features, 'zip_mb': round(os.path.getsize(zipfile_path) / (1024 * 1024), 2)}
+            for name, validator_class in VALIDATORS.items():
+                row[name] = measure(validator_class, zipfile_path, args.runs, args.max_errors)
+            results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"features":>10} {"zip MB":>8} {"extract s":>10} {"written MB":>11} {"in_archive s":>13} {"written MB":>11}')
+    for row in results:
+        print(f'{row["features"]:>10} {row["zip_mb"]:>8} {row["extract"]["seconds"]:>10} '
+              f'{row["extract"]["mb_written"]:>11} {row["in_archive"]["seconds"]:>13} '
+              f'{row["in_archive"]["mb_written"]:>11}')
+
+
+if __name__ == '__main__':
+    main()
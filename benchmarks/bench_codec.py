@@ -0,0 +1,142 @@
+"""
+Message codec benchmark: decoding a received QueueMessage into an Upload and
+encoding the response QueueMessage, with the old dict-backed classes
+(QueueMessage.to_dict -> Upload.data_from -> to_json -> QueueMessage.data_from)
+versus the slotted Upload/UploadData decoded and encoded directly.
+
+Reported per path:
+  * messages_per_second - decode plus encode round trips per second
+  * peak_bytes_per_message - peak memory allocated while handling one message
+  * retained_bytes_per_upload - memory held by one decoded Upload
+
+Usage:
+    python benchmarks/bench_codec.py --messages 200000
+    python benchmarks/bench_codec.py --messages 200000 --json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ms_core.core.queue.models.queue_message import QueueMessage  # noqa: E402
+from src.models.queue_message_content import Upload  # noqa: E402
+
+PAYLOAD = {
+    'messageId': 'c8c76e89f30944d2b2abd2491bd95337',
+    'messageType': 'workflow_identifier',
+    'publishedDate': '2024-01-01T00:00:00Z',
+    'data': {
+        'file_upload_path': 'https://tdeisamplestorage.blob.core.windows.net/tdei-storage-test/Archivew.zip',
+        'user_id': 'c59d29b6-a063-4249-943f-d320d15ac9ab',
+        'tdei_project_group_id': '0b41ebc5-350c-42d3-90af-3af4ad3628fb'
+    }
+}
+PACKAGE = {'python-ms-core': '0.0.0', 'python-osw-validation': '0.0.0'}
+
+
+def legacy_to_json(data):
+    return {key[1:] if key.startswith('_') else key: value for key, value in data.items()}
+
+
+# The dict-backed classes the codec replaced
+class LegacyUploadData:
+    def __init__(self, data):
+        self._file_upload_path = data.get('file_upload_path', '')
+        self._tdei_project_group_id = data.get('tdei_project_group_id', '')
+        self._user_id = data.get('user_id', '')
+        self._success = data.get('success', False)
+        self._message = data.get('message', '')
+
+
+class LegacyUpload:
+    def __init__(self, data):
+        upload_data = data.get('data', None)
+        self._message = data.get('message', None)
+        self._message_type = data.get('messageType', None)
+        self._message_id = data.get('messageId', '')
+        self._published_date = data.get('publishedDate', None)
+        self.data = LegacyUploadData(upload_data) if upload_data else {}
+
+
+def legacy_decode(message):
+    return LegacyUpload(QueueMessage.to_dict(message))
+
+
+def legacy_round_trip(message):
+    upload = legacy_decode(message)
+    upload.data._success = True
+    upload.data._message = ''
+    response = legacy_to_json(upload.data.__dict__)
+    response['package'] = PACKAGE
+    return QueueMessage.data_from({'messageId': upload._message_id, 'messageType': upload._message_type,
+                                   'data': response})
+
+
+def codec_round_trip(message):
+    upload = Upload.data_from(message)
+    upload.data.success = True
+    upload.data.message = ''
+    response = upload.data.to_json()
+    response['package'] = PACKAGE
+    return QueueMessage(messageId=upload.message_id, messageType=upload.message_type or '', data=response)
+
+
+def measure(round_trip, decode, message, messages):
+    for _ in range(1000):
+        round_trip(message)
+    start = time.perf_counter()
+    for _ in range(messages):
+        round_trip(message)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    round_trip(message)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+
+    kept = 10000
+    baseline = tracemalloc.get_traced_memory()[0]
+    uploads = [decode(message) for _ in range(kept)]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del uploads
+    return {
+        'messages_per_second': round(messages / elapsed),
+        'peak_bytes_per_message': peak,
+        'retained_bytes_per_upload': round(retained / kept)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode and encode cost per message: dict-backed vs slotted codec')
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    # The topic hands the callback a QueueMessage for both paths
+    message = QueueMessage.data_from(json.dumps(PAYLOAD))
+    results = {
+        'messages': args.messages,
+        'legacy_dicts': measure(legacy_round_trip, legacy_decode, message, args.messages),
+        'slotted_codec': measure(codec_round_trip, Upload.data_from, message, args.messages)
+    }
+    results['speedup'] = round(results['slotted_codec']['messages_per_second'] /
+                               results['legacy_dicts']['messages_per_second'], 2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"path":>14} {"messages/s":>11} {"peak B/msg":>11} {"retained B/upload":>18}')
+    for name in ('legacy_dicts', 'slotted_codec'):
+        row = results[name]
+        print(f'{name:>14} {row["messages_per_second"]:>11} {row["peak_bytes_per_message"]:>11} '
+              f'{row["retained_bytes_per_upload"]:>18}')
+    print(f'Speedup: {results["speedup"]}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares peak memory of the buffered download path (whole blob via
+`get_stream()`) with the chunked path used by `Validation.download_single_file`.
+
+Usage:
+    python benchmarks/bench_download.py --sizes 16 64 256 --chunk-size 4194304
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.validation import Validation  # noqa: E402
+
+MB = 1024 * 1024
+BLOCK = os.urandom(MB)
+
+
+class FakeDownloader:
+    # Produces `size` bytes on demand, like azure's StorageStreamDownloader
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return (BLOCK * (size // MB + 1))[:size]
+
+
+class FakeBlobClient:
+    def __init__(self, size):
+        self.size = size
+
+    def download_blob(self):
+        return FakeDownloader(self.size)
+
+
+class FakeFile:
+    def __init__(self, size):
+        self.file_path = 'dataset.zip'
+        self.blob_client = FakeBlobClient(size)
+
+    def get_stream(self):
+        return self.blob_client.download_blob().read()
+
+
+def buffered_download(file, target):
+    with open(target, 'wb') as blob:
+        blob.write(file.get_stream())
+
+
+def streamed_download(file, target, chunk_size):
+    with open(target, 'wb') as blob:
+        for chunk in Validation.iter_file_chunks(file, chunk_size):
+            blob.write(chunk)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of buffered vs streamed blob downloads')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 64, 256], help='File sizes in MB')
+    parser.add_argument('--chunk-size', type=int, default=4 * MB, help='Chunk size in bytes')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target = os.path.join(tmp_dir, 'dataset.zip')
+        for size_mb in args.sizes:
+            size = size_mb * MB
+            buffered = measure(buffered_download, FakeFile(size), target)
+            streamed = measure(streamed_download, FakeFile(size), target, args.chunk_size)
+            results.append({
+                'file_size_mb': size_mb,
+                'buffered_peak_mb': round(buffered / MB, 2),
+                'streamed_peak_mb': round(streamed / MB, 2)
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"file size (MB)":>15} {"buffered peak (MB)":>20} {"streamed peak (MB)":>20}')
+    for row in results:
+        print(f'{row["file_size_mb"]:>15} {row["buffered_peak_mb"]:>20} {row["streamed_peak_mb"]:>20}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+GC pause time per message with the old gc.collect() calls (four full
+collections per message) versus the memory governor (startup objects frozen,
+collections only above the RSS watermarks).
+
+The heap is filled with a large object graph to stand in for the GeoDataFrames
+and schemas a validation pod keeps alive.
+
+Usage:
+    python benchmarks/bench_gc.py --objects 2000000 --messages 20
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.memory_governor import MemoryGovernor  # noqa: E402
+
+COLLECTIONS_PER_MESSAGE = 4  # download, validation, clean_up and send_status
+
+
+def build_heap(objects):
+    return [{'_id': index, 'tags': [index, str(index)]} for index in range(objects // 3)]
+
+
+def simulate_message():
+    # Short lived garbage produced while handling one message
+    return [{'feature': index, 'coordinates': [index, index]} for index in range(20000)]
+
+
+def run_legacy(messages):
+    pauses = []
+    for _ in range(messages):
+        simulate_message()
+        start = time.perf_counter()
+        for _ in range(COLLECTIONS_PER_MESSAGE):
+            gc.collect()
+        pauses.append(time.perf_counter() - start)
+    return pauses
+
+
+def run_governor(messages, governor):
+    pauses = []
+    for _ in range(messages):
+        with governor.track('bench') as stats:
+            simulate_message()
+            governor.checkpoint()
+            governor.checkpoint()
+        pauses.append(stats['gc_pause_ms'] / 1000)
+    return pauses
+
+
+def summarize(pauses):
+    pauses = sorted(pauses)
+    return {
+        'total_ms': round(sum(pauses) * 1000, 2),
+        'mean_ms': round(sum(pauses) * 1000 / len(pauses), 3),
+        'max_ms': round(pauses[-1] * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GC pause per message: gc.collect() calls vs memory governor')
+    parser.add_argument('--objects', type=int, default=2000000, help='Long lived objects on the heap')
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--soft-watermark-mb', type=int, default=512)
+    parser.add_argument('--hard-watermark-mb', type=int, default=1024)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    heap = build_heap(args.objects)
+    legacy = summarize(run_legacy(args.messages))
+
+    governor = MemoryGovernor(soft_watermark_mb=args.soft_watermark_mb, hard_watermark_mb=args.hard_watermark_mb)
+    governor.freeze()
+    governed = summarize(run_governor(args.messages, governor))
+    rss_mb = governor.stats()['rss_mb']
+    gc.unfreeze()
+    del heap
+
+    results = {
+        'rss_mb': rss_mb,
+        'legacy_gc_collect': legacy,
+        'memory_governor': governed,
+        'saved_ms_per_message': round(legacy['mean_ms'] - governed['mean_ms'], 3)
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'RSS during run: {results["rss_mb"]} MB')
+    print(f'{"path":>20} {"total (ms)":>12} {"mean/msg (ms)":>14} {"max/msg (ms)":>13}')
+    for name in ('legacy_gc_collect', 'memory_governor'):
+        row = results[name]
+        print(f'{name:>20} {row["total_ms"]:>12} {row["mean_ms"]:>14} {row["max_ms"]:>13}')
+    print(f'GC latency saved per message: {results["saved_ms_per_message"]} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Throughput of the sequential message path vs the prefetching pipeline.
+
+Every message simulates a blob download (I/O wait), a CPU bound validation and
+a publish round trip. The sequential path runs the three steps back to back on
+each of MAX_CONCURRENT_MESSAGES receiver threads. The pipeline receives
+validation concurrency + prefetch depth messages and gates every step with
+its ValidationPipeline stage, so downloads of the next messages overlap with
+validation of the current ones.
+
+Usage:
+    python benchmarks/bench_pipeline.py --messages 20 --download-ms 200 --validate-ms 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline import ValidationPipeline, pipeline_stage  # noqa: E402
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def process(pipeline, download_time, validate_time, publish_time):
+    with pipeline.admit() if pipeline else nullcontext():
+        with pipeline_stage(pipeline, 'download'):
+            time.sleep(download_time)
+        with pipeline_stage(pipeline, 'validation'):
+            busy(validate_time)
+    with pipeline_stage(pipeline, 'publish'):
+        time.sleep(publish_time)
+
+
+def run(messages, receivers, pipeline, download_time, validate_time, publish_time):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=receivers) as executor:
+        for _ in range(messages):
+            executor.submit(process, pipeline, download_time, validate_time, publish_time)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential vs pipelined message throughput')
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=1, help='MAX_CONCURRENT_MESSAGES / VALIDATION_CONCURRENCY')
+    parser.add_argument('--prefetch', type=int, default=2, help='PREFETCH_DEPTH')
+    parser.add_argument('--download-concurrency', type=int, default=2)
+    parser.add_argument('--download-ms', type=float, default=200)
+    parser.add_argument('--validate-ms', type=float, default=200)
+    parser.add_argument('--publish-ms', type=float, default=10)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    times = (args.download_ms / 1000, args.validate_ms / 1000, args.publish_ms / 1000)
+    pipeline = ValidationPipeline(download_concurrency=args.download_concurrency,
+                                  validation_concurrency=args.concurrency,
+                                  publish_concurrency=2, prefetch_depth=args.prefetch)
+    timings = {
+        'sequential': run(args.messages, args.concurrency, None, *times),
+        'pipelined': run(args.messages, pipeline.max_in_flight, pipeline, *times)
+    }
+    results = {name: round(args.messages / elapsed, 2) for name, elapsed in timings.items()}
+
+    if args.json:
+        print(json.dumps({'messages_per_sec': results}, indent=2))
+        return
+    print(f'{"path":>12} {"messages/s":>12}')
+    for name, rate in results.items():
+        print(f'{name:>12} {rate:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Publish throughput against a local stand-in topic that simulates the cost of
+creating a topic sender and the round trip of every send.
+
+Compares the old path (get_topic() for every result), the persistent
+publisher and the persistent publisher with micro-batching.
+
+Usage:
+    python benchmarks/bench_publish.py --messages 500 --batch-size 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_ms_core.core.queue.models.queue_message import QueueMessage  # noqa: E402
+from src.publisher import ResultPublisher  # noqa: E402
+
+
+class StandInBatch:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+
+class StandInSender:
+    def __init__(self, round_trip):
+        self.round_trip = round_trip
+        self.sent = 0
+
+    def create_message_batch(self):
+        return StandInBatch()
+
+    def send_messages(self, batch):
+        time.sleep(self.round_trip)
+        self.sent += len(batch.messages)
+
+
+class StandInTopic:
+    def __init__(self, setup_time, round_trip):
+        time.sleep(setup_time)
+        self.publisher = StandInSender(round_trip)
+
+    def publish(self, data):
+        json.dumps(QueueMessage.to_dict(data))
+        time.sleep(self.publisher.round_trip)
+        self.publisher.sent += 1
+
+
+def make_message(index):
+    return QueueMessage.data_from({
+        'messageId': str(index),
+        'messageType': 'workflow_identifier',
+        'data': {'file_upload_path': f'https://storage/osw/{index}.zip', 'success': True, 'message': ''}
+    })
+
+
+def per_message_topic(messages, setup_time, round_trip):
+    start = time.perf_counter()
+    for message in messages:
+        StandInTopic(setup_time, round_trip).publish(data=message)
+    return time.perf_counter() - start
+
+
+def persistent_publisher(messages, setup_time, round_trip, batch_size, batch_interval):
+    topic = StandInTopic(setup_time, round_trip)
+    publisher = ResultPublisher(topic=topic, batch_size=batch_size, batch_interval=batch_interval)
+    start = time.perf_counter()
+    for message in messages:
+        publisher.publish(data=message)
+    publisher.close()
+    elapsed = time.perf_counter() - start
+    assert topic.publisher.sent == len(messages)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Result publish throughput')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--setup-ms', type=float, default=20, help='Simulated cost of creating a topic sender')
+    parser.add_argument('--round-trip-ms', type=float, default=2, help='Simulated broker round trip per send')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--batch-interval', type=float, default=0.05)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    messages = [make_message(index) for index in range(args.messages)]
+    setup_time = args.setup_ms / 1000
+    round_trip = args.round_trip_ms / 1000
+    timings = {
+        'get_topic_per_message': per_message_topic(messages, setup_time, round_trip),
+        'persistent': persistent_publisher(messages, setup_time, round_trip, 1, args.batch_interval),
+        'persistent_batched': persistent_publisher(messages, setup_time, round_trip, args.batch_size,
+                                                   args.batch_interval)
+    }
+    results = {name: round(args.messages / elapsed, 1) for name, elapsed in timings.items()}
+
+    if args.json:
+        print(json.dumps({'messages_per_sec': results}, indent=2))
+        return
+    print(f'{"path":>22} {"messages/s":>12}')
+    for name, rate in results.items():
+        print(f'{name:>22} {rate:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Cold-start benchmark.
+
+Every run starts a fresh interpreter and reports, in seconds since the process
+was created:
+  * import    - `import src.main`, when uvicorn can start answering /ping
+  * ready     - start_validator() has loaded OSWValidator, /ready answers 200
+  * first     - the first message is validated and its result published
+along with first_message, the seconds the first message itself took. Runs are
+repeated with and without the warm-up validation (WARM_UP), which moves the
+cost of the first message into the time to ready.
+
+Storage and the topics are the local stand-ins of benchmarks/stand_ins.py.
+The import time of the heaviest modules (python -X importtime) is reported too.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+# Modules whose cumulative import time is broken down
+MODULES = ['fastapi', 'src.main', 'src.osw_validator', 'python_osw_validation', 'geopandas', 'python_ms_core']
+
+parser = argparse.ArgumentParser(description='Time to import, to ready and to the first validated message')
+parser.add_argument('--runs', type=int, default=3)
+parser.add_argument('--features', type=int, default=1000, help='Features of the synthetic dataset')
+parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+parser.add_argument('--child', help=argparse.SUPPRESS)
+
+
+# Runs inside the fresh interpreter, prints the timeline as JSON
+def child(zipfile_path):
+    import psutil
+    process_start = psutil.Process().create_time()
+    timeline = {}
+
+    import src.main
+    timeline['import'] = time.time() - process_start
+
+    from unittest.mock import patch
+    from benchmarks.stand_ins import StandInCore
+    from src.models.queue_message_content import Upload
+    core = StandInCore(tempfile.mkdtemp())
+    with patch('python_ms_core.Core', return_value=core) as mock_core:
+        mock_core.__version__ = StandInCore.__version__
+        src.main.start_validator()
+        timeline['ready'] = time.time() - process_start
+
+        validator = src.main.app.validator
+        published = threading.Event()
+        send_status = validator.send_status
+
+        def record_publish(result, upload_message):
+            send_status(result, upload_message)
+            published.set()
+        validator.send_status = record_publish
+        file_url = core.storage_client.add_file(validator._settings.event_bus.container_name, zipfile_path)
+        start = time.time()
+        validator.validate(Upload.data_from({
+            'messageId': 'startup-bench',
+            'messageType': 'workflow_identifier',
+            'data': {'file_upload_path': file_url, 'user_id': 'bench-user', 'tdei_project_group_id': 'bench-group'}
+        }))
+        published.wait(timeout=300)
+        timeline['first'] = time.time() - process_start
+        timeline['first_message'] = time.time() - start
+        validator.stop_listening()
+    print(json.dumps(timeline))
+
+
+# Cumulative import time in seconds of every module in MODULES
+def import_breakdown():
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main, src.osw_validator'],
+                            cwd=ROOT_DIR, capture_output=True, text=True).stderr
+    breakdown = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name in MODULES:
+            breakdown[name] = round(int(cumulative) / 1e6, 3)
+    return breakdown
+
+
+def main(args):
+    from benchmarks.synthetic import generate_osw_zip
+    stages = ('import', 'ready', 'first', 'first_message')
+    median_seconds = {}
+    with tempfile.TemporaryDirectory() as directory:
+        zipfile_path = generate_osw_zip(os.path.join(directory, 'osw.zip'), args.features)
+        for warm_up in ('False', 'True'):
+            timelines = []
+            for _ in range(args.runs):
+                # The result cache and deduplication are off, otherwise every run after the first
+                # would be a cache hit or skipped as a redelivery
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', zipfile_path],
+                                        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+                                        env=dict(os.environ, RESULT_CACHE_SIZE='0', DEDUP_TTL='0',
+                                                 WARM_UP=warm_up)).stdout
+                timelines.append(json.loads(output.strip().splitlines()[-1]))
+            median_seconds['warm' if warm_up == 'True' else 'cold'] = {
+                stage: round(statistics.median(run[stage] for run in timelines), 3) for stage in stages}
+
+    results = {
+        'runs': args.runs,
+        'median_seconds': median_seconds,
+        'import_seconds': import_breakdown()
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"stage":>14} {"cold s":>8} {"warm s":>8}')
+    for stage in stages:
+        print(f'{stage:>14} {median_seconds["cold"][stage]:>8} {median_seconds["warm"][stage]:>8}')
+    print(f'\n{"module":>22} {"import s":>9}')
+    for module, seconds in results['import_seconds'].items():
+        print(f'{module:>22} {seconds:>9}')
+
+
+if __name__ == '__main__':
+    arguments = parser.parse_args()
+    if arguments.child:
+        child(arguments.child)
+    else:
+        main(arguments)
@@ -0,0 +1,71 @@
+"""
+Throughput of concurrent OSW validations run on threads (in-process, sharing
+one GIL) versus the process pool used when VALIDATION_WORKERS is set.
+
+Usage:
+    python benchmarks/bench_validation_pool.py --workers 1 2 4 --tasks 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.validation_pool import ValidationPool, run_validation  # noqa: E402
+
+DEFAULT_ZIP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'tests', 'unit_tests', 'test_files', 'valid.zip')
+
+
+def run_threads(zip_path, workers, tasks, max_errors):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: run_validation(zip_path, max_errors), range(tasks)))
+        return time.perf_counter() - start
+
+
+def run_pool(zip_path, workers, tasks, max_errors):
+    pool = ValidationPool(max_workers=workers)
+    # Warm the workers up so process start-up is not part of the measurement
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: pool.validate(zip_path, max_errors), range(workers)))
+        start = time.perf_counter()
+        list(executor.map(lambda _: pool.validate(zip_path, max_errors), range(tasks)))
+        elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validation throughput: threads vs process pool')
+    parser.add_argument('--zip', default=DEFAULT_ZIP, help='OSW zip to validate')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--tasks', type=int, default=8, help='Validations per run')
+    parser.add_argument('--max-errors', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        threaded = run_threads(args.zip, workers, args.tasks, args.max_errors)
+        pooled = run_pool(args.zip, workers, args.tasks, args.max_errors)
+        results.append({
+            'workers': workers,
+            'threads_per_sec': round(args.tasks / threaded, 3),
+            'pool_per_sec': round(args.tasks / pooled, 3)
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'cpu count: {os.cpu_count()}')
+    print(f'{"workers":>8} {"threads (val/s)":>16} {"process pool (val/s)":>21}')
+    for row in results:
+        print(f'{row["workers"]:>8} {row["threads_per_sec"]:>16} {row["pool_per_sec"]:>21}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Offline end-to-end benchmark suite.
+
+For every dataset size a synthetic OSW zip is generated and pushed through
+  * download  - Validation.download_single_file from a local storage stand-in
+  * validate  - Validation.run_validator on the downloaded zip
+  * end_to_end - OSWValidator.validate for queued messages on an in-memory topic,
+                 or on the filesystem spool queue with --transport spool
+  * publish   - OSWValidator.send_status inside the end-to-end run
+
+Throughput, p50/p95/p99 latency and peak RSS are reported per stage as JSON,
+tagged with the git commit so runs can be compared across commits.
+
+Usage:
+    python benchmarks/run_suite.py --features 1000 10000 100000 --messages 5 --output results.json
+    python benchmarks/run_suite.py --features 1000 10000 100000 --messages 5 --baseline results.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from unittest.mock import patch
+
+import psutil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.synthetic import generate_osw_zip  # noqa: E402
+from benchmarks.stand_ins import StandInCore, AllowAllAuthorizer  # noqa: E402
+from src.local_transport import LocalCore  # noqa: E402
+from src.validation import Validation  # noqa: E402
+from src.osw_validator import OSWValidator  # noqa: E402
+from src.runtime_config import runtime_config  # noqa: E402
+
+CONTAINER = runtime_config.settings.event_bus.container_name
+# Spool directories used for requests and results with --transport spool
+SPOOL_TOPICS = {'upload_topic': 'osw-upload', 'validation_topic': 'osw-validation'}
+
+
+class PeakRSS:
+    # Samples the RSS of this process (and its workers) in the background
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, rss)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, peak_rss):
+    return {
+        'count': len(latencies),
+        'throughput_per_sec': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss / (1024 * 1024), 1)
+    }
+
+
+def make_validation(core, file_url):
+    return Validation(file_path=file_url, storage_client=core.get_storage_client())
+
+
+def bench_validation_stages(core, file_url, runs, max_errors):
+    downloads, validations = [], []
+    with PeakRSS() as download_rss:
+        download_start = time.perf_counter()
+        paths = []
+        for _ in range(runs):
+            validation = make_validation(core, file_url)
+            start = time.perf_counter()
+            paths.append((validation, validation.download_single_file(file_url)))
+            downloads.append(time.perf_counter() - start)
+        download_elapsed = time.perf_counter() - download_start
+
+    with PeakRSS() as validate_rss:
+        validate_start = time.perf_counter()
+        for validation, path in paths:
+            start = time.perf_counter()
+            validation.run_validator(path, max_errors)
+            validations.append(time.perf_counter() - start)
+            Validation.clean_up(validation.unique_dir_path)
+        validate_elapsed = time.perf_counter() - validate_start
+
+    return {
+        'download': summarize(downloads, download_elapsed, download_rss.peak),
+        'validate': summarize(validations, validate_elapsed, validate_rss.peak)
+    }
+
+
+def bench_end_to_end(storage_root, file_url, messages, concurrency, transport='memory'):
+    settings = runtime_config.settings
+    if transport == 'spool':
+        core = LocalCore(spool_dir=os.path.join(storage_root, 'spool'), storage_dir=storage_root)
+        core.get_authorizer = lambda config=None: AllowAllAuthorizer()
+        request_topic = core.get_topic(SPOOL_TOPICS['upload_topic'])
+    else:
+        core = StandInCore(storage_root, max_concurrent_messages=concurrency)
+        request_topic = core.get_topic(settings.event_bus.upload_topic or '')
+    for index in range(messages):
+        request_topic.publish(data={
+            'messageId': f'bench-{index}',
+            'messageType': 'workflow_identifier',
+            'data': {'file_upload_path': file_url, 'user_id': 'bench-user', 'tdei_project_group_id': 'bench-group'}
+        })
+
+    latencies, publishes = [], []
+    lock = threading.Lock()
+
+    class TimedOSWValidator(OSWValidator):
+        def validate(self, received_message):
+            start = time.perf_counter()
+            super().validate(received_message)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+        def send_status(self, result, upload_message):
+            start = time.perf_counter()
+            super().send_status(result, upload_message)
+            with lock:
+                publishes.append(time.perf_counter() - start)
+
+    topics = SPOOL_TOPICS if transport == 'spool' else {name: getattr(settings.event_bus, name) for name in SPOOL_TOPICS}
+    # Core is swapped for the stand-in (or the spool transport is selected), the
+    # result cache and deduplication are off so every message is validated
+    with patch('src.osw_validator.Core') as mock_core, \
+            patch('src.osw_validator.LocalCore', return_value=core), \
+            patch.object(settings, 'result_cache_size', 0), \
+            patch.object(settings, 'dedup_ttl', 0), \
+            patch.object(settings, 'max_concurrent_messages', concurrency), \
+            patch.object(settings, 'transport', 'local' if transport == 'spool' else settings.transport), \
+            patch.multiple(settings.event_bus, **topics):
+        mock_core.return_value = core
+        mock_core.__version__ = StandInCore.__version__
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            validator = TimedOSWValidator()
+            if transport == 'spool':
+                # The spool consumer runs until closed, stop it once the queue is drained
+                while validator.listening_topic.pending() or len(latencies) < messages:
+                    time.sleep(0.01)
+                validator.listening_topic.close()
+            validator.listener_thread.join()
+            validator.publisher.close()
+            elapsed = time.perf_counter() - start
+        validator.stop_listening()
+
+    return {
+        'end_to_end': summarize(latencies, elapsed, rss.peak),
+        'publish': summarize(publishes, elapsed, rss.peak)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+# Prints the relative change of every stage metric against an earlier report
+def compare(report, baseline):
+    previous = {run['features']: run['stages'] for run in baseline['runs']}
+    print(f'Comparing {report["commit"]} against {baseline["commit"]}', file=sys.stderr)
+    for run in report['runs']:
+        for stage, metrics in run['stages'].items():
+            before = previous.get(run['features'], {}).get(stage)
+            if not before:
+                continue
+            changes = []
+            for metric in ('throughput_per_sec', 'p95_ms', 'peak_rss_mb'):
+                if before[metric]:
+                    changes.append(f'{metric} {(metrics[metric] - before[metric]) / before[metric]:+.1%}')
+            print(f'  {run["features"]:>9} {stage:>11}: {", ".join(changes)}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark suite')
+    parser.add_argument('--features', type=int, nargs='+', default=[1000, 10000],
+                        help='Dataset sizes (nodes per dataset), e.g. 1000 100000 10000000')
+    parser.add_argument('--runs', type=int, default=3, help='Download/validate repetitions per size')
+    parser.add_argument('--messages', type=int, default=4, help='Messages per end-to-end run')
+    parser.add_argument('--concurrency', type=int, default=2, help='MAX_CONCURRENT_MESSAGES for end-to-end runs')
+    parser.add_argument('--transport', choices=['memory', 'spool'], default='memory',
+                        help='End-to-end messages from an in-memory topic or the filesystem spool queue')
+    parser.add_argument('--max-errors', type=int, default=20)
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'transport': args.transport,
+        'cpu_count': os.cpu_count(),
+        'runs': []
+    }
+    with tempfile.TemporaryDirectory() as storage_root:
+        for features in args.features:
+            zip_path = generate_osw_zip(os.path.join(storage_root, f'osw_{features}.zip'), features)
+            core = StandInCore(storage_root)
+            file_url = core.get_storage_client().add_file(CONTAINER, zip_path)
+            stages = bench_validation_stages(core, file_url, args.runs, args.max_errors)
+            stages.update(bench_end_to_end(storage_root, file_url, args.messages, args.concurrency, args.transport))
+            report['runs'].append({
+                'features': features,
+                'zip_bytes': os.path.getsize(zip_path),
+                'stages': stages
+            })
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Local stand-ins for the python_ms_core storage client, topic and authorizer so
+that the service can be exercised without Azure. Storage is the service's own
+directory-backed client (src/local_transport.py) plus a helper to add files.
+"""
+import os
+import json
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from python_ms_core.core.queue.models.queue_message import QueueMessage
+from src.local_transport import DirectoryStorageClient
+
+
+class LocalStorageClient(DirectoryStorageClient):
+    def add_file(self, container_name, source_path, name=None):
+        target_dir = os.path.join(self.root, container_name)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, name or os.path.basename(source_path))
+        shutil.copyfile(source_path, target)
+        return self.url_for(container_name, os.path.basename(target))
+
+
+class InMemoryTopic:
+    def __init__(self, topic_name=None, max_concurrent_messages=1):
+        self.topic_name = topic_name
+        self.max_concurrent_messages = max_concurrent_messages
+        self.messages = queue.Queue()
+        self.published = []
+        self._lock = threading.Lock()
+
+    def publish(self, data):
+        payload = json.dumps(QueueMessage.to_dict(data))
+        with self._lock:
+            self.published.append(payload)
+        self.messages.put(payload)
+
+    # Delivers every queued message to callback on max_concurrent_messages
+    # threads and returns once the queue is drained
+    def subscribe(self, subscription=None, callback=None):
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_messages) as executor:
+            while True:
+                try:
+                    payload = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                executor.submit(callback, QueueMessage.data_from(payload))
+
+
+class AllowAllAuthorizer:
+    def has_permission(self, request_params):
+        return True
+
+
+class StandInLogger:
+    def info(self, *args, **kwargs):
+        pass
+
+    def error(self, *args, **kwargs):
+        pass
+
+
+class StandInCore:
+    # Drop-in for python_ms_core.Core, every topic name maps to one shared InMemoryTopic
+    __version__ = 'stand-in'
+
+    def __init__(self, storage_root, max_concurrent_messages=1):
+        self.storage_client = LocalStorageClient(storage_root)
+        self.max_concurrent_messages = max_concurrent_messages
+        self.topics = {}
+
+    def get_topic(self, topic_name, max_concurrent_messages=None):
+        if topic_name not in self.topics:
+            self.topics[topic_name] = InMemoryTopic(topic_name, max_concurrent_messages or self.max_concurrent_messages)
+        return self.topics[topic_name]
+
+    def get_storage_client(self):
+        return self.storage_client
+
+    def get_authorizer(self, config=None):
+        return AllowAllAuthorizer()
+
+    def get_logger(self):
+        return StandInLogger()
@@ -0,0 +1,93 @@
+"""
+Generates synthetic OSW datasets (nodes, edges and points) of a configurable
+size. Features are streamed straight into the zip so that datasets with
+millions of features can be built without holding them in memory.
+
+Usage:
+    python benchmarks/synthetic.py --features 100000 --output /tmp/osw_100k.zip
+"""
+import json
+import zipfile
+import argparse
+
+SCHEMA_URL = 'https://sidewalks.washington.edu/opensidewalks/0.2/schema.json'
+ORIGIN = (-122.1424369, 47.6397616)
+STEP = 0.00005
+ROW_LENGTH = 1000
+
+
+def node_coordinates(index):
+    return [round(ORIGIN[0] + (index % ROW_LENGTH) * STEP, 7), round(ORIGIN[1] + (index // ROW_LENGTH) * STEP, 7)]
+
+
+def iter_nodes(count):
+    for index in range(count):
+        yield {
+            'type': 'Feature',
+            'properties': {'_id': str(index)},
+            'geometry': {'type': 'Point', 'coordinates': node_coordinates(index)}
+        }
+
+
+# Edges connect neighbouring nodes along each row of the grid
+def iter_edges(count, node_count):
+    index = 0
+    for u in range(node_count - 1):
+        if index >= count:
+            return
+        v = u + 1
+        if v % ROW_LENGTH == 0:
+            continue
+        yield {
+            'type': 'Feature',
+            'properties': {
+                '_id': str(index), 'highway': 'footway', 'surface': 'concrete', 'length': 3.7,
+                '_u_id': str(u), '_v_id': str(v)
+            },
+            'geometry': {'type': 'LineString', 'coordinates': [node_coordinates(u), node_coordinates(v)]}
+        }
+        index += 1
+
+
+def iter_points(count):
+    for index in range(count):
+        yield {
+            'type': 'Feature',
+            'properties': {'_id': f'p{index}', 'amenity': 'bench'},
+            'geometry': {'type': 'Point', 'coordinates': node_coordinates(index * 7)}
+        }
+
+
+def write_feature_collection(archive, name, features):
+    with archive.open(name, 'w') as member:
+        member.write(json.dumps({'type': 'FeatureCollection', '$schema': SCHEMA_URL})[:-1].encode())
+        member.write(b', "features": [')
+        for index, feature in enumerate(features):
+            if index:
+                member.write(b',\n')
+            member.write(json.dumps(feature).encode())
+        member.write(b']}')
+
+
+# Writes a dataset with `features` nodes, about as many edges and 2% points.
+# Returns the path of the generated zip.
+def generate_osw_zip(path, features, prefix='synthetic'):
+    point_count = max(1, features // 50)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        write_feature_collection(archive, f'{prefix}/{prefix}.graph.nodes.OSW.geojson', iter_nodes(features))
+        write_feature_collection(archive, f'{prefix}/{prefix}.graph.edges.OSW.geojson',
+                                 iter_edges(features, features))
+        write_feature_collection(archive, f'{prefix}/{prefix}.graph.points.OSW.geojson', iter_points(point_count))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic OSW zip')
+    parser.add_argument('--features', type=int, default=1000, help='Number of nodes (edges are about the same)')
+    parser.add_argument('--output', required=True, help='Path of the zip to write')
+    args = parser.parse_args()
+    print(generate_osw_zip(args.output, args.features))
+
+
+if __name__ == '__main__':
+    main()
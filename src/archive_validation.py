@@ -0,0 +1,191 @@
+import io
+import os
+import mmap
+import types
+import zipfile
+import fnmatch
+import posixpath
+from python_osw_validation import OSWValidation
+from python_osw_validation.extracted_data_validator import ExtractedDataValidator
+
+# GDAL virtual file system prefix, geopandas reads '/vsizip//path/to/file.zip/member'
+# straight out of the archive
+VSIZIP_PREFIX = '/vsizip/'
+
+
+# Copy of a library function that resolves the given globals to our replacements,
+# so the library's validation rules are reused as they are instead of duplicated
+def rebind(function, **overrides):
+    namespace = dict(function.__globals__, **overrides)
+    return types.FunctionType(function.__code__, namespace, function.__name__, function.__defaults__,
+                              function.__closure__)
+
+
+# File object over a memory map, zipfile needs seekable() which mmap lacks
+class MappedFile(io.RawIOBase):
+    def __init__(self, mapped: mmap.mmap):
+        super().__init__()
+        self._mapped = mapped
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._mapped.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        try:
+            self._mapped.seek(offset, whence)
+        except ValueError as e:
+            # Files raise OSError here, which zipfile relies on to detect short files
+            raise OSError(22, str(e))
+        return self._mapped.tell()
+
+    def tell(self) -> int:
+        return self._mapped.tell()
+
+
+# Read-only, memory mapped view of the uploaded zip. Members are addressed with
+# GDAL /vsizip/ paths so the same path works for json and geopandas reads.
+class ZipArchive:
+    def __init__(self, zipfile_path: str):
+        self.zipfile_path = zipfile_path
+        self.root = VSIZIP_PREFIX + os.path.abspath(zipfile_path)
+        self._file = open(zipfile_path, 'rb')
+        self._mmap = None
+        try:
+            # An empty file cannot be mapped, zipfile reports it as not a zip file
+            if os.fstat(self._file.fileno()).st_size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.zip = zipfile.ZipFile(MappedFile(self._mmap) if self._mmap is not None else self._file)
+        except Exception:
+            self.close()
+            raise
+        self.names = self.zip.namelist()
+        self.members = [name for name in self.names if not name.endswith('/')]
+        # Stand-in for the os module used by ExtractedDataValidator
+        self.os = types.SimpleNamespace(
+            path=types.SimpleNamespace(exists=self.exists, join=posixpath.join, basename=posixpath.basename)
+        )
+
+    # Member name of a path inside this archive, None for paths elsewhere
+    def member_name(self, path: str):
+        if path == self.root:
+            return ''
+        if path.startswith(self.root + '/'):
+            return path[len(self.root) + 1:]
+        return None
+
+    # First directory entry, mirrors ZipFileHandler.find_internal_folder
+    def internal_folder(self) -> str:
+        return next((name for name in self.names if name.endswith('/')), '')
+
+    def exists(self, path: str) -> bool:
+        name = self.member_name(path)
+        if name is None:
+            return os.path.exists(path)
+        folder = name.rstrip('/')
+        return not folder or name in self.members or any(member.startswith(folder + '/') for member in self.names)
+
+    # Mirrors glob.glob over the extracted tree: '*' stays within one path level
+    # and does not match hidden names
+    def glob(self, pattern: str) -> list:
+        name = self.member_name(pattern)
+        if name is None:
+            return []
+        pattern_parts = [part for part in name.split('/') if part]
+        matches = []
+        for member in self.members:
+            parts = member.split('/')
+            if len(parts) != len(pattern_parts):
+                continue
+            if all(fnmatch.fnmatchcase(part, pattern_part) and (pattern_part.startswith('.') or not part.startswith('.'))
+                   for part, pattern_part in zip(parts, pattern_parts)):
+                matches.append(f'{self.root}/{member}')
+        return matches
+
+    # Stand-in for the builtin open() used by OSWValidation.load_osw_file
+    def open(self, path: str, mode: str = 'r'):
+        name = self.member_name(path)
+        if name is None:
+            return open(path, mode)
+        try:
+            member = self.zip.open(name)
+        except KeyError:
+            raise FileNotFoundError(2, 'No such file or directory', path)
+        return member if 'b' in mode else io.TextIOWrapper(member)
+
+    def close(self):
+        if getattr(self, 'zip', None):
+            self.zip.close()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+# Stand-in for ZipFileHandler that opens the archive instead of extracting it
+class ArchiveHandler:
+    def __init__(self, zip_file_path: str):
+        self.zip_file_path = zip_file_path
+        self.archive = None
+        self.error = None
+
+    def extract_zip(self):
+        try:
+            self.archive = ZipArchive(self.zip_file_path)
+            if len(self.archive.names) == 0:
+                raise Exception('ZIP file is empty')
+            return posixpath.join(self.archive.root, self.archive.internal_folder())
+        except Exception as e:
+            self.error = f'Error extracting ZIP file: {e}'
+
+    def remove_extracted_files(self) -> None:
+        if self.archive:
+            self.archive.close()
+            self.archive = None
+
+
+class ArchiveDataValidator(ExtractedDataValidator):
+    def __init__(self, archive: ZipArchive, extracted_dir: str):
+        super().__init__(extracted_dir)
+        self.is_valid = types.MethodType(rebind(ExtractedDataValidator.is_valid, glob=archive, os=archive.os), self)
+
+
+# OSWValidation that reads the GeoJSON members straight out of the zip. Nothing is
+# extracted: schema checks read members through zipfile and geopandas reads them
+# through GDAL's /vsizip/. Results are the same as OSWValidation.validate.
+class ArchiveOSWValidation(OSWValidation):
+    def __init__(self, zipfile_path: str, **kwargs):
+        super().__init__(zipfile_path, **kwargs)
+        self.handler = None
+
+    def _open_archive(self, zipfile_path: str) -> ArchiveHandler:
+        self.handler = ArchiveHandler(zipfile_path)
+        return self.handler
+
+    def _data_validator(self, extracted_dir: str) -> ArchiveDataValidator:
+        return ArchiveDataValidator(self.handler.archive, extracted_dir)
+
+    def validate(self, max_errors=20):
+        validate = rebind(OSWValidation.validate, ZipFileHandler=self._open_archive,
+                          ExtractedDataValidator=self._data_validator)
+        return validate(self, max_errors)
+
+    def load_osw_file(self, graph_geojson_path: str):
+        archive = self.handler.archive if self.handler else None
+        if archive is None:
+            return super().load_osw_file(graph_geojson_path)
+        return rebind(OSWValidation.load_osw_file, open=archive.open)(self, graph_geojson_path)
+
+    # Dataset keys are looked up in the path inside the archive, not in the archive's own name
+    def _schema_key_from_text(self, text):
+        archive = self.handler.archive if self.handler else None
+        if archive is not None and text and archive.member_name(text) is not None:
+            text = archive.member_name(text)
+        return super()._schema_key_from_text(text)
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .config import Settings
+from .validation_pool import ValidationPool, ValidationWorkerError
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_BATCH')
+logger.setLevel(logging.INFO)
+
+
+# Zip paths from directories (searched recursively), zip files and manifest files
+# (one path per line, relative paths are relative to the manifest)
+def collect_paths(sources, manifests=()):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            for directory, _, names in os.walk(source):
+                paths.extend(os.path.join(directory, name) for name in names if name.lower().endswith('.zip'))
+        else:
+            paths.append(source)
+    for manifest in manifests:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    paths.append(os.path.join(base_dir, line))
+    seen = set()
+    unique = []
+    for path in sorted(os.path.abspath(path) for path in paths):
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+# Paths that already have a result in the output file. A truncated last line
+# left by a crash is ignored, so that file is validated again.
+def completed_paths(output_path, retry_errors=False):
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if retry_errors and record.get('error'):
+                continue
+            completed.add(record['path'])
+    return completed
+
+
+class Progress:
+    def __init__(self, total: int, clock=time.monotonic):
+        self.total = total
+        self.done = 0
+        self.valid = 0
+        self.invalid = 0
+        self.errors = 0
+        self._clock = clock
+        self._started_at = clock()
+        self._lock = threading.Lock()
+
+    def update(self, record: dict):
+        with self._lock:
+            self.done += 1
+            if record.get('error'):
+                self.errors += 1
+            elif record['is_valid']:
+                self.valid += 1
+            else:
+                self.invalid += 1
+
+    def render(self) -> str:
+        elapsed = self._clock() - self._started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = time.strftime('%H:%M:%S', time.gmtime(remaining / rate)) if rate else '--:--:--'
+        return (f'{self.done}/{self.total} files ({self.valid} valid, {self.invalid} invalid, {self.errors} errors) '
+                f'{rate:.2f} files/s ETA {eta}')
+
+
+class BatchValidator:
+    def __init__(self, output_path: str, workers: int, max_errors: int = 20, in_archive: bool = False,
+                 max_tasks_per_child: int = 0):
+        self.output_path = output_path
+        self.workers = workers
+        self.max_errors = max_errors
+        self.pool = ValidationPool(max_workers=workers, max_tasks_per_child=max_tasks_per_child, in_archive=in_archive)
+        self._write_lock = threading.Lock()
+
+    def validate_file(self, path: str) -> dict:
+        start_time = time.perf_counter()
+        record = {'path': path}
+        try:
+            is_valid, issues = self.pool.validate(path, self.max_errors)
+            record['is_valid'] = is_valid
+            record['validation_message'] = '' if is_valid else json.dumps(issues)
+        except ValidationWorkerError as e:
+            record['is_valid'] = False
+            record['validation_message'] = str(e)
+            record['error'] = True
+        except Exception as e:
+            # Anything else (a pool that cannot start a worker, unserializable issues) is
+            # recorded against this file, the rest of the batch carries on
+            logger.error(f' Could not validate {path}: {e}')
+            record['is_valid'] = False
+            record['validation_message'] = f'Error occurred while validating {path}: {e}'
+            record['error'] = True
+        record['seconds'] = round(time.perf_counter() - start_time, 3)
+        return record
+
+    @staticmethod
+    def _ends_with_newline(output) -> bool:
+        output.seek(output.tell() - 1)
+        return output.read(1) == '\n'
+
+    def write(self, output, record: dict):
+        with self._write_lock:
+            output.write(json.dumps(record) + '\n')
+            # Every finished file is on disk before the next one is reported
+            output.flush()
+            os.fsync(output.fileno())
+
+    # Validates every path on the worker pool, appending one JSON line per file
+    # as it finishes. on_progress is called with the Progress after every file.
+    def run(self, paths, progress: Progress = None, on_progress=None) -> Progress:
+        progress = progress or Progress(total=len(paths))
+        try:
+            with open(self.output_path, 'a+') as output, ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # A crash can leave a truncated last line, start the new records on a line of their own
+                if output.tell() and not self._ends_with_newline(output):
+                    output.write('\n')
+                futures = [executor.submit(self.validate_file, path) for path in paths]
+                for future in as_completed(futures):
+                    record = future.result()
+                    self.write(output, record)
+                    progress.update(record)
+                    if on_progress:
+                        on_progress(progress)
+        finally:
+            self.pool.shutdown()
+        return progress
+
+
+def main(argv=None):
+    settings = Settings()
+    parser = argparse.ArgumentParser(prog='python -m src.batch_cli',
+                                     description='Validate OSW zip files without the message queue')
+    parser.add_argument('sources', nargs='*', help='Zip files or directories searched recursively for zip files')
+    parser.add_argument('--manifest', action='append', default=[], help='File listing one zip path per line')
+    parser.add_argument('--output', required=True, help='JSONL file the results are appended to')
+    parser.add_argument('--workers', type=int, default=settings.validation_workers or os.cpu_count() or 1)
+    parser.add_argument('--max-errors', type=int, default=20)
+    parser.add_argument('--in-archive', action='store_true', default=settings.validate_in_archive,
+                        help='Validate inside the zip without extracting it')
+    parser.add_argument('--max-tasks-per-child', type=int, default=settings.validation_max_tasks_per_child)
+    parser.add_argument('--retry-errors', action='store_true', help='Validate again files whose worker crashed')
+    args = parser.parse_args(argv)
+    if not args.sources and not args.manifest:
+        parser.error('provide at least one source or --manifest')
+
+    paths = collect_paths(args.sources, args.manifest)
+    completed = completed_paths(args.output, retry_errors=args.retry_errors)
+    pending = [path for path in paths if path not in completed]
+    logger.info(f' {len(paths)} files found, {len(paths) - len(pending)} already in {args.output}, '
+                f'validating {len(pending)} on {args.workers} workers')
+
+    progress = Progress(total=len(pending))
+    report_lock = threading.Lock()
+
+    def report(_=None):
+        with report_lock:
+            sys.stderr.write(f'\r{progress.render()}')
+            sys.stderr.flush()
+
+    # Redraw every second too, so throughput and ETA stay live during long validations
+    finished = threading.Event()
+
+    def tick():
+        while not finished.wait(1):
+            report()
+
+    ticker = threading.Thread(target=tick, daemon=True)
+    ticker.start()
+    batch = BatchValidator(output_path=args.output, workers=args.workers, max_errors=args.max_errors,
+                           in_archive=args.in_archive, max_tasks_per_child=args.max_tasks_per_child)
+    try:
+        batch.run(pending, progress=progress, on_progress=report)
+    finally:
+        finished.set()
+        ticker.join()
+        report()
+        sys.stderr.write('\n')
+    return 1 if progress.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import time
+import logging
+import threading
+import psutil
+from contextlib import contextmanager
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_CONCURRENCY')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+
+
+# Semaphore whose size can change while it is in use. Shrinking never interrupts
+# work in progress, new work just waits until in_flight drops below the limit.
+class AdaptiveLimit:
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        # Exponentially weighted average of the seconds per MB spent inside slot(), and
+        # how many slots it was measured on
+        self.latency = None
+        self.measured = 0
+        self._condition = threading.Condition()
+        metrics.CONCURRENCY_LIMIT.set(self.limit)
+
+    def set_limit(self, limit: int) -> int:
+        with self._condition:
+            self.limit = min(max(limit, self.minimum), self.maximum)
+            self._condition.notify_all()
+        metrics.CONCURRENCY_LIMIT.set(self.limit)
+        return self.limit
+
+    def set_maximum(self, maximum: int) -> int:
+        with self._condition:
+            self.maximum = max(self.minimum, maximum)
+        return self.set_limit(self.limit)
+
+    # size_of returns the bytes the work covered and is read when the slot is released,
+    # as the zip is only downloaded inside it. Latency is per MB (zips under 1 MB count
+    # as 1 MB) so a run of large uploads is not read as overload. Work without a size
+    # counts as 1 MB, work whose size_of returns nothing is not measured.
+    @contextmanager
+    def slot(self, size_of=None):
+        with self._condition:
+            self.waiting += 1
+            self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.waiting -= 1
+            self.in_flight += 1
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            size = size_of() if size_of else MB
+            with self._condition:
+                self.in_flight -= 1
+                self.completed += 1
+                if size:
+                    elapsed /= max(size / MB, 1)
+                    self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+                    self.measured += 1
+                self._condition.notify_all()
+
+
+# Additive increase, multiplicative decrease of an AdaptiveLimit. Every interval
+# the CPU usage and memory of the service (workers included) are sampled with psutil
+# along with the average latency per MB. The limit drops by decrease_factor when
+# the CPU is above cpu_target, memory is above rss_limit_bytes (0 disables the
+# check) or latency has grown past latency_tolerance times the best seen, and grows by one when the limit is the
+# bottleneck (every slot busy or messages waiting) and none of those hold.
+class ConcurrencyController:
+    def __init__(self, limit: AdaptiveLimit, interval: float = 5, cpu_target: float = 85,
+                 rss_limit_bytes: int = 1024 * MB, latency_tolerance: float = 2.0, decrease_factor: float = 0.5):
+        self.limit = limit
+        self.interval = interval
+        self.cpu_target = cpu_target
+        self.rss_limit_bytes = rss_limit_bytes
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.best_latency = None
+        self.process = psutil.Process()
+        self._children = {}
+        self._last_measured = 0
+        self._stopped = threading.Event()
+        self._thread = None
+        # First cpu_percent call only sets the reference point
+        self.process.cpu_percent()
+
+    # Memory only the process holds. Forked workers share the parent's pages copy-on-write
+    # and those pages are in every RSS, so summing RSS counts them once per worker.
+    @staticmethod
+    def unique_memory(process: psutil.Process) -> int:
+        try:
+            return process.memory_full_info().uss
+        except (psutil.AccessDenied, AttributeError):
+            return process.memory_info().rss
+
+    # CPU usage as a share of all cores, and the RSS of this process plus the unique
+    # memory of its children
+    def sample(self):
+        try:
+            children = self.process.children(recursive=True)
+        except psutil.Error:
+            children = []
+        # Reuse the Process objects, cpu_percent() measures since the previous call on the same object
+        self._children = {child.pid: self._children.get(child.pid, child) for child in children}
+        cpu = 0.0
+        rss = 0
+        for process in [self.process] + list(self._children.values()):
+            try:
+                with process.oneshot():
+                    cpu += process.cpu_percent()
+                    rss += process.memory_info().rss if process is self.process else self.unique_memory(process)
+            except psutil.Error:
+                continue
+        return cpu / (psutil.cpu_count() or 1), rss
+
+    # Returns the reason to back off, None when there is headroom
+    def overload(self, cpu: float, rss: int, latency) -> str:
+        if cpu > self.cpu_target:
+            return f'CPU at {cpu:.0f}%'
+        if self.rss_limit_bytes and rss > self.rss_limit_bytes:
+            return f'RSS at {rss // MB} MB'
+        if latency is not None and self.best_latency and latency > self.best_latency * self.latency_tolerance:
+            return f'latency at {latency:.2f}s, best {self.best_latency:.2f}s'
+        return None
+
+    def step(self, cpu: float, rss: int, latency) -> int:
+        current = self.limit.limit
+        if latency is not None:
+            # The best latency drifts up slowly, so a shift to bigger datasets is not read as overload forever
+            self.best_latency = latency if self.best_latency is None else min(latency, self.best_latency * 1.01)
+        reason = self.overload(cpu, rss, latency)
+        if reason:
+            limit = self.limit.set_limit(int(current * self.decrease_factor))
+        elif self.limit.in_flight >= current or self.limit.waiting:
+            limit = self.limit.set_limit(current + 1)
+        else:
+            limit = current
+        if limit != current:
+            logger.info(f' Concurrency limit {current} -> {limit}' + (f' ({reason})' if reason else ''))
+        return limit
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                cpu, rss = self.sample()
+                # Latency only counts when messages were measured since the last step, otherwise
+                # the average that caused the last decrease would keep decreasing the limit
+                measured = self.limit.measured
+                latency = self.limit.latency if measured != self._last_measured else None
+                self._last_measured = measured
+                self.step(cpu, rss, latency)
+            except Exception as e:
+                logger.error(f' Error adjusting the concurrency limit: {e}')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
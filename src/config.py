@@ -1,23 +1,96 @@
 import os
-from dotenv import load_dotenv
-from pydantic import BaseSettings
+from dotenv import load_dotenv, find_dotenv
+from pydantic import BaseSettings, Field
 
-load_dotenv()
+ENV_FILE = find_dotenv() or os.path.join(os.getcwd(), '.env')
+load_dotenv(ENV_FILE)
 
 
+# Read from the environment whenever Settings is created, so a reloaded
+# configuration picks up a changed container name
 class EventBusSettings:
-    connection_string: str = os.environ.get('QUEUECONNECTION', None)
-    upload_topic: str = os.environ.get('VALIDATION_REQ_TOPIC', None)
-    upload_subscription: str = os.environ.get('VALIDATION_REQ_SUB', None)
-    validation_topic: str = os.environ.get('VALIDATION_RES_TOPIC', None)
-    container_name: str = os.environ.get('CONTAINER_NAME', 'osw')
+    def __init__(self):
+        self.connection_string: str = os.environ.get('QUEUECONNECTION', None)
+        self.upload_topic: str = os.environ.get('VALIDATION_REQ_TOPIC', None)
+        self.upload_subscription: str = os.environ.get('VALIDATION_REQ_SUB', None)
+        self.validation_topic: str = os.environ.get('VALIDATION_RES_TOPIC', None)
+        self.container_name: str = os.environ.get('CONTAINER_NAME', 'osw')
+
+    def __eq__(self, other):
+        return isinstance(other, type(self)) and vars(self) == vars(other)
 
 
 class Settings(BaseSettings):
     app_name: str = 'python-osw-validation'
-    event_bus = EventBusSettings()
+    event_bus: EventBusSettings = Field(default_factory=EventBusSettings)
     auth_permission_url: str = os.environ.get('AUTH_PERMISSION_URL', None)
     max_concurrent_messages: int = os.environ.get('MAX_CONCURRENT_MESSAGES', 2)
+    transport: str = os.environ.get('TRANSPORT', 'azure')
+    spool_dir: str = os.environ.get('SPOOL_DIR', os.path.join(os.getcwd(), 'spool'))
+    local_storage_dir: str = os.environ.get('LOCAL_STORAGE_DIR', os.path.join(os.getcwd(), 'storage'))
+    spool_visibility_timeout: float = os.environ.get('SPOOL_VISIBILITY_TIMEOUT', 300)
+    spool_max_deliveries: int = os.environ.get('SPOOL_MAX_DELIVERIES', 10)
+    scratch_dir: str = os.environ.get('SCRATCH_DIR', os.path.join(os.getcwd(), 'downloads'))
+    scratch_quota_mb: int = os.environ.get('SCRATCH_QUOTA_MB', 0)
+    scratch_expansion_factor: float = os.environ.get('SCRATCH_EXPANSION_FACTOR', 10)
+    scratch_admission_timeout: float = os.environ.get('SCRATCH_ADMISSION_TIMEOUT', 300)
+    download_chunk_size: int = os.environ.get('DOWNLOAD_CHUNK_SIZE', 4 * 1024 * 1024)
+    validation_workers: int = os.environ.get('VALIDATION_WORKERS', 0)
+    validation_max_tasks_per_child: int = os.environ.get('VALIDATION_MAX_TASKS_PER_CHILD', 0)
+    validation_start_method: str = os.environ.get('VALIDATION_START_METHOD', 'forkserver')
+    warm_up: bool = os.environ.get('WARM_UP', True)
+    validate_in_archive: bool = os.environ.get('VALIDATE_IN_ARCHIVE', False)
+    precheck_enabled: bool = os.environ.get('PRECHECK_ENABLED', True)
+    precheck_max_members: int = os.environ.get('PRECHECK_MAX_MEMBERS', 10000)
+    precheck_max_ratio: float = os.environ.get('PRECHECK_MAX_RATIO', 200)
+    precheck_max_uncompressed_mb: int = os.environ.get('PRECHECK_MAX_UNCOMPRESSED_MB', 20480)
+    result_message_max_bytes: int = os.environ.get('RESULT_MESSAGE_MAX_BYTES', 128 * 1024)
+    result_overflow_prefix: str = os.environ.get('RESULT_OVERFLOW_PREFIX', 'validation-issues')
+    result_cache_size: int = os.environ.get('RESULT_CACHE_SIZE', 1000)
+    result_cache_path: str = os.environ.get('RESULT_CACHE_PATH', os.path.join(os.getcwd(), 'cache', 'validation_results.db'))
+    dedup_ttl: float = os.environ.get('DEDUP_TTL', 24 * 60 * 60)
+    dedup_max_entries: int = os.environ.get('DEDUP_MAX_ENTRIES', 10000)
+    dedup_path: str = os.environ.get('DEDUP_PATH', os.path.join(os.getcwd(), 'cache', 'dedup.db'))
+    permission_cache_size: int = os.environ.get('PERMISSION_CACHE_SIZE', 1024)
+    permission_cache_ttl: float = os.environ.get('PERMISSION_CACHE_TTL', 60)
+    permission_cache_negative_ttl: float = os.environ.get('PERMISSION_CACHE_NEGATIVE_TTL', 10)
+    publish_batch_size: int = os.environ.get('PUBLISH_BATCH_SIZE', 1)
+    publish_batch_interval: float = os.environ.get('PUBLISH_BATCH_INTERVAL', 0.5)
+    prefetch_depth: int = os.environ.get('PREFETCH_DEPTH', 0)
+    download_concurrency: int = os.environ.get('DOWNLOAD_CONCURRENCY', 2)
+    validation_concurrency: int = os.environ.get('VALIDATION_CONCURRENCY', 0)
+    publish_concurrency: int = os.environ.get('PUBLISH_CONCURRENCY', 2)
+    adaptive_concurrency: bool = os.environ.get('ADAPTIVE_CONCURRENCY', False)
+    min_concurrent_messages: int = os.environ.get('MIN_CONCURRENT_MESSAGES', 1)
+    concurrency_interval: float = os.environ.get('CONCURRENCY_INTERVAL', 5)
+    concurrency_cpu_target: float = os.environ.get('CONCURRENCY_CPU_TARGET', 85)
+    concurrency_rss_limit_mb: int = os.environ.get('CONCURRENCY_RSS_LIMIT_MB', 0)
+    concurrency_latency_tolerance: float = os.environ.get('CONCURRENCY_LATENCY_TOLERANCE', 2.0)
+    memory_budget_mb: int = os.environ.get('MEMORY_BUDGET_MB', 0)
+    memory_estimate_factor: float = os.environ.get('MEMORY_ESTIMATE_FACTOR', 20)
+    memory_estimate_base_mb: int = os.environ.get('MEMORY_ESTIMATE_BASE_MB', 64)
+    large_file_mb: int = os.environ.get('LARGE_FILE_MB', 256)
+    large_lane_concurrency: int = os.environ.get('LARGE_LANE_CONCURRENCY', 1)
+    priority_lanes: bool = os.environ.get('PRIORITY_LANES', False)
+    lane_concurrency: int = os.environ.get('LANE_CONCURRENCY', 0)
+    interactive_message_types: str = os.environ.get('INTERACTIVE_MESSAGE_TYPES', 'VALIDATION_ONLY')
+    interactive_lane_reserved: int = os.environ.get('INTERACTIVE_LANE_RESERVED', 1)
+    standard_lane_reserved: int = os.environ.get('STANDARD_LANE_RESERVED', 0)
+    bulk_lane_reserved: int = os.environ.get('BULK_LANE_RESERVED', 0)
+    lane_max_wait: float = os.environ.get('LANE_MAX_WAIT', 300)
+    http_validation_concurrency: int = os.environ.get('HTTP_VALIDATION_CONCURRENCY', 1)
+    http_validation_max_bytes: int = os.environ.get('HTTP_VALIDATION_MAX_BYTES', 50 * 1024 * 1024)
+    http_validation_retry_after: int = os.environ.get('HTTP_VALIDATION_RETRY_AFTER', 5)
+    drain_grace_period: float = os.environ.get('DRAIN_GRACE_PERIOD', 25)
+    gc_soft_watermark_mb: int = os.environ.get('GC_SOFT_WATERMARK_MB', 512)
+    gc_hard_watermark_mb: int = os.environ.get('GC_HARD_WATERMARK_MB', 1024)
+    max_errors: int = os.environ.get('MAX_ERRORS', 20)
+    config_file: str = os.environ.get('CONFIG_FILE', ENV_FILE)
+    config_reload_interval: float = os.environ.get('CONFIG_RELOAD_INTERVAL', 0)
+    config_reload_token: str = os.environ.get('CONFIG_RELOAD_TOKEN', '')
+
+    class Config:
+        arbitrary_types_allowed = True
 
     @property
     def auth_provider(self) -> str:
@@ -0,0 +1,104 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional
+from .models.queue_message_content import ValidationResult
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_DEDUP_STORE')
+logger.setLevel(logging.INFO)
+
+
+# Results already published, by message id and upload path, so a message the bus
+# redelivers (lock lost during a long validation, pod killed before completing it)
+# is answered with the stored result instead of being downloaded and validated again.
+# Entries expire after ttl seconds and at most max_entries are kept. Expired entries
+# are deleted at most every compact_interval seconds and the freed pages given back
+# to the file system, so the database stays small.
+class DedupStore:
+    def __init__(self, path: str, ttl: float, max_entries: int, compact_interval: float = 60):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.compact_interval = compact_interval
+        self.hits = 0
+        self.compacted = 0
+        self._last_compaction = 0.0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    # Opens the database on first use so that creating the store has no side effects
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            # Only takes effect on a new database, lets compaction shrink the file
+            self._connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS completed ('
+                'message_id TEXT NOT NULL, file_upload_path TEXT NOT NULL, is_valid INTEGER NOT NULL, '
+                'validation_message TEXT NOT NULL, completed_at REAL NOT NULL, '
+                'PRIMARY KEY (message_id, file_upload_path))'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS completed_at ON completed (completed_at)')
+            self._connection.commit()
+        return self._connection
+
+    def get(self, message_id: str, file_upload_path: str) -> Optional[ValidationResult]:
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT is_valid, validation_message FROM completed '
+                'WHERE message_id = ? AND file_upload_path = ? AND completed_at > ?',
+                (message_id, file_upload_path, time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        result = ValidationResult()
+        result.is_valid = bool(row[0])
+        result.validation_message = row[1]
+        return result
+
+    def put(self, message_id: str, file_upload_path: str, result: ValidationResult):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO completed (message_id, file_upload_path, is_valid, validation_message, '
+                'completed_at) VALUES (?, ?, ?, ?, ?)',
+                (message_id, file_upload_path, int(result.is_valid), result.validation_message, time.time())
+            )
+            connection.commit()
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self._compact(connection)
+
+    def _compact(self, connection: sqlite3.Connection):
+        self._last_compaction = time.monotonic()
+        deleted = connection.execute('DELETE FROM completed WHERE completed_at <= ?',
+                                     (time.time() - self.ttl,)).rowcount
+        deleted += connection.execute(
+            'DELETE FROM completed WHERE rowid IN '
+            '(SELECT rowid FROM completed ORDER BY completed_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        connection.commit()
+        if deleted:
+            # execute() only steps the pragma once, which frees a single page
+            connection.executescript('PRAGMA incremental_vacuum;')
+            self.compacted += deleted
+            logger.info(f' Removed {deleted} expired entries from the dedup store')
+
+    def compact(self):
+        with self._lock:
+            self._compact(self._connect())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'compacted': self.compacted}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
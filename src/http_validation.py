@@ -0,0 +1,108 @@
+import os
+import hashlib
+import logging
+import threading
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from .models.queue_message_content import ValidationResult
+from .scratch_space import scratch_space, ScratchSpaceFull
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_HTTP_VALIDATION')
+logger.setLevel(logging.INFO)
+
+# Message type the metrics of direct uploads are labelled with
+HTTP_MESSAGE_TYPE = 'HTTP_VALIDATION'
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _write_chunk(file, sha256, chunk: bytes):
+    sha256.update(chunk)
+    file.write(chunk)
+
+
+# Writes the request body to path as it arrives, never holding more than one chunk
+# in memory. Returns (sha256, size), raises UploadTooLarge past max_bytes. The disk
+# writes and hashing run on the threadpool, the event loop only receives the chunks.
+async def save_upload(request: Request, path: str, max_bytes: int):
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise UploadTooLarge()
+    sha256 = hashlib.sha256()
+    size = 0
+    file = await run_in_threadpool(open, path, 'wb')
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            await run_in_threadpool(_write_chunk, file, sha256, chunk)
+    finally:
+        await run_in_threadpool(file.close)
+    return sha256.hexdigest(), size
+
+
+# Validates zips uploaded to POST /validate. Validation runs in this process on a
+# threadpool thread, at most `concurrency` at a time, so direct uploads neither queue
+# behind bus messages on the validation pool nor take its workers away from them.
+# Requests past the limit are rejected straight away with 429 and Retry-After.
+class HttpValidator:
+    def __init__(self, concurrency: int = 1, max_bytes: int = 50 * 1024 * 1024, retry_after: int = 5):
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    # Imported on first use so the API starts without loading geopandas. Run on the
+    # threadpool, as that first import and creating the scratch directory block.
+    @staticmethod
+    def _prepare(file_name: str, result_cache):
+        from .validation import Validation
+        # The response has no size limit, the issues are never cut like a bus message
+        return Validation(file_path=file_name, storage_client=None, result_cache=result_cache, max_message_bytes=0)
+
+    # Bytes the upload can reach: its Content-Length when sent, max_bytes otherwise
+    def upload_size(self, request: Request) -> int:
+        content_length = request.headers.get('content-length')
+        if content_length and content_length.isdigit():
+            return min(int(content_length), self.max_bytes)
+        return self.max_bytes
+
+    def _validate(self, validation, zip_path: str, max_errors: int) -> ValidationResult:
+        with metrics.track_message(HTTP_MESSAGE_TYPE):
+            result = validation.validate_downloaded_file(zip_path, max_errors)
+            metrics.record_outcome('valid' if result.is_valid else 'invalid')
+        return result
+
+    async def handle(self, request: Request, file_name: str, max_errors: int, result_cache=None):
+        if not self._slots.acquire(blocking=False):
+            return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                content={'detail': 'Too many validations in progress, retry later'},
+                                headers={'Retry-After': str(self.retry_after)})
+        try:
+            validation = await run_in_threadpool(self._prepare, file_name, result_cache)
+            try:
+                # Scratch space is reserved like for a queued message, before anything is written
+                await run_in_threadpool(scratch_space.reserve, validation.unique_dir_path, self.upload_size(request),
+                                        validation.validate_in_archive)
+                zip_path = os.path.join(validation.unique_dir_path, 'upload.zip')
+                validation.file_sha256, validation.file_size = await save_upload(request, zip_path, self.max_bytes)
+                result = await run_in_threadpool(self._validate, validation, zip_path, max_errors)
+            except UploadTooLarge:
+                logger.error(f' Rejected upload of {file_name}, larger than {self.max_bytes} bytes')
+                return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    content={'detail': f'Upload is larger than {self.max_bytes} bytes'})
+            except ScratchSpaceFull as e:
+                logger.error(f' Rejected upload of {file_name}, {e}')
+                return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    content={'detail': 'No scratch space for the upload, retry later'},
+                                    headers={'Retry-After': str(self.retry_after)})
+            finally:
+                validation.clean_up(validation.unique_dir_path)
+        finally:
+            self._slots.release()
+        return {'is_valid': result.is_valid, 'validation_message': result.validation_message}
@@ -0,0 +1,63 @@
+import time
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_IN_FLIGHT')
+logger.setLevel(logging.INFO)
+
+
+class Draining(Exception):
+    pass
+
+
+# Keeps track of the messages being processed so shutdown can wait for them.
+# Once drain() starts, track() refuses new messages with Draining; the topic then
+# hands them back to the broker straight away for another instance to pick up.
+class InFlightRegistry:
+    def __init__(self):
+        self.draining = False
+        self._messages = {}
+        self._tokens = itertools.count()
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def track(self, message_id: str):
+        with self._condition:
+            if self.draining:
+                metrics.SHUTDOWN_MESSAGES.labels('refused').inc()
+                raise Draining(f'Shutting down, message {message_id} is left for another instance')
+            token = next(self._tokens)
+            self._messages[token] = (message_id, time.monotonic())
+        try:
+            yield
+        finally:
+            with self._condition:
+                del self._messages[token]
+                self._condition.notify_all()
+
+    def in_flight(self) -> list:
+        with self._condition:
+            return [message_id for message_id, _ in self._messages.values()]
+
+    # Stops accepting messages and waits up to grace_period seconds for the ones in
+    # progress to finish. Returns (drained, abandoned), the messages that finished in
+    # time and those still running when the grace period ran out.
+    def drain(self, grace_period: float):
+        with self._condition:
+            self.draining = True
+            running = len(self._messages)
+            if running:
+                logger.info(f' Draining {running} messages, waiting up to {grace_period} seconds')
+            self._condition.wait_for(lambda: not self._messages, timeout=max(grace_period, 0))
+            abandoned = [(message_id, time.monotonic() - started) for message_id, started in self._messages.values()]
+        drained = running - len(abandoned)
+        metrics.SHUTDOWN_MESSAGES.labels('drained').inc(drained)
+        metrics.SHUTDOWN_MESSAGES.labels('abandoned').inc(len(abandoned))
+        for message_id, elapsed in abandoned:
+            logger.error(f' Abandoned {message_id} after {elapsed:.1f} seconds, it will be redelivered')
+        logger.info(f' Drained {drained} messages, abandoned {len(abandoned)}')
+        return drained, len(abandoned)
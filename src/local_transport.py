@@ -0,0 +1,296 @@
+import os
+import re
+import json
+import time
+import types
+import uuid
+import logging
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from python_ms_core import Core
+from python_ms_core.core.queue.models.queue_message import QueueMessage
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_LOCAL_TRANSPORT')
+logger.setLevel(logging.INFO)
+
+READY_NAME = re.compile(r'^([^~]+)~(\d+)\.json$')
+CLAIMED_NAME = re.compile(r'^([^~]+)~(\d+)~(\d+)\.json$')
+
+
+# Mimics the read(size) API of azure's StorageStreamDownloader
+class FileReader:
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        if not chunk:
+            self._file.close()
+        return chunk
+
+
+class DirectoryFile:
+    def __init__(self, path: str, url: str = None):
+        self.name = os.path.basename(path)
+        self.file_path = path
+        self.url = url
+        # Served through the same blob_client.download_blob() API as azure files
+        self.blob_client = self
+
+    # Size is read from the file, like azure reads it from the blob properties
+    def get_blob_properties(self):
+        return types.SimpleNamespace(size=os.path.getsize(self.file_path))
+
+    def download_blob(self) -> FileReader:
+        return FileReader(self.file_path)
+
+    def get_stream(self) -> bytes:
+        with open(self.file_path, 'rb') as file:
+            return file.read()
+
+    def upload(self, upload_stream):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        data = upload_stream if isinstance(upload_stream, bytes) else upload_stream.read()
+        with open(self.file_path, 'wb') as file:
+            file.write(data)
+
+    def get_remote_url(self) -> str:
+        return self.url
+
+
+class DirectoryContainer:
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self.path = os.path.join(root, name)
+
+    def list_files(self):
+        return [DirectoryFile(os.path.join(self.path, name)) for name in sorted(os.listdir(self.path))]
+
+    def create_file(self, name: str) -> DirectoryFile:
+        return DirectoryFile(os.path.join(self.path, name), url=DirectoryStorageClient.url_for(self.name, name))
+
+
+# Storage client serving https://<account>/<container>/<path> urls from <root>/<container>/<path>
+class DirectoryStorageClient:
+    def __init__(self, root: str):
+        self.root = root
+
+    def get_container(self, container_name: str) -> DirectoryContainer:
+        return DirectoryContainer(self.root, container_name)
+
+    def get_file_from_url(self, container_name: str, full_url: str) -> DirectoryFile:
+        path = urllib.parse.urlparse(urllib.parse.unquote(full_url)).path.lstrip('/')
+        if path.startswith(f'{container_name}/'):
+            path = path[len(container_name) + 1:]
+        return DirectoryFile(os.path.join(self.root, container_name, path))
+
+    # Url under which get_file_from_url serves <root>/<container>/<path>
+    @staticmethod
+    def url_for(container_name: str, path: str) -> str:
+        return f'https://localstorage/{container_name}/{urllib.parse.quote(path)}'
+
+
+# Filesystem queue with the publish/subscribe surface of AzureTopic.
+#
+# Every message is a JSON file. publish() writes it under tmp/ and renames it into
+# ready/, so consumers never see partial files. A consumer claims a message by
+# renaming it into claimed/ with a visibility deadline in the file name; rename is
+# atomic, so every message is claimed by one consumer only, even across processes.
+# The message is deleted (completed) when the callback returns and moved back to
+# ready/ (abandoned) when it raises. Claims held by this process are renewed while
+# the callback runs; claims past their deadline belong to a consumer that died and
+# are moved back to ready/ for redelivery. After max_deliveries attempts a message
+# is moved to dead/.
+#
+# File names are <enqueued ns>-<uuid>~<deliveries>.json in ready/ and
+# <enqueued ns>-<uuid>~<deliveries>~<deadline ms>.json in claimed/, so listing
+# ready/ in name order is FIFO. Any other file found there (dropped by hand, left by
+# an editor) is moved to dead/ instead of being delivered.
+class SpoolTopic:
+    def __init__(self, root: str, topic_name: str, max_concurrent_messages: int = 1,
+                 visibility_timeout: float = 300, max_deliveries: int = 10, poll_interval: float = 0.5):
+        self.topic_name = topic_name
+        self.max_concurrent_messages = max_concurrent_messages
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.poll_interval = poll_interval
+        self.path = os.path.join(root, topic_name)
+        self.ready_dir = os.path.join(self.path, 'ready')
+        self.claimed_dir = os.path.join(self.path, 'claimed')
+        self.dead_dir = os.path.join(self.path, 'dead')
+        self.tmp_dir = os.path.join(self.path, 'tmp')
+        for directory in (self.ready_dir, self.claimed_dir, self.dead_dir, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.completed = 0
+        self.abandoned = 0
+        self.redelivered = 0
+        self._claims = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Set when a message settles so the next one is claimed straight away
+        self._wakeup = threading.Event()
+
+    def publish(self, data: QueueMessage):
+        message_id = f'{time.time_ns():020d}-{uuid.uuid4().hex}'
+        tmp_path = os.path.join(self.tmp_dir, f'{message_id}.json')
+        with open(tmp_path, 'w') as file:
+            json.dump(QueueMessage.to_dict(data), file)
+        os.rename(tmp_path, os.path.join(self.ready_dir, f'{message_id}~0.json'))
+
+    def pending(self) -> int:
+        return len(os.listdir(self.ready_dir)) + len(os.listdir(self.claimed_dir))
+
+    def subscribe(self, subscription: str = None, callback=None):
+        # A spool directory is a single queue, the subscription name is not used
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_messages) as executor:
+            while True:
+                self._wakeup.clear()
+                self._renew_claims()
+                claimed = []
+                if not self._stopped.is_set():
+                    self._redeliver_expired()
+                    with self._lock:
+                        to_receive = self.max_concurrent_messages - len(self._claims)
+                    claimed = self._claim(to_receive) if to_receive > 0 else []
+                    for message_id, payload in claimed:
+                        task = executor.submit(self._internal_callback, message_id, payload, callback)
+                        task.add_done_callback(lambda future, message_id=message_id: self._settle(message_id, future))
+                else:
+                    # Keep renewing the claims of messages still in flight, then return
+                    with self._lock:
+                        if not self._claims:
+                            break
+                if not claimed:
+                    self._wakeup.wait(self.poll_interval)
+
+    # Stops claiming messages, subscribe() returns once the claimed ones are settled
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _claim(self, count: int):
+        claimed = []
+        for name in sorted(os.listdir(self.ready_dir)):
+            match = READY_NAME.match(name)
+            if not match:
+                self._discard(self.ready_dir, name)
+                continue
+            if len(claimed) >= count:
+                break
+            message_id, deliveries = match.groups()
+            deadline = int((time.time() + self.visibility_timeout) * 1000)
+            path = os.path.join(self.claimed_dir, f'{message_id}~{int(deliveries) + 1}~{deadline}.json')
+            try:
+                os.rename(os.path.join(self.ready_dir, name), path)
+            except FileNotFoundError:
+                # Claimed by another consumer in the meantime
+                continue
+            # Read here, the file is renamed whenever its claim is renewed
+            with open(path) as file:
+                payload = file.read()
+            with self._lock:
+                self._claims[message_id] = path
+            claimed.append((message_id, payload))
+        return claimed
+
+    def _internal_callback(self, message_id: str, payload: str, callback) -> bool:
+        try:
+            callback(QueueMessage.data_from(payload))
+            return True
+        except Exception as e:
+            logger.error(f'Error in processing message {message_id}: {e}')
+            return False
+
+    def _settle(self, message_id: str, future):
+        with self._lock:
+            path = self._claims.pop(message_id)
+        if future.result():
+            os.remove(path)
+            self.completed += 1
+        else:
+            self._release(os.path.basename(path))
+            self.abandoned += 1
+        self._wakeup.set()
+
+    # Moves a file that is not a spool message out of the way, into dead/
+    def _discard(self, directory: str, name: str):
+        logger.error(f'{name} in {directory} is not a spool message, moving it to {self.dead_dir}')
+        try:
+            os.rename(os.path.join(directory, name), os.path.join(self.dead_dir, name))
+        except FileNotFoundError:
+            pass
+
+    # Moves a claimed message back to ready/, or to dead/ once it ran out of deliveries
+    def _release(self, claimed_name: str) -> bool:
+        message_id, deliveries, _ = CLAIMED_NAME.match(claimed_name).groups()
+        if int(deliveries) >= self.max_deliveries:
+            logger.error(f'Message {message_id} failed {deliveries} deliveries, moving it to {self.dead_dir}')
+            target = os.path.join(self.dead_dir, f'{message_id}~{deliveries}.json')
+        else:
+            target = os.path.join(self.ready_dir, f'{message_id}~{deliveries}.json')
+        try:
+            os.rename(os.path.join(self.claimed_dir, claimed_name), target)
+            return True
+        except FileNotFoundError:
+            return False
+
+    # Pushes the deadline of messages still being processed here
+    def _renew_claims(self):
+        now = time.time()
+        with self._lock:
+            for message_id, path in list(self._claims.items()):
+                prefix, deadline = path[:-len('.json')].rsplit('~', 1)
+                if int(deadline) / 1000 - now > self.visibility_timeout / 2:
+                    continue
+                renewed = f'{prefix}~{int((now + self.visibility_timeout) * 1000)}.json'
+                try:
+                    os.rename(path, renewed)
+                    self._claims[message_id] = renewed
+                except FileNotFoundError:
+                    logger.error(f'Lost the claim on message {message_id}')
+
+    def _redeliver_expired(self):
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            held = set(self._claims.values())
+        for name in os.listdir(self.claimed_dir):
+            path = os.path.join(self.claimed_dir, name)
+            if path in held:
+                continue
+            match = CLAIMED_NAME.match(name)
+            if not match:
+                self._discard(self.claimed_dir, name)
+                continue
+            if int(match.group(3)) > now_ms:
+                continue
+            if self._release(name):
+                self.redelivered += 1
+                logger.info(f'Redelivering {name}, its claim expired')
+
+
+# Core for local runs: topics are spool directories under spool_dir and files
+# are served from storage_dir. Authorization still goes through Core.
+class LocalCore(Core):
+    def __init__(self, spool_dir: str, storage_dir: str, visibility_timeout: float = 300, max_deliveries: int = 10):
+        super().__init__(config='LOCAL')
+        self.spool_dir = spool_dir
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.storage_client = DirectoryStorageClient(storage_dir)
+
+    # Topics on the same directory share the queue, the files are the only state
+    def get_topic(self, topic_name: str, max_concurrent_messages=1) -> SpoolTopic:
+        # Without a name the topic would be the spool root itself, or not a path at all
+        if not topic_name:
+            raise ValueError('TRANSPORT=local needs VALIDATION_REQ_TOPIC and VALIDATION_RES_TOPIC, '
+                             'each topic is a directory under SPOOL_DIR')
+        return SpoolTopic(self.spool_dir, topic_name, max_concurrent_messages=max_concurrent_messages,
+                          visibility_timeout=self.visibility_timeout, max_deliveries=self.max_deliveries)
+
+    def get_storage_client(self) -> DirectoryStorageClient:
+        return self.storage_client
+
+    def get_logger(self):
+        return logger
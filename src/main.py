@@ -1,9 +1,15 @@
 import os
+import time
+import secrets
+import threading
 import psutil
-from fastapi import BackgroundTasks, FastAPI, APIRouter, Depends, status
-from functools import lru_cache
+from fastapi import FastAPI, APIRouter, Depends, Header, Query, Request, Response, status
+from starlette.concurrency import run_in_threadpool
 from .config import Settings
-from .osw_validator import OSWValidator
+from .memory_governor import memory_governor
+from .runtime_config import runtime_config
+from .http_validation import HttpValidator
+from . import metrics
 
 app = FastAPI()
 
@@ -11,19 +17,33 @@ prefix_router = APIRouter(prefix='/health')
 
 # Have a reference to validator in the app object
 app.validator = None
+# Set once the validator is loaded and listening, /ready answers 503 until then
+app.ready = threading.Event()
 
-@lru_cache()
-def get_settings():
-    return Settings()
+# The shared configuration, the current snapshot after a reload
+def get_settings() -> Settings:
+    return runtime_config.settings
 
 
-@app.on_event('startup')
-async def startup_event(settings: Settings = Depends(get_settings)) -> None:
+_settings = get_settings()
+app.http_validator = HttpValidator(concurrency=_settings.http_validation_concurrency,
+                                   max_bytes=_settings.http_validation_max_bytes,
+                                   retry_after=_settings.http_validation_retry_after)
+
+
+# Loads the validator after the server is up. OSWValidator pulls in python_osw_validation,
+# geopandas/GDAL and python_ms_core, which take seconds to import, so they are only
+# imported here and health checks answer in the meantime.
+def start_validator() -> None:
     try:
-        # OSWValidator()
-        background_tasks = BackgroundTasks()
+        from .osw_validator import OSWValidator
 
         app.validator = OSWValidator()
+        memory_governor.freeze()
+        startup_seconds = time.time() - psutil.Process().create_time()
+        metrics.STARTUP_SECONDS.set(startup_seconds)
+        app.ready.set()
+        print(f'Validator ready {startup_seconds:.2f} seconds after the process started')
     except:
         print('\n\n\x1b[31m Application startup failed due to missing or invalid .env file \x1b[0m')
         print('\x1b[31m Please provide the valid .env file and .env file should contains following parameters\x1b[0m')
@@ -39,11 +59,20 @@ async def startup_event(settings: Settings = Depends(get_settings)) -> None:
             child.kill()
         parent.kill()
 
+
+@app.on_event('startup')
+async def startup_event(settings: Settings = Depends(get_settings)) -> None:
+    threading.Thread(target=start_validator, name='validator-warm-up', daemon=True).start()
+    runtime_config.start_watching()
+
 @app.on_event('shutdown')
 async def shutdown_event() -> None:
     print('Shutting down the application')
+    app.ready.clear()
+    runtime_config.stop_watching()
     if app.validator:
-        app.validator.stop_listening()
+        # Drains the messages in progress, off the event loop
+        await run_in_threadpool(app.validator.stop_listening)
 
 @app.get('/', status_code=status.HTTP_200_OK)
 @prefix_router.get('/', status_code=status.HTTP_200_OK)
@@ -59,4 +88,50 @@ def ping():
     return "I'm healthy !!"
 
 
+# Readiness, unlike /ping, only succeeds once the validator is loaded and listening
+@app.get('/ready', status_code=status.HTTP_200_OK)
+@prefix_router.get('/ready', status_code=status.HTTP_200_OK)
+def ready(response: Response):
+    if not app.ready.is_set():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return 'Starting'
+    return 'Ready'
+
+
+@app.get('/metrics', status_code=status.HTTP_200_OK)
+def get_metrics():
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+
+# Re-reads the .env file and applies the changed tunables without a restart. Only
+# callers sending CONFIG_RELOAD_TOKEN as a bearer token may reload, and the endpoint
+# is disabled when no token is configured.
+@app.post('/config/reload', status_code=status.HTTP_200_OK)
+async def reload_config(response: Response, authorization: str = Header('')):
+    token = str(runtime_config.settings.config_reload_token or '')
+    if not token:
+        response.status_code = status.HTTP_403_FORBIDDEN
+        return {'detail': 'Configuration reload is disabled, set CONFIG_RELOAD_TOKEN to enable it'}
+    scheme, _, credentials = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not secrets.compare_digest(credentials.encode(), token.encode()):
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return {'detail': 'Invalid or missing token'}
+    try:
+        changed = await run_in_threadpool(runtime_config.reload)
+    except ValueError as e:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {'detail': str(e), 'version': runtime_config.version}
+    return {'changed': changed, 'version': runtime_config.version}
+
+
+# Validates the zip sent as the raw request body and returns the result inline
+@app.post('/validate', status_code=status.HTTP_200_OK)
+async def validate_upload(request: Request, file_name: str = 'upload.zip', max_errors: int = Query(20, gt=0)):
+    result_cache = app.validator.result_cache if app.validator else None
+    return await app.http_validator.handle(request, file_name=file_name, max_errors=max_errors,
+                                           result_cache=result_cache)
+
+
 app.include_router(prefix_router)
@@ -0,0 +1,107 @@
+import logging
+import threading
+from contextlib import contextmanager
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_MEMORY_BUDGET')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+STANDARD_LANE = 'standard'
+LARGE_LANE = 'large'
+
+
+# Memory a validation is expected to need for a zip of blob_size bytes. GeoJSON
+# compresses roughly tenfold and geopandas holds a multiple of the JSON in memory,
+# so the estimate grows linearly with the zip on top of a fixed interpreter cost.
+def estimate_memory(blob_size: int, factor: float, base_bytes: int) -> int:
+    return int(base_bytes + blob_size * factor)
+
+
+# Admits validations against a memory budget instead of a fixed message count.
+# Every validation reserves its estimated memory before downloading and waits
+# while the reservations in progress would exceed the budget, so many small
+# uploads run side by side while two huge ones never run together.
+#
+# Zips of at least large_file_bytes go through the large lane, which runs at
+# most large_lane_concurrency of them at once. A large reservation that is
+# waiting holds back its share of the budget from new standard reservations so
+# a steady stream of small uploads cannot starve it. A reservation larger than
+# the whole budget is admitted once nothing else is running.
+class MemoryBudget:
+    def __init__(self, budget_bytes: int, large_file_bytes: int, large_lane_concurrency: int = 1,
+                 estimate_factor: float = 20, estimate_base_bytes: int = 64 * MB):
+        self.budget_bytes = budget_bytes
+        self.large_file_bytes = large_file_bytes
+        self.large_lane_concurrency = max(1, large_lane_concurrency)
+        self.estimate_factor = estimate_factor
+        self.estimate_base_bytes = estimate_base_bytes
+        self.reserved = {STANDARD_LANE: 0, LARGE_LANE: 0}
+        self.active = {STANDARD_LANE: 0, LARGE_LANE: 0}
+        self.waiting = {STANDARD_LANE: 0, LARGE_LANE: 0}
+        self._held_back = 0
+        self._condition = threading.Condition()
+
+    def lane(self, blob_size) -> str:
+        if blob_size is None or blob_size >= self.large_file_bytes:
+            # Unknown sizes are treated as large, they may be anything
+            return LARGE_LANE
+        return STANDARD_LANE
+
+    def estimate(self, blob_size) -> int:
+        if blob_size is None:
+            blob_size = self.large_file_bytes
+        return estimate_memory(blob_size, self.estimate_factor, self.estimate_base_bytes)
+
+    @property
+    def in_use(self) -> int:
+        return self.reserved[STANDARD_LANE] + self.reserved[LARGE_LANE]
+
+    def _fits(self, lane: str, estimate: int) -> bool:
+        if self.in_use == 0 and (lane == LARGE_LANE or not self._held_back):
+            return True
+        if lane == LARGE_LANE:
+            return self.in_use + estimate <= self.budget_bytes
+        return self.in_use + self._held_back + estimate <= self.budget_bytes
+
+    def _can_start(self, lane: str, estimate: int) -> bool:
+        if lane == LARGE_LANE and self.active[LARGE_LANE] >= self.large_lane_concurrency:
+            return False
+        return self._fits(lane, estimate)
+
+    @contextmanager
+    def reserve(self, estimate: int, lane: str = STANDARD_LANE):
+        with self._condition:
+            if not self._can_start(lane, estimate):
+                logger.info(f' Waiting for {estimate // MB} MB in the {lane} lane, '
+                            f'{self.in_use // MB} of {self.budget_bytes // MB} MB reserved')
+                self.waiting[lane] += 1
+                if lane == LARGE_LANE:
+                    self._held_back += estimate
+                try:
+                    self._condition.wait_for(lambda: self._can_start(lane, estimate))
+                finally:
+                    self.waiting[lane] -= 1
+                    if lane == LARGE_LANE:
+                        self._held_back -= estimate
+            self.reserved[lane] += estimate
+            self.active[lane] += 1
+            metrics.MEMORY_RESERVED.labels(lane).set(self.reserved[lane])
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved[lane] -= estimate
+                self.active[lane] -= 1
+                metrics.MEMORY_RESERVED.labels(lane).set(self.reserved[lane])
+                self._condition.notify_all()
+
+    # Reserves the estimated memory of a zip of blob_size bytes (None if unknown) in its lane
+    def admit(self, blob_size):
+        return self.reserve(self.estimate(blob_size), self.lane(blob_size))
+
+    def stats(self) -> dict:
+        return {lane: {'reserved': self.reserved[lane], 'active': self.active[lane], 'waiting': self.waiting[lane]}
+                for lane in (STANDARD_LANE, LARGE_LANE)}
+
@@ -0,0 +1,102 @@
+import gc
+import time
+import logging
+import threading
+import psutil
+from contextlib import contextmanager
+from .runtime_config import runtime_config
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_MEMORY_GOVERNOR')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+# After a collection the watermarks only trigger again once RSS has grown this much
+# past what the collection left. Memory freed by gc stays in the allocator, so RSS
+# often stays above the watermark and every message would collect again otherwise.
+REARM_GROWTH = 0.1
+
+
+class MemoryGovernor:
+    def __init__(self, soft_watermark_mb: int, hard_watermark_mb: int):
+        self.soft_watermark = soft_watermark_mb * MB
+        self.hard_watermark = hard_watermark_mb * MB
+        self.process = psutil.Process()
+        self.collections = 0
+        self.skipped = 0
+        # RSS below which no collection runs, raised after every collection
+        self.rearm_rss = 0
+        self.pause_seconds = 0.0
+        self._pause_started_at = None
+        self._lock = threading.Lock()
+        gc.callbacks.append(self._on_gc)
+
+    # Records how long every collection (ours or the interpreter's) stops the world
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._pause_started_at = time.perf_counter()
+        elif self._pause_started_at is not None:
+            self.pause_seconds += time.perf_counter() - self._pause_started_at
+            self._pause_started_at = None
+
+    # Moves everything allocated during startup (modules, schemas, clients) into the
+    # permanent generation so later collections do not have to traverse it again
+    def freeze(self):
+        gc.collect()
+        gc.freeze()
+        logger.info(f' Froze {gc.get_freeze_count()} startup objects')
+
+    def rss(self) -> int:
+        return self.process.memory_info().rss
+
+    # Runs a collection only when the process has grown past a watermark, and past
+    # what the previous collection left. Returns the generation collected or None
+    # when no collection was needed.
+    def checkpoint(self):
+        rss = self.rss()
+        if self.hard_watermark and rss >= self.hard_watermark:
+            generation = 2
+        elif self.soft_watermark and rss >= self.soft_watermark:
+            generation = 1
+        else:
+            # Back under the watermarks, the next crossing collects again
+            self.rearm_rss = 0
+            return None
+        if rss < self.rearm_rss:
+            with self._lock:
+                self.skipped += 1
+            return None
+        gc.collect(generation)
+        after = self.rss()
+        with self._lock:
+            self.collections += 1
+            self.rearm_rss = int(after * (1 + REARM_GROWTH))
+        logger.info(f' RSS {rss // MB} MB crossed watermark, collected generation {generation}, '
+                    f'RSS now {after // MB} MB')
+        return generation
+
+    # Reports the GC pause time observed while the message was being processed.
+    # Collections are stop-the-world, so a pause counts against every message in flight.
+    @contextmanager
+    def track(self, message_id: str):
+        stats = {'message_id': message_id, 'gc_pause_ms': 0.0}
+        pause_before = self.pause_seconds
+        try:
+            yield stats
+        finally:
+            stats['gc_pause_ms'] = round((self.pause_seconds - pause_before) * 1000, 3)
+            logger.info(f' GC paused {stats["gc_pause_ms"]} ms while processing {message_id}')
+
+    def stats(self) -> dict:
+        return {
+            'rss_mb': round(self.rss() / MB, 1),
+            'collections': self.collections,
+            'skipped_collections': self.skipped,
+            'gc_pause_ms': round(self.pause_seconds * 1000, 3),
+            'frozen_objects': gc.get_freeze_count()
+        }
+
+
+_settings = runtime_config.settings
+memory_governor = MemoryGovernor(soft_watermark_mb=int(_settings.gc_soft_watermark_mb),
+                                 hard_watermark_mb=int(_settings.gc_hard_watermark_mb))
@@ -0,0 +1,179 @@
+import time
+import itertools
+import contextvars
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+UNKNOWN_MESSAGE_TYPE = 'unknown'
+# Messages started by this process, the first one pays for anything not warmed up
+_messages_started = itertools.count()
+
+# Message type of the message handled by the current thread, used as the label
+# for every metric recorded while processing it
+current_message_type = contextvars.ContextVar('current_message_type', default=UNKNOWN_MESSAGE_TYPE)
+
+STAGE_SECONDS = Histogram(
+    'osw_validation_stage_seconds',
+    'Time spent in each stage of processing a message',
+    ['stage', 'message_type'],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+MESSAGE_SECONDS = Histogram(
+    'osw_validation_message_seconds',
+    'Time to process a message, the first one after startup (phase=first) apart from the rest (phase=steady)',
+    ['message_type', 'phase'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+DOWNLOAD_BYTES = Histogram(
+    'osw_validation_download_bytes',
+    'Size of the downloaded zip files',
+    ['message_type'],
+    buckets=(1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2, 100 * 1024 ** 2, 250 * 1024 ** 2, 500 * 1024 ** 2,
+             1024 ** 3, 2 * 1024 ** 3, 5 * 1024 ** 3)
+)
+IN_FLIGHT = Gauge(
+    'osw_validation_in_flight_messages',
+    'Messages currently being processed',
+    ['message_type']
+)
+MEMORY_RESERVED = Gauge(
+    'osw_validation_memory_reserved_bytes',
+    'Estimated validation memory reserved against MEMORY_BUDGET_MB, by lane',
+    ['lane']
+)
+SCRATCH_RESERVED = Gauge(
+    'osw_validation_scratch_reserved_bytes',
+    'Estimated scratch disk space reserved against SCRATCH_QUOTA_MB'
+)
+SCRATCH_SWEPT = Counter(
+    'osw_validation_scratch_swept',
+    'Orphaned scratch directories left by crashed runs and removed at startup'
+)
+CONCURRENCY_LIMIT = Gauge(
+    'osw_validation_concurrency_limit',
+    'Messages the adaptive concurrency controller currently lets validate at once'
+)
+PRECHECK_REJECTIONS = Counter(
+    'osw_validation_precheck_rejections',
+    'Uploads rejected by the structural pre-check before the full validator ran',
+    ['message_type', 'reason']
+)
+STARTUP_SECONDS = Gauge(
+    'osw_validation_startup_seconds',
+    'Seconds from process start until the validator was loaded and listening'
+)
+WARM_UP_SECONDS = Gauge(
+    'osw_validation_warm_up_seconds',
+    'Seconds the warm-up validation of the bundled fixture took at startup'
+)
+SHUTDOWN_MESSAGES = Counter(
+    'osw_validation_shutdown_messages',
+    'Messages at shutdown: drained (finished in the grace period), abandoned or refused',
+    ['outcome']
+)
+DEDUP_HITS = Counter(
+    'osw_validation_dedup_hits',
+    'Redelivered messages answered with their stored result instead of being validated again',
+    ['message_type']
+)
+LANE_QUEUE_WAIT = Histogram(
+    'osw_validation_lane_queue_wait_seconds',
+    'Time from publishing until a priority lane started the validation, only the wait in the lane when the publish time is unknown',
+    ['lane'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+CONFIG_RELOADS = Counter(
+    'osw_validation_config_reloads',
+    'Configuration reloads: applied (settings changed), unchanged or failed (invalid values, kept the old ones)',
+    ['outcome']
+)
+RESULT_CACHE_LOOKUPS = Counter(
+    'osw_validation_result_cache_lookups',
+    'Result cache lookups by outcome (hit or miss)',
+    ['message_type', 'outcome']
+)
+RESULT_CACHE_EVICTIONS = Counter(
+    'osw_validation_result_cache_evictions',
+    'Results evicted from the result cache to stay within RESULT_CACHE_SIZE'
+)
+PERMISSION_LOOKUPS = Counter(
+    'osw_validation_permission_lookups',
+    'Permission lookups: hit (cached decision), miss (asked the auth service) or coalesced (waited on a concurrent miss)',
+    ['outcome']
+)
+PERMISSION_LOOKUP_SECONDS = Histogram(
+    'osw_validation_permission_lookup_seconds',
+    'Time to get a permission decision, from the cache or the auth service',
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+OUTCOMES = Counter(
+    'osw_validation_messages',
+    'Processed messages by outcome (valid, invalid or error)',
+    ['message_type', 'outcome']
+)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, current_message_type.get()).observe(time.perf_counter() - start_time)
+
+
+def observe_download(size: int):
+    DOWNLOAD_BYTES.labels(current_message_type.get()).observe(size)
+
+
+def record_outcome(outcome: str):
+    OUTCOMES.labels(current_message_type.get(), outcome).inc()
+
+
+def record_dedup_hit():
+    DEDUP_HITS.labels(current_message_type.get()).inc()
+
+
+def record_result_cache_lookup(outcome: str):
+    RESULT_CACHE_LOOKUPS.labels(current_message_type.get(), outcome).inc()
+
+
+def record_precheck_rejection(reason: str):
+    PRECHECK_REJECTIONS.labels(current_message_type.get(), reason).inc()
+
+
+# Seconds between the message being published and processing starting, None if unknown
+def queue_wait_seconds(published_date):
+    if not published_date:
+        return None
+    try:
+        published = datetime.fromisoformat(str(published_date).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    now = datetime.now(timezone.utc) if published.tzinfo else datetime.now()
+    return max((now - published).total_seconds(), 0.0)
+
+
+# Labels everything recorded on this thread with the message type, counts the
+# message as in flight and records how long it waited in the queue and took
+@contextmanager
+def track_message(message_type, published_date=None):
+    message_type = message_type or UNKNOWN_MESSAGE_TYPE
+    token = current_message_type.set(message_type)
+    waited = queue_wait_seconds(published_date)
+    if waited is not None:
+        STAGE_SECONDS.labels('queue_wait', message_type).observe(waited)
+    phase = 'first' if next(_messages_started) == 0 else 'steady'
+    IN_FLIGHT.labels(message_type).inc()
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        MESSAGE_SECONDS.labels(message_type, phase).observe(time.perf_counter() - start_time)
+        IN_FLIGHT.labels(message_type).dec()
+        current_message_type.reset(token)
+
+
+def render():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -6,14 +6,33 @@ class ValidationResult:
     validation_message: str
 
 
+# Raises TypeError unless value is a string (or None when optional), so a malformed
+# payload fails when it is decoded instead of halfway through its validation
+def _string(value, name: str, default=''):
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise TypeError(f'Invalid parameter, {name} must be a string')
+    return value
+
+
+# Upload request read from the bus. The fields are slots and are read once from the
+# received message, without going through intermediate dictionaries.
 class Upload:
+    __slots__ = ('_message', '_message_type', '_message_id', '_published_date', 'data')
 
     def __init__(self, data: dict):
-        upload_data = data.get('data', None)
-        self._message = data.get('message', None)
-        self._message_type = data.get('messageType', None)
-        self._message_id = data.get('messageId', '')
-        self.data = UploadData(data=upload_data) if upload_data else {}
+        self._decode(data.get('messageId', ''), data.get('messageType', None), data.get('publishedDate', None),
+                     data.get('message', None), data.get('data', None))
+
+    def _decode(self, message_id, message_type, published_date, message, data):
+        self._message_id = _string(message_id, 'messageId')
+        self._message_type = _string(message_type, 'messageType', None)
+        self._published_date = _string(published_date, 'publishedDate', None)
+        self._message = message
+        if data and not isinstance(data, dict):
+            raise TypeError('Invalid parameter, data must be an object')
+        self.data = UploadData(data=data or {})
 
     @property
     def message(self):
@@ -39,27 +58,48 @@ class Upload:
     def message_id(self, value):
         self._message_id = value
 
-    def to_json(self):
-        self.data = self.data.to_json()
-        return to_json(self.__dict__)
+    @property
+    def published_date(self):
+        return self._published_date
 
+    def to_json(self):
+        return {
+            'message': self._message,
+            'message_type': self._message_type,
+            'message_id': self._message_id,
+            'published_date': self._published_date,
+            'data': self.data.to_json()
+        }
+
+    # Decodes a QueueMessage straight from its attributes, a JSON string or a dict
     def data_from(self):
         message = self
         if isinstance(message, str):
             message = json.loads(self)
-        if message:
-            try:
-                return Upload(data=message)
-            except Exception as e:
-                error = str(e).replace('Upload', 'Invalid parameter,')
-                raise TypeError(error)
+        if not message:
+            return None
+        if isinstance(message, dict):
+            return Upload(data=message)
+        if isinstance(message, list) or not hasattr(message, 'messageId'):
+            raise TypeError('Invalid parameter, expected a message object')
+        # QueueMessage fills a missing publishedDate with the time it was imported, which
+        # would make the queue wait the uptime of the service. That date is unknown.
+        published_date = message.publishedDate or None
+        if published_date == getattr(type(message), 'publishedDate', None):
+            published_date = None
+        upload = Upload.__new__(Upload)
+        upload._decode(message.messageId, message.messageType or None, published_date,
+                       message.message or None, message.data)
+        return upload
 
 
 class UploadData:
+    __slots__ = ('_file_upload_path', '_tdei_project_group_id', '_user_id', '_success', '_message')
+
     def __init__(self, data: dict):
-        self._file_upload_path = data.get('file_upload_path', '')
-        self._tdei_project_group_id = data.get('tdei_project_group_id', '')
-        self._user_id = data.get('user_id', '')
+        self._file_upload_path = _string(data.get('file_upload_path', ''), 'file_upload_path')
+        self._tdei_project_group_id = _string(data.get('tdei_project_group_id', ''), 'tdei_project_group_id')
+        self._user_id = _string(data.get('user_id', ''), 'user_id')
         self._success = data.get('success', False)
         self._message = data.get('message', '')
 
@@ -94,7 +134,13 @@ class UploadData:
     def message(self, value): self._message = value
 
     def to_json(self):
-        return to_json(self.__dict__)
+        return {
+            'file_upload_path': self._file_upload_path,
+            'tdei_project_group_id': self._tdei_project_group_id,
+            'user_id': self._user_id,
+            'success': self._success,
+            'message': self._message
+        }
 
 
 def remove_underscore(string: str):
@@ -1,13 +1,28 @@
-import gc
 import logging
 import urllib.parse
+from contextlib import nullcontext
 from typing import List
 from python_ms_core import Core
 from python_ms_core.core.queue.models.queue_message import QueueMessage
 from python_ms_core.core.auth.models.permission_request import PermissionRequest
 from .validation import Validation
+from .validation_pool import ValidationPool, warm_up
+from .result_cache import ResultCache
+from .dedup_store import DedupStore
+from .permission_cache import PermissionCache
+from .publisher import ResultPublisher
+from .memory_governor import memory_governor
+from .scratch_space import scratch_space, ScratchSpaceFull
+from . import metrics
+from .pipeline import ValidationPipeline, pipeline_stage
+from .memory_budget import MemoryBudget, MB
+from .concurrency_controller import AdaptiveLimit, ConcurrencyController
+from .priority_lanes import PriorityLanes, INTERACTIVE_LANE, STANDARD_LANE, BULK_LANE
+from .in_flight import InFlightRegistry
+from .local_transport import LocalCore, SpoolTopic
 from .models.queue_message_content import Upload, ValidationResult
 from .config import Settings
+from .runtime_config import runtime_config
 import threading
 import python_osw_validation
 
@@ -17,32 +32,202 @@ logger.setLevel(logging.INFO)
 
 
 class OSWValidator:
-    _settings = Settings()
+    permission_cache = None
+    pipeline = None
+    memory_budget = None
+    concurrency_limit = None
+    concurrency_controller = None
+    priority_lanes = None
+    in_flight = None
+    dedup_store = None
 
     def __init__(self):
-        self.core = Core()
+        # Settings the service is built from, reloads go through apply_config
+        self._settings = runtime_config.settings
+        # Downloads left behind by a crashed run
+        scratch_space.sweep()
+        # Archives validated in this process are extracted under the scratch root too
+        scratch_space.use_for_temp_files()
+        if self._settings.transport.lower() == 'local':
+            self.core = LocalCore(spool_dir=self._settings.spool_dir, storage_dir=self._settings.local_storage_dir,
+                                  visibility_timeout=self._settings.spool_visibility_timeout,
+                                  max_deliveries=self._settings.spool_max_deliveries)
+        else:
+            self.core = Core()
         options = {
             'provider': self._settings.auth_provider,
             'api_url': self._settings.auth_permission_url
         }
         listening_topic_name = self._settings.event_bus.upload_topic or ''
         self.subscription_name = self._settings.event_bus.upload_subscription or ''
-        self.listening_topic = self.core.get_topic(topic_name=listening_topic_name, max_concurrent_messages=self._settings.max_concurrent_messages)
+        max_concurrent_messages = self._settings.max_concurrent_messages
+        self.pipeline = None
+        if self._settings.prefetch_depth > 0:
+            self.pipeline = ValidationPipeline(
+                download_concurrency=self._settings.download_concurrency,
+                validation_concurrency=self._settings.validation_concurrency or max_concurrent_messages,
+                publish_concurrency=self._settings.publish_concurrency,
+                prefetch_depth=self._settings.prefetch_depth
+            )
+            # Receive enough messages to keep the download stage ahead of validation
+            max_concurrent_messages = self.pipeline.max_in_flight
+        self.memory_budget = None
+        if self._settings.memory_budget_mb > 0:
+            # Admission is by estimated memory, MAX_CONCURRENT_MESSAGES only caps how many are received
+            self.memory_budget = MemoryBudget(
+                budget_bytes=self._settings.memory_budget_mb * MB,
+                large_file_bytes=self._settings.large_file_mb * MB,
+                large_lane_concurrency=self._settings.large_lane_concurrency,
+                estimate_factor=self._settings.memory_estimate_factor,
+                estimate_base_bytes=self._settings.memory_estimate_base_mb * MB
+            )
+        self.priority_lanes = None
+        if self._settings.priority_lanes:
+            reserved = {INTERACTIVE_LANE: int(self._settings.interactive_lane_reserved),
+                        STANDARD_LANE: int(self._settings.standard_lane_reserved),
+                        BULK_LANE: int(self._settings.bulk_lane_reserved)}
+            # By default the reserved slots come on top of MAX_CONCURRENT_MESSAGES, so the
+            # lanes do not take slots away from the messages that are not interactive
+            self.priority_lanes = PriorityLanes(
+                concurrency=int(self._settings.lane_concurrency) or int(max_concurrent_messages) + sum(reserved.values()),
+                reserved=reserved,
+                interactive_types=[message_type.strip()
+                                   for message_type in self._settings.interactive_message_types.split(',')],
+                bulk_file_bytes=int(self._settings.large_file_mb) * MB,
+                max_wait=float(self._settings.lane_max_wait)
+            )
+            # Lanes only reorder messages already received. The extra receive slots let a
+            # message of a reserved lane reach the service while the others hold every slot.
+            lane_receive = self.priority_lanes.concurrency + sum(self.priority_lanes.reserved.values())
+            max_concurrent_messages = max(int(max_concurrent_messages), lane_receive)
+            if max_concurrent_messages <= self.priority_lanes.concurrency:
+                logger.warning(f'Priority lanes receive {max_concurrent_messages} messages and validate as many at '
+                               f'once, they cannot reorder anything. Set MAX_CONCURRENT_MESSAGES above '
+                               f'LANE_CONCURRENCY or reserve slots for a lane.')
+        self.concurrency_limit = None
+        self.concurrency_controller = None
+        if self._settings.adaptive_concurrency:
+            # MAX_CONCURRENT_MESSAGES is received at once, the controller decides how many of them validate
+            self.concurrency_limit = AdaptiveLimit(initial=int(self._settings.min_concurrent_messages),
+                                                   minimum=int(self._settings.min_concurrent_messages),
+                                                   maximum=int(max_concurrent_messages))
+            self.concurrency_controller = ConcurrencyController(
+                limit=self.concurrency_limit,
+                interval=float(self._settings.concurrency_interval),
+                cpu_target=float(self._settings.concurrency_cpu_target),
+                rss_limit_bytes=int(self._settings.concurrency_rss_limit_mb) * MB,
+                latency_tolerance=float(self._settings.concurrency_latency_tolerance)
+            )
+            self.concurrency_controller.start()
+        self.listening_topic = self.core.get_topic(topic_name=listening_topic_name, max_concurrent_messages=max_concurrent_messages)
+        # The topics size their thread pools when created, a reload can lower what is received but not go past this
+        self.receive_capacity = max_concurrent_messages
+        self.publisher = ResultPublisher(
+            topic=self.core.get_topic(topic_name=self._settings.event_bus.validation_topic),
+            batch_size=self._settings.publish_batch_size,
+            batch_interval=self._settings.publish_batch_interval
+        )
         self.logger = self.core.get_logger()
         self.storage_client = self.core.get_storage_client()
         self.auth = self.core.get_authorizer(config=options)
+        if self._settings.permission_cache_size > 0:
+            self.permission_cache = PermissionCache(
+                positive_ttl=self._settings.permission_cache_ttl,
+                negative_ttl=self._settings.permission_cache_negative_ttl,
+                max_entries=self._settings.permission_cache_size
+            )
+        self.validation_pool = None
+        if self._settings.validation_workers > 0:
+            self.validation_pool = ValidationPool(
+                max_workers=self._settings.validation_workers,
+                max_tasks_per_child=self._settings.validation_max_tasks_per_child,
+                in_archive=self._settings.validate_in_archive,
+                start_method=self._settings.validation_start_method
+            )
+        if self._settings.warm_up:
+            warm_up(in_archive=self._settings.validate_in_archive)
+            if self.validation_pool:
+                # Start the workers before the first message. Forked workers inherit the
+                # warmed parent, with the startup objects frozen so collections in the
+                # workers do not write to the shared pages
+                memory_governor.freeze()
+                self.validation_pool.start()
+        self.result_cache = None
+        if self._settings.result_cache_size > 0:
+            self.result_cache = ResultCache(path=self._settings.result_cache_path,
+                                            max_entries=self._settings.result_cache_size)
+        self.dedup_store = None
+        if float(self._settings.dedup_ttl) > 0:
+            self.dedup_store = DedupStore(path=self._settings.dedup_path, ttl=float(self._settings.dedup_ttl),
+                                          max_entries=int(self._settings.dedup_max_entries))
+        self.in_flight = InFlightRegistry()
+        runtime_config.subscribe(self.apply_config)
         self.listener_thread = threading.Thread(target=self.start_listening)
         self.listener_thread.start()
 
     def start_listening(self):
         def process(message) -> None:
             if message is not None:
-                queue_message = QueueMessage.to_dict(message)
-                upload_message = Upload.data_from(queue_message)
-                self.validate(received_message=upload_message)
+                try:
+                    upload_message = Upload.data_from(message)
+                except (TypeError, ValueError) as e:
+                    self.reject(message, e)
+                    return
+                with (self.in_flight.track(upload_message.message_id) if self.in_flight else nullcontext()), \
+                        memory_governor.track(upload_message.message_id), \
+                        metrics.track_message(upload_message.message_type, upload_message.published_date):
+                    self.validate(received_message=upload_message)
 
         self.listening_topic.subscribe(subscription=self.subscription_name, callback=process)
 
+    def stop_receiving(self):
+        if isinstance(self.listening_topic, SpoolTopic):
+            self.listening_topic.close()
+        elif hasattr(self.listening_topic, 'max_concurrent_messages'):
+            # The service bus topic only receives max_concurrent_messages minus the ones in
+            # progress, so at 0 it stops receiving while the running ones still settle
+            self.listening_topic.max_concurrent_messages = 0
+
+    # Applies the tunables of a reloaded configuration to the objects built at startup.
+    # Settings read per message (max_errors, the container, download and precheck limits)
+    # need nothing here. The transport, topics, worker pool and pipeline need a restart.
+    def apply_config(self, settings: Settings, changed: List[str]):
+        if 'max_concurrent_messages' in changed:
+            self.set_max_concurrent_messages(int(settings.max_concurrent_messages))
+        spool_topic = self.listening_topic if isinstance(self.listening_topic, SpoolTopic) else None
+        tunables = [
+            ('permission_cache_ttl', self.permission_cache, 'positive_ttl', float),
+            ('permission_cache_negative_ttl', self.permission_cache, 'negative_ttl', float),
+            ('permission_cache_size', self.permission_cache, 'max_entries', int),
+            ('result_cache_size', self.result_cache, 'max_entries', int),
+            ('dedup_ttl', self.dedup_store, 'ttl', float),
+            ('dedup_max_entries', self.dedup_store, 'max_entries', int),
+            ('spool_visibility_timeout', spool_topic, 'visibility_timeout', float),
+            ('gc_soft_watermark_mb', memory_governor, 'soft_watermark', lambda value: int(value) * MB),
+            ('gc_hard_watermark_mb', memory_governor, 'hard_watermark', lambda value: int(value) * MB)
+        ]
+        for name, target, attribute, convert in tunables:
+            if name in changed and target is not None:
+                setattr(target, attribute, convert(getattr(settings, name)))
+        if {'scratch_quota_mb', 'scratch_expansion_factor', 'scratch_admission_timeout'} & set(changed):
+            scratch_space.configure(quota_bytes=int(settings.scratch_quota_mb) * MB,
+                                    expansion_factor=float(settings.scratch_expansion_factor),
+                                    admission_timeout=float(settings.scratch_admission_timeout))
+
+    def set_max_concurrent_messages(self, max_concurrent_messages: int):
+        if self.in_flight and self.in_flight.draining:
+            return
+        if max_concurrent_messages > self.receive_capacity:
+            logger.warning(f'MAX_CONCURRENT_MESSAGES of {max_concurrent_messages} is capped at '
+                           f'{self.receive_capacity} until the service restarts')
+        if self.concurrency_limit:
+            # Everything received is admitted by the controller, the maximum is what it may grow to
+            self.concurrency_limit.set_maximum(min(max_concurrent_messages, self.receive_capacity))
+        elif self.pipeline:
+            logger.warning('MAX_CONCURRENT_MESSAGES is not changed while the prefetching pipeline is on')
+        elif hasattr(self.listening_topic, 'max_concurrent_messages'):
+            self.listening_topic.max_concurrent_messages = max(1, min(max_concurrent_messages, self.receive_capacity))
+
     def validate(self, received_message: Upload):
         tdei_record_id: str = ''
         try:
@@ -55,26 +240,76 @@ class OSWValidator:
                 raise Exception(error_msg)
 
             if 'VALIDATION_ONLY' not in received_message.message_type:
-                if self.has_permission(roles=['tdei-admin', 'poc', 'osw_data_generator'],
-                                       queue_message=received_message) is None:
+                with metrics.observe_stage('authorization'):
+                    is_authorized = self.has_permission(roles=['tdei-admin', 'poc', 'osw_data_generator'],
+                                                        queue_message=received_message)
+                if is_authorized is None:
                     error_msg = 'Unauthorized request !'
                     logger.error(f'{tdei_record_id}, {error_msg}, {received_message}')
                     raise Exception(error_msg)
 
             file_upload_path = urllib.parse.unquote(received_message.data.file_upload_path)
+            if file_upload_path and self.dedup_store and tdei_record_id:
+                result = self.dedup_store.get(tdei_record_id, file_upload_path)
+                if result is not None:
+                    logger.info(f'{tdei_record_id} was already validated, publishing the stored result')
+                    metrics.record_dedup_hit()
+                    self.send_status(result=result, upload_message=received_message)
+                    return
             if file_upload_path:
-                validation_result = Validation(file_path=file_upload_path, storage_client=self.storage_client)
-                result = validation_result.validate()
+                max_errors = int(runtime_config.settings.max_errors)
+                validation_result = Validation(file_path=file_upload_path, storage_client=self.storage_client,
+                                               validation_pool=self.validation_pool,
+                                               result_cache=self.result_cache,
+                                               pipeline=self.pipeline,
+                                               memory_budget=self.memory_budget,
+                                               priority_lanes=self.priority_lanes,
+                                               message_type=received_message.message_type,
+                                               published_date=received_message.published_date)
+                # Latency is measured per MB of the zip, which is downloaded inside the slot
+                concurrency_slot = self.concurrency_limit.slot(size_of=lambda: validation_result.file_size) \
+                    if self.concurrency_limit else nullcontext()
+                # The lane comes first so the messages waiting for a slot start in priority order
+                with validation_result.lane_admission(), concurrency_slot:
+                    if self.pipeline:
+                        with self.pipeline.admit():
+                            result = validation_result.validate(max_errors=max_errors)
+                    else:
+                        result = validation_result.validate(max_errors=max_errors)
+                metrics.record_outcome('valid' if result.is_valid else 'invalid')
+                if self.dedup_store and tdei_record_id:
+                    # Stored before publishing, a redelivery after a failed publish reuses it
+                    self.dedup_store.put(tdei_record_id, file_upload_path, result)
                 self.send_status(result=result, upload_message=received_message)
             else:
                 raise Exception('File entity not found')
+        except ScratchSpaceFull as e:
+            # Not a result, the message goes back to the broker and is retried once there is room
+            logger.error(f'{tdei_record_id} Deferred, {e}')
+            raise
         except Exception as e:
             logger.error(f'{tdei_record_id} Error occurred while validating OSW request, {e}')
             result = ValidationResult()
             result.is_valid = False
             result.validation_message = f'Error occurred while validating OSW request {e}'
+            metrics.record_outcome('error')
             self.send_status(result=result, upload_message=received_message)
 
+    # A message that cannot be decoded still gets a failed result, published under its
+    # messageId and messageType when those can be read
+    def reject(self, message, error: Exception):
+        fields = message if isinstance(message, dict) else vars(message) if hasattr(message, '__dict__') else {}
+        message_id = fields.get('messageId')
+        message_type = fields.get('messageType')
+        logger.error(f'{message_id} Could not decode the message, {error}')
+        upload_message = Upload(data={'messageId': message_id if isinstance(message_id, str) else '',
+                                      'messageType': message_type if isinstance(message_type, str) else None})
+        result = ValidationResult()
+        result.is_valid = False
+        result.validation_message = f'Error occurred while validating OSW request {error}'
+        metrics.record_outcome('error')
+        self.send_status(result=result, upload_message=upload_message)
+
     def send_status(self, result: ValidationResult, upload_message: Upload):
         upload_message.data.success = result.is_valid
         upload_message.data.message = result.validation_message
@@ -84,18 +319,16 @@ class OSWValidator:
             'python-osw-validation': python_osw_validation.__version__
         }
 
-        data = QueueMessage.data_from({
-            'messageId': upload_message.message_id,
-            'messageType': upload_message.message_type,
-            'data': resp_data
-        })
+        data = QueueMessage(messageId=upload_message.message_id, messageType=upload_message.message_type or '',
+                            data=resp_data)
         try:
-            self.core.get_topic(topic_name=self._settings.event_bus.validation_topic).publish(data=data)
+            with pipeline_stage(self.pipeline, 'publish'), metrics.observe_stage('publish'):
+                self.publisher.publish(data=data)
             logger.info(f'Publishing message for : {upload_message.message_id}')
         except Exception as e:
             logger.error(f'Error occurred while publishing message for : {upload_message.message_id} with error: {e}')
         finally:
-            gc.collect()
+            memory_governor.checkpoint()
 
 
     def has_permission(self, roles: List[str], queue_message: Upload) -> bool:
@@ -106,11 +339,38 @@ class OSWValidator:
                 permissions=roles,
                 should_satisfy_all=False
             )
-            response = self.auth.has_permission(request_params=permission_request)
+            if self.permission_cache:
+                key = PermissionCache.make_key(user_id=queue_message.data.user_id,
+                                               project_group_id=queue_message.data.tdei_project_group_id,
+                                               roles=roles)
+                response = self.permission_cache.get_or_load(
+                    key, lambda: self.auth.has_permission(request_params=permission_request))
+            else:
+                response = self.auth.has_permission(request_params=permission_request)
             return response if response is not None else False
         except Exception as error:
             print('Error validating the request authorization:', error)
             return False
 
-    def stop_listening(self):
-        self.listener_thread.join(timeout=0) # Stop the thread during shutdown.Its still an attempt. Not sure if this will work.
\ No newline at end of file
+    # Stops receiving, waits up to grace_period seconds (DRAIN_GRACE_PERIOD by default) for
+    # the messages in progress to be validated and published, then releases everything.
+    # Messages still running after that are abandoned and redelivered by the broker.
+    def stop_listening(self, grace_period: float = None):
+        runtime_config.unsubscribe(self.apply_config)
+        self.stop_receiving()
+        if self.in_flight:
+            if grace_period is None:
+                grace_period = float(runtime_config.settings.drain_grace_period)
+            self.in_flight.drain(grace_period)
+        self.listener_thread.join(timeout=0) # Stop the thread during shutdown.Its still an attempt. Not sure if this will work.
+        if self.concurrency_controller:
+            self.concurrency_controller.stop()
+        if self.validation_pool:
+            self.validation_pool.shutdown(wait=False)
+        if self.result_cache:
+            self.result_cache.close()
+        if self.dedup_store:
+            self.dedup_store.close()
+        scratch_space.restore_temp_files()
+        scratch_space.drain()
+        self.publisher.close()
@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+from . import metrics
+
+
+class _PendingLookup:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PermissionCache:
+    def __init__(self, positive_ttl: float, negative_ttl: float, max_entries: int, clock=time.monotonic):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.lookup_seconds = 0.0
+        self._entries = OrderedDict()  # key -> (decision, expires_at)
+        self._pending = {}  # key -> _PendingLookup
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user_id: str, project_group_id: str, roles) -> tuple:
+        return user_id, project_group_id, tuple(sorted(roles))
+
+    # Returns the cached decision for key, or calls loader once for all the
+    # threads asking for the same key at the same time. Only True/False answers
+    # are cached; errors and None are handed back without being remembered.
+    def get_or_load(self, key: Hashable, loader: Callable):
+        start_time = time.perf_counter()
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[1] > self.clock():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        metrics.PERMISSION_LOOKUPS.labels('hit').inc()
+                        return entry[0]
+                    del self._entries[key]
+                pending = self._pending.get(key)
+                is_leader = pending is None
+                if is_leader:
+                    pending = _PendingLookup()
+                    self._pending[key] = pending
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+            metrics.PERMISSION_LOOKUPS.labels('miss' if is_leader else 'coalesced').inc()
+
+            if is_leader:
+                try:
+                    pending.value = loader()
+                except Exception as e:
+                    pending.error = e
+                finally:
+                    with self._lock:
+                        del self._pending[key]
+                        if pending.error is None and isinstance(pending.value, bool):
+                            self._store(key, pending.value)
+                    pending.done.set()
+            else:
+                pending.done.wait()
+
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+        finally:
+            elapsed = time.perf_counter() - start_time
+            metrics.PERMISSION_LOOKUP_SECONDS.observe(elapsed)
+            with self._lock:
+                self.lookup_seconds += elapsed
+
+    def _store(self, key: Hashable, decision: bool):
+        ttl = self.positive_ttl if decision else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (decision, self.clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'entries': len(self._entries),
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                'avg_lookup_ms': round(self.lookup_seconds * 1000 / lookups, 3) if lookups else 0.0
+            }
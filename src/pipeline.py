@@ -0,0 +1,65 @@
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class Stage:
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            self.waiting += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._semaphore.release()
+
+
+# Splits message processing into download, validation and publish stages, each
+# with its own concurrency limit, so the zips of the next messages download
+# while the CPU is busy validating. At most validation_concurrency + prefetch_depth
+# messages hold a zip on disk at any time; further messages wait in admit()
+# before downloading, which pushes back on the receiver.
+class ValidationPipeline:
+    def __init__(self, download_concurrency: int, validation_concurrency: int, publish_concurrency: int,
+                 prefetch_depth: int):
+        self.prefetch_depth = prefetch_depth
+        self.stages = {
+            'download': Stage('download', download_concurrency),
+            'validation': Stage('validation', validation_concurrency),
+            'publish': Stage('publish', publish_concurrency)
+        }
+        self._admission = threading.BoundedSemaphore(validation_concurrency + prefetch_depth)
+
+    # Number of messages the receiver should hand over at once
+    @property
+    def max_in_flight(self) -> int:
+        return self.stages['validation'].concurrency + self.prefetch_depth
+
+    @contextmanager
+    def admit(self):
+        with self._admission:
+            yield
+
+    def stage(self, name: str):
+        return self.stages[name].slot()
+
+    def stats(self) -> dict:
+        return {name: {'active': stage.active, 'waiting': stage.waiting} for name, stage in self.stages.items()}
+
+
+# Runs the block inside the pipeline stage when a pipeline is configured
+def pipeline_stage(pipeline, name: str):
+    return pipeline.stage(name) if pipeline else nullcontext()
@@ -0,0 +1,219 @@
+import os
+import re
+import zlib
+import zipfile
+import logging
+import posixpath
+from python_osw_validation.extracted_data_validator import OSW_DATASET_FILES, ALLOWED_OSW_03_FILENAMES
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_PRECHECK')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+# Complete JSON string literals
+JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Bytes that can appear in JSON outside of a string
+JSON_BYTES = b' \t\n\r{}[]:,0123456789eE.+-aeflnrstu'
+NON_JSON_BYTE = re.compile(rb'[^' + re.escape(JSON_BYTES) + rb']')
+UTF8_BOM = b'\xef\xbb\xbf'
+
+
+class PrecheckFailure:
+    def __init__(self, reason: str, message: str, filename: str = None):
+        self.reason = reason
+        self.message = message
+        self.filename = filename
+
+    # Same shape as the issues reported by OSWValidation
+    def issues(self) -> list:
+        return [{'filename': self.filename, 'feature_index': None, 'error_message': self.message}]
+
+
+class MalformedJson(Exception):
+    pass
+
+
+# Streams a JSON document and checks it is well formed: nothing but JSON tokens
+# outside of strings, every string terminated, brackets and braces balanced and
+# the document a single object. Strings are skipped with one regex pass per chunk,
+# so the check runs at C speed instead of per token and holds one chunk in memory.
+# Truncated, empty and binary files fail; misplaced commas or colons are left to
+# the full validator.
+class JsonStructureScanner:
+    def __init__(self, max_string_bytes: int = 64 * MB):
+        self.max_string_bytes = max_string_bytes
+        self.offset = 0
+        self.counts = {b'{': 0, b'}': 0, b'[': 0, b']': 0}
+        self.first = None
+        self.last = None
+        self._pending = b''
+
+    def feed(self, chunk: bytes):
+        data = self._pending + chunk
+        if self.offset == 0:
+            if len(data) < len(UTF8_BOM) and UTF8_BOM.startswith(data):
+                # Not enough bytes yet to tell a byte order mark apart
+                self._pending = data
+                return
+            if data.startswith(UTF8_BOM):
+                data = data[len(UTF8_BOM):]
+                self.offset = len(UTF8_BOM)
+        stripped = JSON_STRING.sub(b'', data)
+        quote = stripped.find(b'"')
+        if quote >= 0:
+            # A string left open at the end of the chunk. Nothing after it was removed,
+            # so it starts at the same distance from the end in the original chunk.
+            start = len(data) - (len(stripped) - quote)
+            self._pending = data[start:]
+            if len(self._pending) > self.max_string_bytes:
+                raise MalformedJson(f'string starting at byte {self.offset + start} is not terminated')
+            stripped = stripped[:quote]
+        else:
+            start = len(data)
+            self._pending = b''
+        if stripped.translate(None, JSON_BYTES):
+            invalid = NON_JSON_BYTE.search(stripped)
+            raise MalformedJson(f'unexpected byte {invalid.group()!r} near byte {self.offset + invalid.start()}')
+        for bracket in self.counts:
+            self.counts[bracket] += stripped.count(bracket)
+        significant = stripped.strip()
+        if significant:
+            if self.first is None:
+                self.first = significant[:1]
+            self.last = significant[-1:]
+        self.offset += start
+
+    def close(self):
+        if self._pending:
+            raise MalformedJson('file ends inside a string, it is truncated')
+        if self.first is None:
+            raise MalformedJson('file is empty')
+        if self.first != b'{':
+            raise MalformedJson('file is not a JSON object')
+        if self.counts[b'{'] != self.counts[b'}'] or self.counts[b'['] != self.counts[b']'] or self.last != b'}':
+            raise MalformedJson('brackets are not balanced, the file is truncated')
+
+
+# Cheap structural checks of an uploaded zip, run before the full validator.
+# Only the central directory is read to check the entries' names, count and sizes,
+# and the validator's own file name rules are applied to the member names. Then the
+# GeoJSON files the validator would load are streamed through JsonStructureScanner.
+# Anything rejected here would also fail full validation, so rejecting early only
+# changes how fast the upload fails.
+class StructuralPrecheck:
+    def __init__(self, max_members: int = 10000, max_ratio: float = 200, max_uncompressed_bytes: int = 0,
+                 chunk_size: int = 1024 * 1024):
+        self.max_members = max_members
+        self.max_ratio = max_ratio
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.chunk_size = chunk_size
+
+    def check(self, zipfile_path: str):
+        upload_name = os.path.basename(zipfile_path)
+        try:
+            archive = zipfile.ZipFile(zipfile_path)
+        except Exception as e:
+            return PrecheckFailure('corrupt_zip', f'Error extracting ZIP file: {e}', zipfile_path)
+        with archive:
+            entries = archive.infolist()
+            if not entries:
+                return PrecheckFailure('corrupt_zip', 'Error extracting ZIP file: ZIP file is empty', zipfile_path)
+            failure = self.check_entries(entries, upload_name)
+            if failure:
+                return failure
+            files, error = self.dataset_files(archive.namelist())
+            if error:
+                return PrecheckFailure('dataset_files', error, upload_name)
+            for member in files:
+                failure = self.check_json(archive, member)
+                if failure:
+                    return failure
+            return None
+
+    # The file name rules of the validator's ExtractedDataValidator, applied to the member
+    # names: GeoJSON files are looked for in the first folder of the zip and one level
+    # below it, hidden names excluded. Returns the members the validator would load and
+    # the error it would report, if any.
+    @staticmethod
+    def dataset_files(names: list):
+        folder = next((name for name in names if name.endswith('/')), '')
+        geojson_files = []
+        for depth in (1, 2):
+            for name in names:
+                parts = name[len(folder):].split('/') if name.startswith(folder) else []
+                if len(parts) == depth and parts[-1].endswith('.geojson') and \
+                        not any(not part or part.startswith('.') for part in parts):
+                    geojson_files.append(name)
+        if not geojson_files:
+            return [], 'No .geojson files found in the specified directory or its subdirectories.'
+        basenames = [posixpath.basename(name) for name in geojson_files]
+
+        if any(name.startswith('opensidewalks.') for name in basenames):
+            if any(name not in ALLOWED_OSW_03_FILENAMES for name in basenames):
+                return [], (f'Dataset contains non-standard file names. The only allowed file names are '
+                            f'{{{", ".join(ALLOWED_OSW_03_FILENAMES)}}}')
+            duplicates = [filename.split('.')[1] for filename in ALLOWED_OSW_03_FILENAMES
+                          if basenames.count(filename) > 1]
+            if duplicates:
+                return [], f'Multiple .geojson files of the same type found: {", ".join(duplicates)}.'
+            return [name for filename in ALLOWED_OSW_03_FILENAMES for name in geojson_files
+                    if posixpath.basename(name) == filename], None
+
+        keys = tuple(OSW_DATASET_FILES.keys())
+        unsupported = sorted({name for name in basenames if not any(key in name for key in keys)})
+        if unsupported:
+            return [], (f"Unsupported .geojson files present: {', '.join(unsupported)}. "
+                        f"Allowed file names are *.{{{', '.join(keys)}}}.geojson")
+        # Required files first, in the order the validator reports them
+        keys = sorted(keys, key=lambda key: not OSW_DATASET_FILES[key]['required'])
+        matches = {key: [name for name in geojson_files if key in posixpath.basename(name)] for key in keys}
+        missing = [key for key in keys if OSW_DATASET_FILES[key]['required'] and not matches[key]]
+        if missing:
+            return [], f'Missing required .geojson files: {", ".join(missing)}.'
+        duplicates = [key for key in keys if len(matches[key]) > 1]
+        if duplicates:
+            return [], f'Multiple .geojson files of the same type found: {", ".join(duplicates)}.'
+        return [matches[key][0] for key in keys if matches[key]], None
+
+    # Every entry counts, extraction would write __MACOSX and hidden entries too
+    def check_entries(self, entries, upload_name: str):
+        if self.max_members and len(entries) > self.max_members:
+            return PrecheckFailure('too_many_members',
+                                   f'ZIP file has {len(entries)} entries, at most {self.max_members} are allowed',
+                                   upload_name)
+        total_size = 0
+        for info in entries:
+            name = info.filename
+            if name.startswith('/') or '..' in posixpath.normpath(name).split('/'):
+                return PrecheckFailure('unsafe_path', f'ZIP entry {name} points outside the archive', upload_name)
+            if info.flag_bits & 0x1:
+                return PrecheckFailure('encrypted', f'ZIP entry {name} is encrypted', upload_name)
+            # Small entries are exempt, a few KB of repeated bytes legitimately compress very well
+            if self.max_ratio and info.file_size > info.compress_size * self.max_ratio + MB:
+                return PrecheckFailure('compression_ratio',
+                                       f'ZIP entry {name} expands {info.file_size // max(info.compress_size, 1)} '
+                                       f'times, more than the {self.max_ratio:g} allowed', upload_name)
+            total_size += info.file_size
+        if self.max_uncompressed_bytes and total_size > self.max_uncompressed_bytes:
+            return PrecheckFailure('uncompressed_size',
+                                   f'ZIP file expands to {total_size // MB} MB, more than the '
+                                   f'{self.max_uncompressed_bytes // MB} MB allowed', upload_name)
+        return None
+
+    def check_json(self, archive: zipfile.ZipFile, member: str):
+        filename = posixpath.basename(member)
+        scanner = JsonStructureScanner()
+        try:
+            with archive.open(member) as file:
+                while True:
+                    chunk = file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    scanner.feed(chunk)
+            scanner.close()
+        except MalformedJson as e:
+            return PrecheckFailure('malformed_json', f"Invalid JSON in '{filename}': {e}", filename)
+        except (zipfile.BadZipFile, OSError, EOFError, RuntimeError, NotImplementedError, zlib.error) as e:
+            return PrecheckFailure('corrupt_member', f"Could not read '{filename}' from the ZIP file: {e}", filename)
+        return None
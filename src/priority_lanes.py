@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_PRIORITY_LANES')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+INTERACTIVE_LANE = 'interactive'
+STANDARD_LANE = 'standard'
+BULK_LANE = 'bulk'
+# Highest priority first
+LANES = (INTERACTIVE_LANE, STANDARD_LANE, BULK_LANE)
+
+
+# Admits validations in priority lanes so a user waiting on a VALIDATION_ONLY check
+# does not queue behind multi-GB uploads. Messages are classified by message type
+# (interactive_types) and zip size: zips of at least bulk_file_bytes go to the bulk
+# lane, whatever their type.
+#
+# At most `concurrency` validations run at once. Each lane has `reserved` slots no
+# other lane may use; the rest are shared and go to the highest priority lane that
+# is waiting. Within a lane messages start in the order they arrived. A message
+# that has waited max_wait seconds goes ahead of the higher lanes for the next
+# shared slot, so a steady stream of interactive checks cannot starve uploads.
+class PriorityLanes:
+    def __init__(self, concurrency: int, reserved: dict = None, interactive_types=('VALIDATION_ONLY',),
+                 bulk_file_bytes: int = 256 * MB, max_wait: float = 300, clock=time.monotonic):
+        self.reserved = {lane: max(0, int((reserved or {}).get(lane, 0))) for lane in LANES}
+        # Lanes without reserved slots need at least one shared slot
+        unreserved = any(reserved == 0 for reserved in self.reserved.values())
+        self.concurrency = max(1, concurrency, sum(self.reserved.values()) + int(unreserved))
+        self.shared = self.concurrency - sum(self.reserved.values())
+        self.interactive_types = [message_type for message_type in interactive_types if message_type]
+        self.bulk_file_bytes = bulk_file_bytes
+        self.max_wait = max_wait
+        self.clock = clock
+        self.active = {lane: 0 for lane in LANES}
+        self.promoted = 0
+        self._waiting = {lane: deque() for lane in LANES}
+        self._condition = threading.Condition()
+
+    def lane(self, message_type, blob_size=None) -> str:
+        if blob_size is not None and blob_size >= self.bulk_file_bytes:
+            return BULK_LANE
+        if message_type and any(interactive in message_type for interactive in self.interactive_types):
+            return INTERACTIVE_LANE
+        return STANDARD_LANE
+
+    def _shared_in_use(self) -> int:
+        return sum(max(0, self.active[lane] - self.reserved[lane]) for lane in LANES)
+
+    # Lane the next shared slot goes to: the one whose first message has waited past
+    # max_wait the longest, otherwise the highest priority lane with a message waiting.
+    # Lanes with a free reserved slot do not need one.
+    def _next_shared_lane(self):
+        candidates = [lane for lane in LANES if self._waiting[lane] and self.active[lane] >= self.reserved[lane]]
+        now = self.clock()
+        starved = [lane for lane in candidates if now - self._waiting[lane][0][1] >= self.max_wait]
+        if starved:
+            return min(starved, key=lambda lane: self._waiting[lane][0][1])
+        return candidates[0] if candidates else None
+
+    # Every change of active or _waiting notifies the waiters, the time a message has
+    # waited is only compared when a slot frees
+    def _can_start(self, lane: str, ticket) -> bool:
+        if self._waiting[lane][0] is not ticket:
+            return False
+        if self.active[lane] < self.reserved[lane]:
+            return True
+        return self._shared_in_use() < self.shared and self._next_shared_lane() == lane
+
+    @contextmanager
+    def admit(self, lane: str, published_date=None):
+        start_time = self.clock()
+        ticket = (object(), start_time)
+        with self._condition:
+            self._waiting[lane].append(ticket)
+            try:
+                while not self._can_start(lane, ticket):
+                    self._condition.wait()
+                waited = self.clock() - start_time
+                if self.active[lane] >= self.reserved[lane] and \
+                        any(self._waiting[higher] for higher in LANES[:LANES.index(lane)]):
+                    self.promoted += 1
+                    logger.info(f' Started a message of the {lane} lane after {waited:.1f} seconds, '
+                                f'ahead of higher lanes')
+                self.active[lane] += 1
+            finally:
+                self._waiting[lane].remove(ticket)
+                # The next message of the lane may be able to start too
+                self._condition.notify_all()
+        # The wait in the broker and in the lane, or only the lane when the publish time is unknown
+        queue_wait = metrics.queue_wait_seconds(published_date)
+        metrics.LANE_QUEUE_WAIT.labels(lane).observe(queue_wait if queue_wait is not None else waited)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active[lane] -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {lane: {'reserved': self.reserved[lane], 'active': self.active[lane],
+                           'waiting': len(self._waiting[lane])} for lane in LANES}
@@ -0,0 +1,114 @@
+import json
+import time
+import logging
+import threading
+from typing import List
+from azure.servicebus import ServiceBusMessage
+from azure.servicebus.exceptions import MessageSizeExceededError
+from python_ms_core.core.queue.models.queue_message import QueueMessage
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_PUBLISHER')
+logger.setLevel(logging.INFO)
+
+
+# Long-lived publisher for validation results.
+# With batch_size <= 1 every publish() is sent straight away on the topic.
+# With a larger batch_size results are queued and sent from a background thread
+# once batch_size results are waiting or batch_interval seconds have passed
+# since the oldest one was queued.
+class ResultPublisher:
+    def __init__(self, topic, batch_size: int = 1, batch_interval: float = 0.5):
+        self.topic = topic
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.published = 0
+        self.failed = 0
+        self._pending: List[QueueMessage] = []
+        self._oldest_pending_at = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flusher = None
+        if self.is_batching:
+            self._flusher = threading.Thread(target=self._run, name='result-publisher', daemon=True)
+            self._flusher.start()
+
+    @property
+    def is_batching(self) -> bool:
+        return self.batch_size > 1
+
+    def publish(self, data: QueueMessage):
+        if not self.is_batching:
+            self.topic.publish(data=data)
+            self.published += 1
+            return
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Publisher is closed')
+            if not self._pending:
+                self._oldest_pending_at = time.monotonic()
+            self._pending.append(data)
+            # Wake the flusher so it arms the interval timer or sends a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and not self._is_batch_due():
+                    timeout = None
+                    if self._pending:
+                        timeout = max(self._oldest_pending_at + self.batch_interval - time.monotonic(), 0)
+                    self._condition.wait(timeout=timeout)
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                self._oldest_pending_at = time.monotonic() if self._pending else None
+                if not batch and self._closed:
+                    return
+            if batch:
+                self._send_batch(batch)
+
+    def _is_batch_due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self._oldest_pending_at >= self.batch_interval
+
+    def _send_batch(self, batch: List[QueueMessage]):
+        sender = getattr(self.topic, 'publisher', None)
+        try:
+            if sender is not None and callable(getattr(sender, 'create_message_batch', None)):
+                self._send_service_bus_batch(sender, batch)
+            else:
+                # Topics without a batch API (local topic) get the messages one by one
+                for data in batch:
+                    self.topic.publish(data=data)
+            self.published += len(batch)
+            logger.info(f'Published batch of {len(batch)} messages')
+        except Exception as e:
+            self.failed += len(batch)
+            ids = [data.messageId for data in batch]
+            logger.error(f'Error occurred while publishing batch for : {ids} with error: {e}')
+
+    @staticmethod
+    def _send_service_bus_batch(sender, batch: List[QueueMessage]):
+        message_batch = sender.create_message_batch()
+        for data in batch:
+            message = ServiceBusMessage(json.dumps(QueueMessage.to_dict(data)))
+            try:
+                message_batch.add_message(message)
+            except MessageSizeExceededError:
+                # Batch is full, send what we have and start a new one
+                sender.send_messages(message_batch)
+                message_batch = sender.create_message_batch()
+                message_batch.add_message(message)
+        sender.send_messages(message_batch)
+
+    # Sends whatever is still queued and stops the background thread
+    def close(self, timeout: float = None):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._flusher:
+            self._flusher.join(timeout=timeout)
@@ -0,0 +1,96 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional
+import python_osw_validation
+from . import metrics
+from .models.queue_message_content import ValidationResult
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_RESULT_CACHE')
+logger.setLevel(logging.INFO)
+
+
+class ResultCache:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    # Results are only reusable for the same bytes, validator release and error cap, and
+    # for the same message size limit (0 for the full list, as POST /validate returns it)
+    @staticmethod
+    def make_key(file_sha256: str, max_errors: int, max_message_bytes: int = 0) -> str:
+        return f'{file_sha256}:{python_osw_validation.__version__}:{max_errors}:{max_message_bytes}'
+
+    # Opens the database on first use so that creating the cache has no side effects
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, is_valid INTEGER NOT NULL, validation_message TEXT NOT NULL, '
+                'last_used REAL NOT NULL)'
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str) -> Optional[ValidationResult]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT is_valid, validation_message FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                metrics.record_result_cache_lookup('miss')
+                return None
+            connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+            connection.commit()
+            self.hits += 1
+        metrics.record_result_cache_lookup('hit')
+        result = ValidationResult()
+        result.is_valid = bool(row[0])
+        result.validation_message = row[1]
+        return result
+
+    def put(self, key: str, result: ValidationResult):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO results (key, is_valid, validation_message, last_used) VALUES (?, ?, ?, ?)',
+                (key, int(result.is_valid), result.validation_message, time.time())
+            )
+            # Evict the least recently used entries above the size bound
+            evicted = connection.execute(
+                'DELETE FROM results WHERE key IN '
+                '(SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+            connection.commit()
+            self.evictions += evicted
+        if evicted > 0:
+            metrics.RESULT_CACHE_EVICTIONS.inc(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,93 @@
+import gzip
+import json
+import uuid
+import logging
+from collections import Counter
+from python_ms_core.core.storage.providers.azure.azure_file_entity import AzureFileEntity
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_RESULT_ENCODING')
+logger.setLevel(logging.INFO)
+
+
+# Compact JSON of the issues, serialized once. orjson is several times faster than
+# the json module on large issue lists; the output is the same JSON without spaces.
+def encode_issues(issues) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(issues, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(issues, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+# Keeps the validation_message published on the bus under max_bytes. Issue lists
+# that fit are published as they are. Larger ones are written gzipped to storage
+# and the message carries the leading issues that fit, followed by a summary entry
+# (same keys as an issue) with the issue counts per file and the url of the full list.
+class ResultCompactor:
+    def __init__(self, max_bytes: int, container=None, prefix: str = 'validation-issues'):
+        self.max_bytes = max_bytes
+        self.container = container
+        self.prefix = prefix
+        # Set when the last list was cut and the full one could not be stored, such a
+        # message must not be cached as the result of the upload
+        self.incomplete = False
+
+    def compact(self, issues: list, key: str = None) -> str:
+        encoded = encode_issues(issues)
+        self.incomplete = False
+        if not self.max_bytes or len(encoded) <= self.max_bytes:
+            return encoded.decode()
+        issues_url = self.offload(encoded, key or uuid.uuid4().hex)
+        self.incomplete = issues_url is None
+        summary = self.summary(issues, issues_url)
+        location = summary['error_message']
+        # Sized with the longest count the message can show
+        summary['error_message'] = f'Showing {len(issues)} of {len(issues)} issues. {location}'
+        budget = self.max_bytes - len(encode_issues([summary])) - 1
+        shown = []
+        for issue in issues:
+            size = len(encode_issues(issue)) + 1
+            if size > budget:
+                break
+            budget -= size
+            shown.append(issue)
+        summary['error_message'] = f'Showing {len(shown)} of {len(issues)} issues. {location}'
+        return encode_issues(shown + [summary]).decode()
+
+    def summary(self, issues: list, issues_url) -> dict:
+        if issues_url:
+            message = f'The full list is at {issues_url}'
+        else:
+            message = 'The full list could not be stored'
+        return {
+            'filename': None,
+            'feature_index': None,
+            'error_message': message,
+            'total_issues': len(issues),
+            'issues_per_file': dict(Counter(str(issue.get('filename')) for issue in issues if isinstance(issue, dict))),
+            'issues_url': issues_url
+        }
+
+    # Uploads the full issue list gzipped, returns its url or None when it could not be stored
+    def offload(self, encoded: bytes, key: str):
+        if self.container is None:
+            return None
+        name = f'{self.prefix}/{key.replace(":", "-")}.json.gz'
+        try:
+            file = self.container.create_file(name)
+            if isinstance(file, AzureFileEntity):
+                # The name comes from the result key, a redelivered or revalidated upload
+                # writes the same list again. upload() would fail as the blob exists.
+                url = file.blob_client.upload_blob(file.file_path, gzip.compress(encoded), overwrite=True).url
+            else:
+                file.upload(gzip.compress(encoded))
+                url = file.get_remote_url()
+            logger.info(f' Stored {len(encoded)} bytes of issues at {url}')
+            return url
+        except Exception as e:
+            logger.error(f' Could not store the issues at {name}: {e}')
+            return None
@@ -0,0 +1,117 @@
+import os
+import logging
+import threading
+from typing import Callable, List
+from dotenv import dotenv_values
+from .config import Settings
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_RUNTIME_CONFIG')
+logger.setLevel(logging.INFO)
+
+
+# The configuration shared by the whole process, loaded once. reload() re-reads the
+# .env file and swaps in a new Settings snapshot; code that reads runtime_config.settings
+# per message sees the new values straight away and the subscribed listeners apply the
+# changed fields to the objects built from them at startup.
+#
+# Only the lines of the .env file that changed since it was last read are copied into
+# the environment, so variables set by the deployment are not replaced by stale values
+# in the file. Invalid values are rejected and the current settings kept.
+class RuntimeConfig:
+    def __init__(self, env_file: str, interval: float = 0, settings: Settings = None):
+        self.env_file = env_file
+        self.interval = interval
+        self.settings = settings or Settings()
+        self.version = 1
+        self._file_values = self._read_file()
+        self._mtime = self._file_mtime()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _read_file(self) -> dict:
+        return dotenv_values(self.env_file) if os.path.isfile(self.env_file) else {}
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.env_file).st_mtime_ns
+        except OSError:
+            return None
+
+    # listener(settings, changed) is called after every reload that changed something
+    def subscribe(self, listener: Callable):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # Returns the names of the settings that changed. Raises ValueError (pydantic's
+    # ValidationError) when the new values are invalid.
+    def reload(self) -> List[str]:
+        with self._lock:
+            self._mtime = self._file_mtime()
+            file_values = self._read_file()
+            previous_environ = {}
+            for key, value in file_values.items():
+                if value is not None and value != self._file_values.get(key):
+                    previous_environ[key] = os.environ.get(key)
+                    os.environ[key] = value
+            try:
+                settings = Settings()
+            except ValueError as e:
+                # Puts the environment back, the next reload compares against the same file
+                for key, value in previous_environ.items():
+                    if value is None:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+                metrics.CONFIG_RELOADS.labels('failed').inc()
+                logger.error(f' Configuration not reloaded, keeping the current settings: {e}')
+                raise
+            self._file_values = file_values
+            changed = [name for name in Settings.__fields__
+                       if getattr(settings, name) != getattr(self.settings, name)]
+            if not changed:
+                metrics.CONFIG_RELOADS.labels('unchanged').inc()
+                return changed
+            self.settings = settings
+            self.version += 1
+            metrics.CONFIG_RELOADS.labels('applied').inc()
+            logger.info(f' Configuration version {self.version}, changed: {", ".join(changed)}')
+            for listener in list(self._listeners):
+                try:
+                    listener(settings, changed)
+                except Exception as e:
+                    logger.error(f' Could not apply the new configuration: {e}')
+            return changed
+
+    # Polls the modification time of the .env file every interval seconds
+    def start_watching(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='config-watch', daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        self._stopped.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            if self._file_mtime() == self._mtime:
+                continue
+            try:
+                self.reload()
+            except ValueError:
+                pass
+
+
+_settings = Settings()
+runtime_config = RuntimeConfig(env_file=_settings.config_file, interval=float(_settings.config_reload_interval),
+                               settings=_settings)
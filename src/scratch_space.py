@@ -0,0 +1,203 @@
+import os
+import re
+import uuid
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import psutil
+from .runtime_config import runtime_config
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_SCRATCH_SPACE')
+logger.setLevel(logging.INFO)
+
+MB = 1024 * 1024
+# Name of the directories allocate() creates, <pid>-<24 hex characters>
+DIRECTORY_NAME = re.compile(r'^(\d+)-[0-9a-f]{24}$')
+
+
+class ScratchSpaceFull(Exception):
+    pass
+
+
+# Directories the downloads are written to, under one root that can be put on
+# tmpfs or a fast volume. Every directory is named after the process that owns it
+# so the ones left behind by a crashed process can be told apart and swept.
+#
+# With a quota, a validation reserves its estimated disk use (the zip plus its
+# extracted copy, unless it is validated inside the archive) before downloading and
+# waits while the reservations would exceed the quota. A reservation larger than
+# the whole quota is admitted once nothing else holds space. Released directories
+# are deleted on a background thread and their reservation only given back once
+# they are gone, so the quota follows what is really on disk.
+class ScratchSpace:
+    def __init__(self, root: str, quota_bytes: int = 0, expansion_factor: float = 10,
+                 admission_timeout: float = 300):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.expansion_factor = expansion_factor
+        self.admission_timeout = admission_timeout
+        self.reserved = {}
+        self.reclaimed = 0
+        self._allocated = set()
+        self._condition = threading.Condition()
+        self._reclaim_queue = queue.Queue()
+        self._thread = None
+        self.temp_dir = None
+        self._previous_tempdir = None
+
+    # Changes the limits while validations hold reservations, a larger quota admits
+    # the ones waiting straight away
+    def configure(self, quota_bytes: int, expansion_factor: float, admission_timeout: float):
+        with self._condition:
+            self.quota_bytes = quota_bytes
+            self.expansion_factor = expansion_factor
+            self.admission_timeout = admission_timeout
+            self._condition.notify_all()
+
+    @property
+    def in_use(self) -> int:
+        return sum(self.reserved.values())
+
+    # Disk space a validation of a zip of blob_size bytes is expected to need
+    def estimate(self, blob_size: int, in_archive: bool = False) -> int:
+        if in_archive:
+            return blob_size
+        return int(blob_size * (1 + self.expansion_factor))
+
+    # Creates a fresh directory for one validation
+    def allocate(self) -> str:
+        path = os.path.join(self.root, f'{os.getpid()}-{uuid.uuid4().hex[:24]}')
+        try:
+            os.mkdir(path)
+        except FileNotFoundError:
+            os.makedirs(path)
+        with self._condition:
+            self._allocated.add(path)
+        return path
+
+    def _fits(self, estimate: int) -> bool:
+        return not self.quota_bytes or not self.reserved or self.in_use + estimate <= self.quota_bytes
+
+    # Reserves the expected disk use of a zip of blob_size bytes (None if unknown) for
+    # the directory at path. Raises ScratchSpaceFull when there is still no room after
+    # admission_timeout seconds, so the message can be redelivered later.
+    def reserve(self, path: str, blob_size, in_archive: bool = False):
+        if not self.quota_bytes:
+            return
+        # Unknown sizes wait for the whole quota, they may be anything
+        estimate = self.quota_bytes if blob_size is None else self.estimate(blob_size, in_archive)
+        with self._condition:
+            if not self._fits(estimate):
+                logger.info(f' Waiting for {estimate // MB} MB of scratch space, '
+                            f'{self.in_use // MB} of {self.quota_bytes // MB} MB reserved')
+                if not self._condition.wait_for(lambda: self._fits(estimate), timeout=self.admission_timeout):
+                    raise ScratchSpaceFull(f'No room for {estimate // MB} MB of scratch space after '
+                                           f'{self.admission_timeout} seconds')
+            self.reserved[path] = self.reserved.get(path, 0) + estimate
+            metrics.SCRATCH_RESERVED.set(self.in_use)
+
+    # Hands the file or directory over to the background thread, returns straight away.
+    # Only paths under the root are ever removed.
+    def release(self, path: str):
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(self.root)]) != os.path.abspath(self.root):
+            logger.error(f' Not removing {path}, it is outside of {self.root}')
+            return
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='scratch-reclaim', daemon=True)
+                self._thread.start()
+        self._reclaim_queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._reclaim_queue.get()
+            if path is None:
+                break
+            try:
+                self.remove(path)
+            except Exception as e:
+                logger.error(f' Could not remove {path}: {e}')
+            finally:
+                with self._condition:
+                    self._allocated.discard(path)
+                    if self.reserved.pop(path, None) is not None:
+                        metrics.SCRATCH_RESERVED.set(self.in_use)
+                    self.reclaimed += 1
+                    self._condition.notify_all()
+                self._reclaim_queue.task_done()
+
+    @staticmethod
+    def remove(path: str):
+        if os.path.isfile(path):
+            logger.info(f' Removing File: {path}')
+            os.remove(path)
+        elif os.path.isdir(path):
+            logger.info(f' Removing Folder: {path}')
+            shutil.rmtree(path, ignore_errors=True)
+
+    # Removes what crashed runs left behind: directories of processes that are no
+    # longer running and directories of this process it did not allocate (the pid of a
+    # restarted container is often the same). Only directories named the way allocate()
+    # names them are touched, the root may be shared with other programs (/tmp, /dev/shm).
+    # Returns the number of entries removed.
+    def sweep(self) -> int:
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            match = DIRECTORY_NAME.match(name)
+            if not match or not os.path.isdir(path):
+                continue
+            pid = int(match.group(1))
+            if pid != os.getpid() and psutil.pid_exists(pid):
+                continue
+            with self._condition:
+                if path in self._allocated:
+                    continue
+            self.remove(path)
+            removed += 1
+        if removed:
+            logger.info(f' Swept {removed} orphaned entries from {self.root}')
+        metrics.SCRATCH_SWEPT.inc(removed)
+        return removed
+
+    # The validation library extracts with tempfile.mkdtemp(). Pointing tempfile at a
+    # directory of our own under the root puts what validations in this process extract
+    # on the scratch volume, and a crashed process's extractions are swept with the rest.
+    # Pool workers extract into the message's own directory instead (see validation_pool).
+    def use_for_temp_files(self) -> str:
+        if self.temp_dir is None:
+            self.temp_dir = self.allocate()
+            self._previous_tempdir = tempfile.tempdir
+            tempfile.tempdir = self.temp_dir
+        return self.temp_dir
+
+    # Points tempfile back where it was and releases the directory
+    def restore_temp_files(self):
+        if self.temp_dir is None:
+            return
+        if tempfile.tempdir == self.temp_dir:
+            tempfile.tempdir = self._previous_tempdir
+        self.release(self.temp_dir)
+        self.temp_dir = None
+
+    # Waits for the directories already released to be deleted
+    def drain(self):
+        self._reclaim_queue.join()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {'reserved': self.in_use, 'directories': len(self._allocated), 'reclaimed': self.reclaimed,
+                    'pending': self._reclaim_queue.qsize()}
+
+
+_settings = runtime_config.settings
+scratch_space = ScratchSpace(root=_settings.scratch_dir,
+                             quota_bytes=int(_settings.scratch_quota_mb) * MB,
+                             expansion_factor=float(_settings.scratch_expansion_factor),
+                             admission_timeout=float(_settings.scratch_admission_timeout))
@@ -1,19 +1,23 @@
-import gc
 import os
 import time
-import shutil
+import hashlib
 import logging
 import traceback
-from pathlib import Path
-from .config import Settings
+from contextlib import contextmanager, nullcontext
+from .runtime_config import runtime_config
 from python_osw_validation import OSWValidation
+from .archive_validation import ArchiveOSWValidation
+from .precheck import StructuralPrecheck, MB
 from .models.queue_message_content import ValidationResult
-import uuid
-import json
+from .validation_pool import ValidationWorkerError
+from .result_cache import ResultCache
+from .result_encoding import ResultCompactor
+from .memory_governor import memory_governor
+from .scratch_space import scratch_space
+from . import metrics
+from .pipeline import pipeline_stage
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-# Path used for download file generation.
-DOWNLOAD_DIR = f'{Path.cwd()}/downloads'
 
 logging.basicConfig()
 logger = logging.getLogger('OSW_VALIDATION')
@@ -21,20 +25,44 @@ logger.setLevel(logging.INFO)
 
 
 class Validation:
-    def __init__(self, file_path=None, storage_client=None):
-        settings = Settings()
+    def __init__(self, file_path=None, storage_client=None, validation_pool=None, result_cache=None, pipeline=None,
+                 memory_budget=None, priority_lanes=None, message_type=None, published_date=None,
+                 max_message_bytes=None):
+        # The shared configuration, reloaded values apply from the next message
+        settings = runtime_config.settings
         self.container_name = settings.event_bus.container_name
+        self.download_chunk_size = settings.download_chunk_size
+        self.validate_in_archive = settings.validate_in_archive
+        self.precheck = None
+        if settings.precheck_enabled:
+            self.precheck = StructuralPrecheck(max_members=int(settings.precheck_max_members),
+                                               max_ratio=float(settings.precheck_max_ratio),
+                                               max_uncompressed_bytes=int(settings.precheck_max_uncompressed_mb) * MB)
+        self.file_sha256 = None
+        self.file_size = 0
         self.storage_client = storage_client
+        self.validation_pool = validation_pool
+        self.result_cache = result_cache
+        self.pipeline = pipeline
+        self.memory_budget = memory_budget
+        self.priority_lanes = priority_lanes
+        self.message_type = message_type
+        self.published_date = published_date
+        self.blob_size = None
+        self._blob_size_read = False
+        self._remote_file = None
+        self._remote_file_read = False
+        self._lane_admitted = False
         self.file_path = file_path
         self.file_relative_path = file_path.split('/')[-1]
-        self.client = self.storage_client.get_container(container_name=self.container_name)
-        is_exists = os.path.exists(DOWNLOAD_DIR)
-        unique_id = self.get_unique_id()
-        if not is_exists:
-            os.makedirs(DOWNLOAD_DIR)
-        self.unique_dir_path = os.path.join(DOWNLOAD_DIR, unique_id)
-        if not os.path.exists(self.unique_dir_path):
-            os.makedirs(self.unique_dir_path)
+        # No storage client when the zip is uploaded directly (POST /validate)
+        self.client = self.storage_client.get_container(container_name=self.container_name) if storage_client else None
+        # Results published on the bus are cut to RESULT_MESSAGE_MAX_BYTES, 0 keeps the full list
+        if max_message_bytes is None:
+            max_message_bytes = int(settings.result_message_max_bytes)
+        self.result_compactor = ResultCompactor(max_bytes=max_message_bytes, container=self.client,
+                                                prefix=settings.result_overflow_prefix)
+        self.unique_dir_path = scratch_space.allocate()
 
     def validate(self, max_errors=20) -> ValidationResult:
         try:
@@ -49,58 +77,180 @@ class Validation:
         result.validation_message = ''
         root, ext = os.path.splitext(self.file_relative_path)
         if ext and ext.lower() == '.zip':
-            downloaded_file_path = self.download_single_file(self.file_path)
-            if downloaded_file_path:
-                logger.info(f' Downloaded file path: {downloaded_file_path}')
-                validator = OSWValidation(zipfile_path=downloaded_file_path)
-                validation_result = validator.validate(max_errors)
-                result.is_valid = validation_result.is_valid
-                if not result.is_valid:
-                    result.validation_message = json.dumps(validation_result.issues)
-                    logger.error(f' Error While Validating File: {json.dumps(validation_result.issues)}')
-                Validation.clean_up(downloaded_file_path)
-            else:
-                result.validation_message = 'Failed to validate because unknown file format'
+            blob_size = self.read_blob_size()
+            with self.lane_admission():
+                scratch_space.reserve(self.unique_dir_path, blob_size, in_archive=self.validate_in_archive)
+                with self.memory_admission(blob_size):
+                    with pipeline_stage(self.pipeline, 'download'), metrics.observe_stage('download'):
+                        downloaded_file_path = self.download_single_file(self.file_path)
+                    if downloaded_file_path:
+                        metrics.observe_download(self.file_size)
+                        logger.info(f' Downloaded file path: {downloaded_file_path}')
+                        result = self.validate_downloaded_file(downloaded_file_path, max_errors)
+                    else:
+                        result.validation_message = 'Failed to validate because unknown file format'
         else:
             result.validation_message = 'Failed to validate because unknown file format'
             logger.error(f' Failed to validate because unknown file format')
         end_time = time.time()
         time_taken = end_time - start_time
         logger.info(f'Validation completed in {time_taken} seconds')
-        gc.collect()
+        memory_governor.checkpoint()
+        return result
+
+    # Size of the zip when something admits by size, read once from the blob properties
+    def read_blob_size(self):
+        if not self._blob_size_read:
+            self._blob_size_read = True
+            if self.memory_budget or scratch_space.quota_bytes or self.priority_lanes:
+                self.blob_size = self.remote_file_size(self.file_path)
+        return self.blob_size
+
+    # Waits for a slot in the priority lane of this message. Entered again inside
+    # validate() when the caller already holds the slot, which then admits nothing.
+    @contextmanager
+    def lane_admission(self):
+        if not self.priority_lanes or self._lane_admitted:
+            yield
+            return
+        lane = self.priority_lanes.lane(self.message_type, self.read_blob_size())
+        with self.priority_lanes.admit(lane, published_date=self.published_date):
+            self._lane_admitted = True
+            try:
+                yield
+            finally:
+                self._lane_admitted = False
+
+    # Waits until the memory budget has room for this file, before downloading it
+    def memory_admission(self, blob_size):
+        if not self.memory_budget:
+            return nullcontext()
+        return self.memory_budget.admit(blob_size)
+
+    # The file entity of the upload, looked up once: on azure the lookup lists the whole
+    # container. None when no file matches, get_file_from_url then hands back the
+    # AzureFileEntity class instead of an instance.
+    def remote_file(self, file_upload_path):
+        if not self._remote_file_read:
+            file = self.storage_client.get_file_from_url(self.container_name, file_upload_path)
+            self._remote_file = None if file is None or isinstance(file, type) else file
+            self._remote_file_read = True
+        return self._remote_file
+
+    # Size of the blob read from its properties without downloading it, None if unknown
+    def remote_file_size(self, file_upload_path):
+        try:
+            file = self.remote_file(file_upload_path)
+            if file is None:
+                return None
+            return file.blob_client.get_blob_properties().size
+        except Exception as e:
+            logger.error(f' Could not read the size of {file_upload_path}: {e}')
+            return None
+
+    # Validates a zip that is already on disk, reusing a cached result for the same
+    # content when possible, and removes the zip afterwards
+    def validate_downloaded_file(self, downloaded_file_path, max_errors) -> ValidationResult:
+        result = ValidationResult()
+        result.is_valid = False
+        result.validation_message = ''
+        cache_key = None
+        cached_result = None
+        if self.result_cache and self.file_sha256:
+            cache_key = ResultCache.make_key(self.file_sha256, max_errors, self.result_compactor.max_bytes)
+            cached_result = self.result_cache.get(cache_key)
+        if cached_result:
+            logger.info(f' Using cached validation result for {self.file_sha256}, '
+                        f'cache stats: {self.result_cache.stats()}')
+            result = cached_result
+        else:
+            try:
+                failure = self.run_precheck(downloaded_file_path)
+                if failure:
+                    result.is_valid, issues = False, failure.issues()
+                else:
+                    with pipeline_stage(self.pipeline, 'validation'), metrics.observe_stage('validation'):
+                        result.is_valid, issues = self.run_validator(downloaded_file_path, max_errors)
+                if not result.is_valid:
+                    result.validation_message = self.result_compactor.compact(issues, key=cache_key or self.file_sha256)
+                    logger.error(f' Error While Validating File: {result.validation_message}')
+                # A list cut without the full one stored would be served as the whole result
+                if cache_key and not self.result_compactor.incomplete:
+                    self.result_cache.put(cache_key, result)
+            except ValidationWorkerError as e:
+                result.validation_message = str(e)
+        Validation.clean_up(downloaded_file_path)
         return result
 
+    # Structural checks that reject broken uploads before the full validator starts.
+    # Returns the PrecheckFailure or None when the zip passed (or the checks are off).
+    def run_precheck(self, zipfile_path):
+        if not self.precheck:
+            return None
+        with metrics.observe_stage('precheck'):
+            failure = self.precheck.check(zipfile_path)
+        if failure:
+            metrics.record_precheck_rejection(failure.reason)
+            logger.error(f' Rejected by the pre-check ({failure.reason}): {failure.message}')
+        return failure
+
+    # Runs the OSW validator in-process, or on the worker pool when one is configured.
+    # In archive mode the GeoJSON members are read from the zip without extracting it.
+    # Returns a tuple of (is_valid, issues)
+    def run_validator(self, zipfile_path, max_errors):
+        if self.validation_pool:
+            return self.validation_pool.validate(zipfile_path, max_errors)
+        validator_class = ArchiveOSWValidation if self.validate_in_archive else OSWValidation
+        validation_result = validator_class(zipfile_path=zipfile_path).validate(max_errors)
+        return validation_result.is_valid, validation_result.issues
+
     # Downloads the single file into a unique directory
     def download_single_file(self, file_upload_path=None) -> str:
-        file = self.storage_client.get_file_from_url(self.container_name, file_upload_path)
+        file = self.remote_file(file_upload_path)
         try:
-            if file.file_path:
+            if file is not None and file.file_path:
                 file_path = os.path.basename(file.file_path)
                 local_download_path = os.path.join(self.unique_dir_path, file_path)
+                digest = hashlib.sha256()
+                file_size = 0
                 with open(local_download_path, 'wb') as blob:
-                    blob.write(file.get_stream())
-                logger.info(f' File downloaded to location: {local_download_path}')
+                    for chunk in Validation.iter_file_chunks(file, int(self.download_chunk_size)):
+                        blob.write(chunk)
+                        digest.update(chunk)
+                        file_size += len(chunk)
+                self.file_sha256 = digest.hexdigest()
+                self.file_size = file_size
+                logger.info(f' File downloaded to location: {local_download_path} ({file_size} bytes)')
                 return local_download_path
             else:
                 logger.info(' File not found!')
         except Exception as e:
             traceback.print_exc()
             logger.error(e)
-        finally:
-            gc.collect()
 
-    # Generates a unique string for directory
-    def get_unique_id(self) -> str:
-        unique_id = uuid.uuid1().hex[0:24]
-        return unique_id
+    # Yields the file content in chunks of at most chunk_size bytes so that the
+    # whole blob never has to be held in memory.
+    @staticmethod
+    def iter_file_chunks(file, chunk_size):
+        blob_client = getattr(file, 'blob_client', None)
+        if blob_client is not None and callable(getattr(blob_client, 'download_blob', None)):
+            downloader = blob_client.download_blob()
+            while True:
+                chunk = downloader.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            # Providers without a streaming API hand back the full content
+            content = file.get_stream()
+            if isinstance(content, str):
+                content = content.encode()
+            view = memoryview(content)
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size]
 
+    # The file or folder is deleted on the scratch space's background thread, off the message's path
     @staticmethod
     def clean_up(path):
-        if os.path.isfile(path):
-            logger.info(f' Removing File: {path}')
-            os.remove(path)
-        else:
-            # folder = os.path.join(DOWNLOAD_FILE_PATH, path)
-            logger.info(f' Removing Folder: {path}')
-            shutil.rmtree(path, ignore_errors=False)
-        gc.collect()
+        with metrics.observe_stage('cleanup'):
+            scratch_space.release(path)
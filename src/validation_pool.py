@@ -0,0 +1,149 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from python_osw_validation import OSWValidation
+from .archive_validation import ArchiveOSWValidation
+from . import metrics
+
+logging.basicConfig()
+logger = logging.getLogger('OSW_VALIDATION_POOL')
+logger.setLevel(logging.INFO)
+
+# Tiny valid OSW dataset validated once at startup
+WARM_UP_FIXTURE = os.path.join(os.path.dirname(__file__), 'assets', 'warmup.zip')
+
+
+class ValidationWorkerError(Exception):
+    pass
+
+
+# Runs inside the worker process, only picklable values cross the process boundary.
+# With in_archive the members are read straight out of the zip instead of being extracted.
+def run_validation(zipfile_path: str, max_errors: int, in_archive: bool = False):
+    validator_class = ArchiveOSWValidation if in_archive else OSWValidation
+    validation_result = validator_class(zipfile_path=zipfile_path).validate(max_errors)
+    return validation_result.is_valid, validation_result.issues
+
+
+# Runs run_validation in a pool worker, which handles one task at a time. The library
+# extracts with tempfile.mkdtemp(), so pointing tempfile at the directory the zip was
+# downloaded to puts the extracted copy in the message's scratch directory: it counts
+# against the message's reservation and goes away with the directory, even when the
+# worker is killed halfway through.
+def run_validation_in_worker(zipfile_path: str, max_errors: int, in_archive: bool = False):
+    previous_tempdir = tempfile.tempdir
+    tempfile.tempdir = os.path.dirname(os.path.abspath(zipfile_path))
+    try:
+        return run_validation(zipfile_path, max_errors, in_archive)
+    finally:
+        tempfile.tempdir = previous_tempdir
+
+
+# Validates the bundled fixture so the first real message does not pay for GDAL
+# driver registration, geopandas/pyogrio initialization, jsonschema_rs and the
+# schema files being read from disk. Returns the seconds it took, None on failure.
+def warm_up(in_archive: bool = False, fixture: str = WARM_UP_FIXTURE):
+    start_time = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            is_valid, issues = run_validation(shutil.copy(fixture, directory), 1, in_archive)
+    except Exception as e:
+        logger.error(f' Warm-up validation failed: {e}')
+        return None
+    elapsed = time.perf_counter() - start_time
+    if not is_valid:
+        logger.error(f' Warm-up fixture did not validate: {issues}')
+    logger.info(f' Warm-up validation took {elapsed:.2f} seconds in process {os.getpid()}')
+    metrics.WARM_UP_SECONDS.set(elapsed)
+    return elapsed
+
+
+# Modules the fork server imports once, every worker it forks starts with them loaded
+FORKSERVER_PRELOAD = [__name__, 'python_osw_validation', 'geopandas', 'pyogrio']
+
+
+# Workers come from a fork server by default. The service is already running threads
+# (uvicorn, the topics, the publisher...) when workers are started or recycled, and
+# forking a multithreaded process can leave a worker holding a lock no thread will ever
+# release. The fork server is a fresh single-threaded process that has imported the
+# validation libraries, so its workers share those pages and only run warm_up for the
+# rest. With fork the workers start warm from the parent, which is only safe when no
+# other thread is running.
+class ValidationPool:
+    def __init__(self, max_workers: int, max_tasks_per_child: int = 0, in_archive: bool = False,
+                 start_method: str = 'forkserver'):
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.in_archive = in_archive
+        if start_method not in multiprocessing.get_all_start_methods():
+            logger.info(f' Start method {start_method} is not available, using the platform default')
+            start_method = None
+        self.mp_context = multiprocessing.get_context(start_method)
+        if self.mp_context.get_start_method() == 'forkserver':
+            self.mp_context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._submitted = 0
+
+    # Submits the task to the current executor, replacing it once its workers have
+    # served max_tasks_per_child tasks each. The retired executor finishes the tasks it
+    # already has and its processes exit, which gives back any leaked memory. Submitting
+    # under the lock keeps another thread from retiring the executor in between.
+    def _submit(self, fn, *args):
+        with self._lock:
+            recycle_after = self.max_tasks_per_child * self.max_workers
+            if self._executor is not None and recycle_after and self._submitted >= recycle_after:
+                logger.info(f' Recycling validation workers after {self._submitted} tasks')
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._submitted = 0
+            self._submitted += 1
+            return self._executor, self._executor.submit(fn, *args)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        if self.mp_context.get_start_method() == 'fork':
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context,
+                                   initializer=warm_up, initargs=(self.in_archive,))
+
+    # Starts the workers now instead of on the first message. With fork, call it after
+    # warm_up (and gc.freeze) in the parent so the workers inherit the warm state.
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._submitted = 0
+            futures = [self._executor.submit(os.getpid) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+        logger.info(f' Started {self.max_workers} validation workers ({self.mp_context.get_start_method()})')
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def validate(self, zipfile_path: str, max_errors: int):
+        executor, future = self._submit(run_validation_in_worker, zipfile_path, max_errors, self.in_archive)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # A worker died (OOM kill, segfault in GDAL...). Start over with a fresh pool.
+            logger.error(f' Validation worker crashed while validating {zipfile_path}: {e}')
+            self._discard(executor)
+            raise ValidationWorkerError(f'Validation worker crashed: {e}')
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
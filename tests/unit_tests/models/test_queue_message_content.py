@@ -1,7 +1,8 @@
 import os
 import json
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import patch
+from python_ms_core.core.queue.models.queue_message import QueueMessage
 from src.models.queue_message_content import ValidationResult, Upload, UploadData, to_json
 
 current_dir = os.path.dirname(os.path.abspath(os.path.join(__file__, '../../')))
@@ -33,11 +34,20 @@ class TestUpload(unittest.TestCase):
         self.upload.message_id = 'New messageId'
         self.assertEqual(self.upload.message_id, 'New messageId')
 
+    def test_published_date(self):
+        upload = Upload({'messageId': '1', 'publishedDate': '2024-01-01T00:00:00Z', 'data': {}})
+        self.assertEqual(upload.published_date, '2024-01-01T00:00:00Z')
+
     def test_to_json(self):
-        self.upload.data.to_json = MagicMock(return_value={})
-        json_data = self.upload.to_json()
+        with patch.object(UploadData, 'to_json', return_value={}):
+            json_data = self.upload.to_json()
         self.assertIsInstance(json_data, dict)
         self.assertEqual(json_data['message_type'], 'workflow_identifier')
+        self.assertEqual(json_data['data'], {})
+
+    def test_to_json_leaves_data_alone(self):
+        self.upload.to_json()
+        self.assertIsInstance(self.upload.data, UploadData)
 
     def test_data_from(self):
         message = TEST_DATA
@@ -45,6 +55,43 @@ class TestUpload(unittest.TestCase):
         self.assertIsInstance(upload, Upload)
         self.assertEqual(upload.message_type, 'workflow_identifier')
 
+    def test_data_from_queue_message(self):
+        upload = Upload.data_from(QueueMessage.data_from(TEST_DATA))
+        self.assertIsInstance(upload, Upload)
+        self.assertEqual(upload.message_id, 'c8c76e89f30944d2b2abd2491bd95337')
+        self.assertEqual(upload.message_type, 'workflow_identifier')
+        self.assertEqual(upload.data.file_upload_path, TEST_DATA['data']['file_upload_path'])
+        self.assertEqual(upload.data.user_id, 'c59d29b6-a063-4249-943f-d320d15ac9ab')
+
+    def test_data_from_queue_message_without_published_date(self):
+        message = {key: value for key, value in TEST_DATA.items() if key != 'publishedDate'}
+        self.assertIsNone(Upload.data_from(QueueMessage.data_from(message)).published_date)
+        published = QueueMessage.data_from(dict(message, publishedDate='2024-01-01T00:00:00Z'))
+        self.assertEqual(Upload.data_from(published).published_date, '2024-01-01T00:00:00Z')
+
+    def test_data_from_empty(self):
+        self.assertIsNone(Upload.data_from({}))
+
+    def test_data_from_without_data(self):
+        upload = Upload.data_from({'messageId': '1', 'messageType': 'workflow_identifier'})
+        self.assertEqual(upload.data.file_upload_path, '')
+
+    def test_data_from_invalid_data(self):
+        with self.assertRaises(TypeError):
+            Upload.data_from({'messageId': '1', 'data': ['not', 'an', 'object']})
+
+    def test_data_from_invalid_field(self):
+        with self.assertRaises(TypeError):
+            Upload.data_from({'messageId': '1', 'data': {'file_upload_path': 42}})
+
+    def test_data_from_invalid_message(self):
+        with self.assertRaises(TypeError):
+            Upload.data_from(42)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.upload.unknown = 'value'
+
     def test_upload_to_json(self):
         json_data = self.upload.to_json()
         self.assertTrue(isinstance(json_data, dict))
@@ -74,6 +121,16 @@ class TestUploadData(unittest.TestCase):
         self.upload_data.message = 'SOME_MESSAGE'
         self.assertEqual(self.upload_data.message, 'SOME_MESSAGE')
 
+    def test_to_json(self):
+        self.upload_data.success = True
+        self.assertEqual(self.upload_data.to_json(), {
+            'file_upload_path': TEST_DATA['data']['file_upload_path'],
+            'tdei_project_group_id': '0b41ebc5-350c-42d3-90af-3af4ad3628fb',
+            'user_id': 'c59d29b6-a063-4249-943f-d320d15ac9ab',
+            'success': True,
+            'message': ''
+        })
+
 
 class TestToJson(unittest.TestCase):
     def test_to_json(self):
@@ -0,0 +1,78 @@
+import os
+import glob
+import zipfile
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from python_osw_validation import OSWValidation
+from src.archive_validation import ArchiveOSWValidation, ZipArchive
+
+SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
+
+
+class TestArchiveOSWValidation(unittest.TestCase):
+
+    def assertSameResult(self, zipfile_path, max_errors=20):
+        expected = OSWValidation(zipfile_path=zipfile_path).validate(max_errors)
+        actual = ArchiveOSWValidation(zipfile_path=zipfile_path).validate(max_errors)
+        self.assertEqual(actual.is_valid, expected.is_valid, zipfile_path)
+        self.assertEqual(actual.errors, expected.errors, zipfile_path)
+        self.assertEqual(actual.issues, expected.issues, zipfile_path)
+
+    def test_same_result_as_extracting_validator(self):
+        for zipfile_path in sorted(glob.glob(f'{SAVED_FILE_PATH}/*.zip')):
+            for max_errors in (1, 20):
+                self.assertSameResult(zipfile_path, max_errors)
+
+    @patch('python_osw_validation.zipfile_handler.tempfile.mkdtemp')
+    def test_nothing_is_extracted(self, mock_mkdtemp):
+        result = ArchiveOSWValidation(zipfile_path=f'{SAVED_FILE_PATH}/valid.zip').validate()
+        self.assertTrue(result.is_valid)
+        mock_mkdtemp.assert_not_called()
+
+    def test_broken_archives(self):
+        with tempfile.TemporaryDirectory() as directory:
+            empty_file = os.path.join(directory, 'empty.zip')
+            open(empty_file, 'wb').close()
+            not_a_zip = os.path.join(directory, 'not_a_zip.zip')
+            with open(not_a_zip, 'wb') as file:
+                file.write(b'not a zip')
+            no_members = os.path.join(directory, 'no_members.zip')
+            zipfile.ZipFile(no_members, 'w').close()
+
+            for zipfile_path in (empty_file, not_a_zip, no_members, os.path.join(directory, 'missing.zip')):
+                self.assertSameResult(zipfile_path)
+
+
+class TestZipArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.archive = ZipArchive(f'{SAVED_FILE_PATH}/valid.zip')
+
+    def tearDown(self):
+        self.archive.close()
+
+    def test_glob_skips_hidden_and_nested_members(self):
+        matches = self.archive.glob(f'{self.archive.root}/valid/*.geojson')
+        self.assertEqual(sorted(os.path.basename(match) for match in matches), [
+            'wa.microsoft.graph.edges.OSW.geojson',
+            'wa.microsoft.graph.nodes.OSW.geojson',
+            'wa.microsoft.graph.points.OSW.geojson'
+        ])
+        self.assertEqual(self.archive.glob(f'{self.archive.root}/*.geojson'), [])
+
+    def test_exists_and_open(self):
+        self.assertTrue(self.archive.exists(f'{self.archive.root}/valid/'))
+        self.assertFalse(self.archive.exists(f'{self.archive.root}/other/'))
+        with self.archive.open(f'{self.archive.root}/valid/wa.microsoft.graph.nodes.OSW.geojson') as file:
+            self.assertIn('FeatureCollection', file.read())
+        with self.assertRaises(FileNotFoundError):
+            self.archive.open(f'{self.archive.root}/valid/missing.geojson')
+
+    def test_internal_folder(self):
+        self.assertEqual(self.archive.internal_folder(), 'valid/')
+
+
+if __name__ == '__main__':
+    unittest.main()
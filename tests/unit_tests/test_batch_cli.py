@@ -0,0 +1,118 @@
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from src.batch_cli import collect_paths, completed_paths, Progress, BatchValidator, main
+from src.validation_pool import ValidationWorkerError
+
+SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
+
+
+class TestBatchCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'results.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_output(self):
+        with open(self.output) as file:
+            return [json.loads(line) for line in file]
+
+    def test_collect_paths(self):
+        manifest = os.path.join(self.directory.name, 'manifest.txt')
+        os.symlink(SAVED_FILE_PATH, os.path.join(self.directory.name, 'files'))
+        with open(manifest, 'w') as file:
+            file.write('# backfill\nfiles/valid.zip\n\nfiles/invalid.zip\n')
+
+        paths = collect_paths([SAVED_FILE_PATH, f'{SAVED_FILE_PATH}/valid.zip'], [manifest])
+
+        self.assertEqual(len([path for path in paths if path.startswith(SAVED_FILE_PATH)]),
+                         len(os.listdir(SAVED_FILE_PATH)))
+        self.assertIn(os.path.join(self.directory.name, 'files', 'valid.zip'), paths)
+        self.assertEqual(len(paths), len(set(paths)))
+
+    def test_completed_paths_skips_truncated_line(self):
+        with open(self.output, 'w') as file:
+            file.write(json.dumps({'path': '/a.zip', 'is_valid': True}) + '\n')
+            file.write(json.dumps({'path': '/b.zip', 'is_valid': False, 'error': True}) + '\n')
+            file.write('{"path": "/c.zip", "is_va')
+
+        self.assertEqual(completed_paths(self.output), {'/a.zip', '/b.zip'})
+        self.assertEqual(completed_paths(self.output, retry_errors=True), {'/a.zip'})
+        self.assertEqual(completed_paths(os.path.join(self.directory.name, 'missing.jsonl')), set())
+
+    def test_progress_render(self):
+        now = [100.0]
+        progress = Progress(total=10, clock=lambda: now[0])
+        self.assertIn('ETA --:--:--', progress.render())
+
+        progress.update({'is_valid': True})
+        progress.update({'is_valid': False, 'error': True})
+        now[0] = 104.0
+
+        self.assertEqual(progress.render(), '2/10 files (1 valid, 0 invalid, 1 errors) 0.50 files/s ETA 00:00:16')
+
+    def test_run_writes_results(self):
+        batch = BatchValidator(output_path=self.output, workers=1, max_errors=10)
+        progress = batch.run([f'{SAVED_FILE_PATH}/valid.zip', f'{SAVED_FILE_PATH}/invalid.zip'])
+
+        records = {record['path']: record for record in self.read_output()}
+        self.assertTrue(records[f'{SAVED_FILE_PATH}/valid.zip']['is_valid'])
+        self.assertEqual(records[f'{SAVED_FILE_PATH}/valid.zip']['validation_message'], '')
+        self.assertFalse(records[f'{SAVED_FILE_PATH}/invalid.zip']['is_valid'])
+        self.assertNotEqual(json.loads(records[f'{SAVED_FILE_PATH}/invalid.zip']['validation_message']), [])
+        self.assertEqual((progress.done, progress.valid, progress.invalid), (2, 1, 1))
+
+    @patch('src.batch_cli.ValidationPool')
+    def test_worker_crash_is_recorded(self, mock_pool):
+        mock_pool.return_value.validate.side_effect = ValidationWorkerError('Validation worker crashed: boom')
+        batch = BatchValidator(output_path=self.output, workers=1)
+
+        progress = batch.run(['/crash.zip'])
+
+        self.assertEqual(self.read_output()[0]['error'], True)
+        self.assertEqual(progress.errors, 1)
+        mock_pool.return_value.shutdown.assert_called_once()
+
+    @patch('src.batch_cli.ValidationPool')
+    def test_unexpected_error_is_recorded_per_file(self, mock_pool):
+        def validate(path, max_errors):
+            if path == '/broken.zip':
+                raise OSError('disk')
+            return True, []
+        mock_pool.return_value.validate.side_effect = validate
+        batch = BatchValidator(output_path=self.output, workers=1)
+
+        progress = batch.run(['/broken.zip', '/valid.zip'])
+
+        records = {record['path']: record for record in self.read_output()}
+        self.assertTrue(records['/broken.zip']['error'])
+        self.assertIn('disk', records['/broken.zip']['validation_message'])
+        self.assertTrue(records['/valid.zip']['is_valid'])
+        self.assertEqual((progress.done, progress.errors), (2, 1))
+
+    @patch('src.batch_cli.ValidationPool')
+    def test_main_resumes(self, mock_pool):
+        mock_pool.return_value.validate.return_value = (True, [])
+        with open(self.output, 'w') as file:
+            file.write(json.dumps({'path': f'{SAVED_FILE_PATH}/valid.zip', 'is_valid': True}) + '\n')
+            file.write('{"path": "/truncat')
+
+        exit_code = main([f'{SAVED_FILE_PATH}/valid.zip', f'{SAVED_FILE_PATH}/invalid.zip',
+                          '--output', self.output, '--workers', '1'])
+
+        self.assertEqual(exit_code, 0)
+        mock_pool.return_value.validate.assert_called_once_with(f'{SAVED_FILE_PATH}/invalid.zip', 20)
+        with open(self.output) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[2])['path'], f'{SAVED_FILE_PATH}/invalid.zip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import time
+import threading
+import unittest
+import psutil
+from unittest.mock import patch, MagicMock
+from src.concurrency_controller import AdaptiveLimit, ConcurrencyController, MB
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+
+    def test_bounds(self):
+        limit = AdaptiveLimit(initial=10, minimum=2, maximum=4)
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.set_limit(0), 2)
+        self.assertEqual(limit.set_limit(100), 4)
+
+    def test_slot_limits_concurrency(self):
+        limit = AdaptiveLimit(initial=2, minimum=1, maximum=8)
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with limit.slot():
+                with lock:
+                    peak.append(limit.in_flight)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(limit.in_flight, 0)
+        self.assertEqual(limit.completed, 6)
+        self.assertIsNotNone(limit.latency)
+
+    def test_latency_is_per_megabyte(self):
+        limit = AdaptiveLimit(initial=1, minimum=1, maximum=1)
+        with patch('src.concurrency_controller.time.perf_counter', side_effect=[0.0, 8.0, 10.0, 11.0, 20.0, 21.0]):
+            with limit.slot(size_of=lambda: 4 * MB):
+                pass
+            self.assertEqual(limit.latency, 2.0)
+            # Small zips count as 1 MB
+            with limit.slot(size_of=lambda: 1024):
+                pass
+            self.assertAlmostEqual(limit.latency, 0.8 * 2.0 + 0.2 * 1.0)
+            # Nothing downloaded, nothing measured
+            with limit.slot(size_of=lambda: 0):
+                pass
+        self.assertEqual(limit.completed, 3)
+        self.assertEqual(limit.measured, 2)
+
+    def test_raising_the_limit_wakes_waiters(self):
+        limit = AdaptiveLimit(initial=1, minimum=1, maximum=2)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with limit.slot():
+                release.wait()
+
+        def second():
+            with limit.slot():
+                entered.set()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        waiter = threading.Thread(target=second)
+        waiter.start()
+        self.assertFalse(entered.wait(0.1))
+        limit.set_limit(2)
+        self.assertTrue(entered.wait(1))
+        release.set()
+        holder.join()
+        waiter.join()
+
+    def test_set_maximum_clamps_the_limit(self):
+        limit = AdaptiveLimit(initial=4, minimum=1, maximum=4)
+
+        self.assertEqual(limit.set_maximum(2), 2)
+        self.assertEqual(limit.maximum, 2)
+        self.assertEqual(limit.set_limit(8), 2)
+        limit.set_maximum(6)
+        self.assertEqual(limit.set_limit(8), 6)
+
+
+class TestConcurrencyController(unittest.TestCase):
+
+    def setUp(self):
+        self.limit = AdaptiveLimit(initial=4, minimum=1, maximum=8)
+        self.controller = ConcurrencyController(self.limit, cpu_target=80, rss_limit_bytes=1000 * MB,
+                                                latency_tolerance=2.0, decrease_factor=0.5)
+
+    def test_increases_when_limit_is_the_bottleneck(self):
+        self.limit.in_flight = 4
+        self.assertEqual(self.controller.step(cpu=40, rss=100 * MB, latency=1.0), 5)
+
+    def test_holds_when_idle(self):
+        self.limit.in_flight = 1
+        self.assertEqual(self.controller.step(cpu=10, rss=100 * MB, latency=None), 4)
+
+    def test_decreases_on_cpu_saturation(self):
+        self.limit.in_flight = 4
+        self.assertEqual(self.controller.step(cpu=95, rss=100 * MB, latency=None), 2)
+
+    def test_decreases_without_rss_headroom(self):
+        self.limit.in_flight = 4
+        self.assertEqual(self.controller.step(cpu=40, rss=1200 * MB, latency=None), 2)
+
+    def test_decreases_when_latency_grows(self):
+        self.limit.in_flight = 4
+        self.assertEqual(self.controller.step(cpu=40, rss=100 * MB, latency=1.0), 5)
+        self.assertEqual(self.controller.step(cpu=40, rss=100 * MB, latency=3.0), 2)
+
+    def test_respects_minimum(self):
+        self.limit.set_limit(1)
+        self.assertEqual(self.controller.step(cpu=95, rss=100 * MB, latency=None), 1)
+
+    @patch('src.concurrency_controller.metrics.CONCURRENCY_LIMIT')
+    def test_exports_limit(self, mock_gauge):
+        self.limit.in_flight = 4
+        self.controller.step(cpu=40, rss=100 * MB, latency=None)
+        mock_gauge.set.assert_called_with(5)
+
+    def test_sample(self):
+        cpu, rss = self.controller.sample()
+        self.assertGreaterEqual(cpu, 0)
+        self.assertGreater(rss, 0)
+
+    def test_sample_counts_unique_memory_of_children(self):
+        child = MagicMock(pid=123)
+        child.cpu_percent.return_value = 0.0
+        child.memory_full_info.return_value.uss = 10 * MB
+        child.memory_info.return_value.rss = 500 * MB
+        with patch.object(self.controller.process, 'children', return_value=[child]), \
+                patch.object(self.controller.process, 'memory_info', return_value=MagicMock(rss=600 * MB)):
+            _, rss = self.controller.sample()
+        self.assertEqual(rss, 610 * MB)
+
+    def test_unique_memory_falls_back_to_rss(self):
+        process = MagicMock()
+        process.memory_full_info.side_effect = psutil.AccessDenied()
+        process.memory_info.return_value.rss = 50 * MB
+        self.assertEqual(ConcurrencyController.unique_memory(process), 50 * MB)
+
+    def test_start_stop(self):
+        self.controller.interval = 0.01
+        self.limit.waiting = 1
+        self.controller.start()
+        time.sleep(0.1)
+        self.controller.stop()
+        self.assertFalse(self.controller._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
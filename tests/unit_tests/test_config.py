@@ -35,6 +35,15 @@ class TestSettings(unittest.TestCase):
         settings = Settings()
         self.assertEqual(settings.auth_provider, 'Hosted')
 
+    def test_event_bus_read_per_instance(self):
+        with patch.dict(os.environ, {'CONTAINER_NAME': 'first'}):
+            first = Settings()
+        with patch.dict(os.environ, {'CONTAINER_NAME': 'second'}):
+            second = Settings()
+        self.assertEqual(first.event_bus.container_name, 'first')
+        self.assertEqual(second.event_bus.container_name, 'second')
+        self.assertNotEqual(first.event_bus, second.event_bus)
+
     @patch.dict(os.environ, {'CONTAINER_NAME': 'osw'}, clear=True)
     def test_default_settings(self):
         # Reload config to pick up the patched environment and bypass .env values
@@ -45,6 +54,13 @@ class TestSettings(unittest.TestCase):
         self.assertEqual(settings.event_bus.container_name, 'osw')
         self.assertIsNone(settings.auth_permission_url)
         self.assertEqual(settings.max_concurrent_messages, 2)
+        self.assertEqual(settings.download_chunk_size, 4 * 1024 * 1024)
+        self.assertEqual(settings.result_cache_size, 1000)
+        self.assertEqual(settings.prefetch_depth, 0)
+        self.assertEqual(settings.transport, 'azure')
+        self.assertEqual(settings.validation_concurrency, 0)
+        self.assertEqual(settings.http_validation_concurrency, 1)
+        self.assertEqual(settings.http_validation_max_bytes, 50 * 1024 * 1024)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.dedup_store import DedupStore
+from src.models.queue_message_content import ValidationResult
+
+
+def make_result(is_valid, validation_message=''):
+    result = ValidationResult()
+    result.is_valid = is_valid
+    result.validation_message = validation_message
+    return result
+
+
+class TestDedupStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'cache', 'dedup.db')
+        self.store = DedupStore(path=self.path, ttl=60, max_entries=3, compact_interval=0)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_database_created_lazily(self):
+        self.assertFalse(os.path.exists(self.path))
+        self.store.get('message-1', 'path.zip')
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_get_stored_result(self):
+        self.assertIsNone(self.store.get('message-1', 'path.zip'))
+        self.store.put('message-1', 'path.zip', make_result(False, '[{"error_message": "x"}]'))
+
+        result = self.store.get('message-1', 'path.zip')
+
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.validation_message, '[{"error_message": "x"}]')
+        self.assertEqual(self.store.stats()['hits'], 1)
+
+    def test_keyed_on_message_and_path(self):
+        self.store.put('message-1', 'path.zip', make_result(True))
+        self.assertIsNone(self.store.get('message-1', 'other.zip'))
+        self.assertIsNone(self.store.get('message-2', 'path.zip'))
+
+    def test_result_survives_restart(self):
+        self.store.put('message-1', 'path.zip', make_result(True))
+        self.store.close()
+
+        reopened = DedupStore(path=self.path, ttl=60, max_entries=3)
+        try:
+            self.assertTrue(reopened.get('message-1', 'path.zip').is_valid)
+        finally:
+            reopened.close()
+
+    @patch('src.dedup_store.time.time')
+    def test_expired_entries_ignored_and_compacted(self, mock_time):
+        mock_time.return_value = 1000
+        self.store.put('message-1', 'path.zip', make_result(True))
+        mock_time.return_value = 1061
+
+        self.assertIsNone(self.store.get('message-1', 'path.zip'))
+        self.store.put('message-2', 'path.zip', make_result(True))
+
+        self.assertEqual(self.store.stats()['compacted'], 1)
+
+    def test_oldest_entries_beyond_max_removed(self):
+        for index in range(5):
+            self.store.put(f'message-{index}', 'path.zip', make_result(True))
+
+        self.assertIsNone(self.store.get('message-0', 'path.zip'))
+        self.assertIsNone(self.store.get('message-1', 'path.zip'))
+        self.assertIsNotNone(self.store.get('message-4', 'path.zip'))
+        self.assertEqual(self.store.stats()['compacted'], 2)
+
+    def test_compaction_shrinks_file(self):
+        for index in range(3):
+            self.store.put(f'message-{index}', 'path.zip', make_result(False, 'x' * 200000))
+        size = os.path.getsize(self.path)
+
+        self.store.max_entries = 0
+        self.store.compact()
+
+        self.assertLess(os.path.getsize(self.path), size / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
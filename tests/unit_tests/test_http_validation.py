@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from fastapi import FastAPI, Request, status
+from fastapi.testclient import TestClient
+from src.http_validation import HttpValidator
+from src.result_cache import ResultCache
+from src.scratch_space import scratch_space, ScratchSpaceFull
+
+SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
+
+
+def make_client(http_validator: HttpValidator) -> TestClient:
+    app = FastAPI()
+
+    @app.post('/validate')
+    async def validate(request: Request, max_errors: int = 20):
+        return await http_validator.handle(request, file_name='upload.zip', max_errors=max_errors)
+
+    return TestClient(app)
+
+
+def read(name: str) -> bytes:
+    with open(f'{SAVED_FILE_PATH}/{name}', 'rb') as file:
+        return file.read()
+
+
+class TestHttpValidator(unittest.TestCase):
+    def setUp(self):
+        # Scratch directories go to a temporary root, never the repository's downloads/
+        scratch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch_dir.cleanup)
+        scratch_root = patch.object(scratch_space, 'root', scratch_dir.name)
+        scratch_root.start()
+        self.addCleanup(scratch_root.stop)
+        self.addCleanup(scratch_space.drain)
+
+    def test_valid_upload(self):
+        client = make_client(HttpValidator())
+        response = client.post('/validate', content=read('valid.zip'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'is_valid': True, 'validation_message': ''})
+
+    def test_invalid_upload(self):
+        client = make_client(HttpValidator())
+        response = client.post('/validate', content=read('invalid.zip'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()['is_valid'])
+        self.assertNotEqual(response.json()['validation_message'], '')
+
+    def test_streamed_upload_over_limit(self):
+        data = read('valid.zip')
+        client = make_client(HttpValidator(max_bytes=len(data) - 1))
+
+        def chunks():
+            yield data[:1024]
+            yield data[1024:]
+
+        # Chunked upload, no Content-Length to check up front
+        with patch('src.validation.Validation.clean_up') as mock_clean_up:
+            response = client.post('/validate', content=chunks())
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_clean_up.assert_called_once()
+        os.remove(os.path.join(mock_clean_up.call_args[0][0], 'upload.zip'))
+        os.rmdir(mock_clean_up.call_args[0][0])
+
+    def test_content_length_over_limit(self):
+        client = make_client(HttpValidator(max_bytes=10))
+        response = client.post('/validate', content=read('valid.zip'))
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_saturated(self):
+        http_validator = HttpValidator(concurrency=1, retry_after=7)
+        client = make_client(http_validator)
+        http_validator._slots.acquire()
+        try:
+            response = client.post('/validate', content=read('valid.zip'))
+        finally:
+            http_validator._slots.release()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.headers['retry-after'], '7')
+        # The slot is free again
+        response = client.post('/validate', content=read('valid.zip'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_uses_result_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result_cache = ResultCache(path=os.path.join(directory, 'results.db'), max_entries=10)
+            http_validator = HttpValidator()
+            app = FastAPI()
+
+            @app.post('/validate')
+            async def validate(request: Request):
+                return await http_validator.handle(request, file_name='upload.zip', max_errors=20,
+                                                   result_cache=result_cache)
+
+            client = TestClient(app)
+            with patch('src.validation.Validation.run_validator', return_value=(True, [])) as mock_run:
+                first = client.post('/validate', content=read('valid.zip'))
+                second = client.post('/validate', content=read('valid.zip'))
+            result_cache.close()
+        mock_run.assert_called_once()
+        self.assertEqual(first.json(), second.json())
+
+    def test_issue_list_is_not_cut(self):
+        validation = HttpValidator._prepare('upload.zip', None)
+        self.addCleanup(validation.clean_up, validation.unique_dir_path)
+        self.assertEqual(validation.result_compactor.max_bytes, 0)
+
+    def test_reserves_scratch_space(self):
+        data = read('valid.zip')
+        client = make_client(HttpValidator())
+        with patch.object(scratch_space, 'reserve') as mock_reserve:
+            response = client.post('/validate', content=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_reserve.call_args[0][1], len(data))
+
+    def test_scratch_space_full(self):
+        client = make_client(HttpValidator(retry_after=9))
+        with patch.object(scratch_space, 'reserve', side_effect=ScratchSpaceFull('No room')):
+            response = client.post('/validate', content=read('valid.zip'))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.headers['retry-after'], '9')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import time
+import threading
+import unittest
+from prometheus_client import REGISTRY
+from src.in_flight import InFlightRegistry, Draining
+
+
+def shutdown_count(outcome):
+    return REGISTRY.get_sample_value('osw_validation_shutdown_messages_total', {'outcome': outcome}) or 0
+
+
+class TestInFlightRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = InFlightRegistry()
+
+    def run_message(self, message_id, seconds):
+        started = threading.Event()
+
+        def work():
+            with self.registry.track(message_id):
+                started.set()
+                time.sleep(seconds)
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+    def test_track_registers_message(self):
+        with self.registry.track('message-1'):
+            self.assertEqual(self.registry.in_flight(), ['message-1'])
+        self.assertEqual(self.registry.in_flight(), [])
+
+    def test_same_message_tracked_twice(self):
+        with self.registry.track('message-1'), self.registry.track('message-1'):
+            self.assertEqual(self.registry.in_flight(), ['message-1', 'message-1'])
+        self.assertEqual(self.registry.in_flight(), [])
+
+    def test_drain_waits_for_running_messages(self):
+        drained_before = shutdown_count('drained')
+        self.run_message('message-1', 0.1)
+
+        start = time.monotonic()
+        self.assertEqual(self.registry.drain(grace_period=5), (1, 0))
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(shutdown_count('drained'), drained_before + 1)
+
+    def test_drain_abandons_after_grace_period(self):
+        abandoned_before = shutdown_count('abandoned')
+        thread = self.run_message('message-1', 0.5)
+        self.run_message('message-2', 0.01)
+
+        self.assertEqual(self.registry.drain(grace_period=0.1), (1, 1))
+
+        self.assertEqual(self.registry.in_flight(), ['message-1'])
+        self.assertEqual(shutdown_count('abandoned'), abandoned_before + 1)
+        thread.join()
+
+    def test_drain_refuses_new_messages(self):
+        refused_before = shutdown_count('refused')
+        self.assertEqual(self.registry.drain(grace_period=0), (0, 0))
+
+        with self.assertRaises(Draining):
+            with self.registry.track('message-1'):
+                pass
+        self.assertEqual(shutdown_count('refused'), refused_before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from python_ms_core.core.queue.models.queue_message import QueueMessage
+from src.local_transport import DirectoryStorageClient, SpoolTopic, LocalCore
+
+
+def make_message(index):
+    return QueueMessage.data_from({
+        'messageId': str(index),
+        'messageType': 'workflow_identifier',
+        'data': {'file_upload_path': f'https://localstorage/osw/{index}.zip'}
+    })
+
+
+class TestDirectoryStorageClient(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.root.name, 'osw', 'uploads'))
+        with open(os.path.join(self.root.name, 'osw', 'uploads', 'my file.zip'), 'wb') as file:
+            file.write(b'0123456789')
+        self.client = DirectoryStorageClient(self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_get_file_from_url(self):
+        url = DirectoryStorageClient.url_for('osw', 'uploads/my file.zip')
+        file = self.client.get_file_from_url('osw', url)
+
+        self.assertEqual(file.name, 'my file.zip')
+        self.assertEqual(file.get_stream(), b'0123456789')
+        reader = file.blob_client.download_blob()
+        self.assertEqual([reader.read(4), reader.read(4), reader.read(4), reader.read(4)],
+                         [b'0123', b'4567', b'89', b''])
+        self.assertEqual(file.blob_client.get_blob_properties().size, 10)
+
+    def test_get_container(self):
+        container = self.client.get_container(container_name='osw')
+        self.assertEqual([file.name for file in container.list_files()], ['uploads'])
+
+    def test_create_file(self):
+        container = self.client.get_container(container_name='osw')
+        file = container.create_file('results/issues.json.gz')
+        file.upload(b'issues')
+
+        self.assertEqual(file.get_remote_url(), DirectoryStorageClient.url_for('osw', 'results/issues.json.gz'))
+        self.assertEqual(self.client.get_file_from_url('osw', file.get_remote_url()).get_stream(), b'issues')
+
+
+class TestSpoolTopic(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def make_topic(self, **kwargs):
+        kwargs.setdefault('poll_interval', 0.01)
+        return SpoolTopic(self.root.name, 'uploads', **kwargs)
+
+    # Subscribes on a thread until expected messages were delivered
+    def consume(self, topic, expected, callback=None):
+        received = []
+        done = threading.Event()
+
+        def handle(message):
+            received.append(message.messageId)
+            try:
+                if callback:
+                    callback(message)
+            finally:
+                if len(received) >= expected:
+                    done.set()
+
+        thread = threading.Thread(target=topic.subscribe, kwargs={'subscription': 'sub', 'callback': handle})
+        thread.start()
+        self.assertTrue(done.wait(5))
+        topic.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        return received
+
+    def test_publish_is_atomic_and_ordered(self):
+        topic = self.make_topic()
+        for index in range(3):
+            topic.publish(make_message(index))
+
+        self.assertEqual(os.listdir(topic.tmp_dir), [])
+        self.assertEqual(topic.pending(), 3)
+        self.assertEqual(self.consume(topic, 3), ['0', '1', '2'])
+        self.assertEqual(topic.pending(), 0)
+        self.assertEqual(topic.completed, 3)
+
+    def test_failed_message_is_abandoned_then_dead_lettered(self):
+        topic = self.make_topic(max_deliveries=2)
+        topic.publish(make_message(1))
+
+        def fail(message):
+            raise ValueError('boom')
+
+        self.assertEqual(self.consume(topic, 2, callback=fail), ['1', '1'])
+        self.assertEqual(topic.abandoned, 2)
+        self.assertEqual(topic.pending(), 0)
+        dead = os.listdir(topic.dead_dir)
+        self.assertEqual(len(dead), 1)
+        self.assertTrue(dead[0].endswith('~2.json'))
+
+    def test_expired_claim_is_redelivered(self):
+        crashed_consumer = self.make_topic(visibility_timeout=0.05)
+        crashed_consumer.publish(make_message(7))
+        self.assertEqual(len(crashed_consumer._claim(1)), 1)
+        self.assertEqual(len(os.listdir(crashed_consumer.ready_dir)), 0)
+
+        time.sleep(0.1)
+        topic = self.make_topic()
+        self.assertEqual(self.consume(topic, 1), ['7'])
+        self.assertEqual(topic.redelivered, 1)
+
+    def test_claim_is_renewed_while_processing(self):
+        topic = self.make_topic(visibility_timeout=0.1)
+        other_consumer = self.make_topic(visibility_timeout=0.1)
+        topic.publish(make_message(3))
+
+        def slow(message):
+            time.sleep(0.3)
+            other_consumer._redeliver_expired()
+
+        self.assertEqual(self.consume(topic, 1, callback=slow), ['3'])
+        self.assertEqual(other_consumer.redelivered, 0)
+        self.assertEqual(topic.completed, 1)
+
+    def test_stray_files_are_moved_to_dead(self):
+        topic = self.make_topic()
+        topic.publish(make_message(1))
+        for directory, name in ((topic.ready_dir, 'foo.json'), (topic.ready_dir, '.notes.json.swp'),
+                                (topic.claimed_dir, 'bar.json'), (topic.claimed_dir, 'x~y~z.json')):
+            with open(os.path.join(directory, name), 'w') as file:
+                file.write('{}')
+
+        self.assertEqual(self.consume(topic, 1), ['1'])
+        self.assertEqual(sorted(os.listdir(topic.dead_dir)), ['.notes.json.swp', 'bar.json', 'foo.json', 'x~y~z.json'])
+        self.assertEqual(topic.pending(), 0)
+
+    def test_claim_is_exclusive(self):
+        first = self.make_topic()
+        second = self.make_topic()
+        first.publish(make_message(1))
+
+        self.assertEqual(len(first._claim(1)), 1)
+        self.assertEqual(second._claim(1), [])
+
+    def test_message_payload(self):
+        topic = self.make_topic()
+        topic.publish(make_message(5))
+        name = os.listdir(topic.ready_dir)[0]
+        with open(os.path.join(topic.ready_dir, name)) as file:
+            self.assertEqual(json.load(file)['messageId'], '5')
+
+
+class TestLocalCore(unittest.TestCase):
+
+    def test_topics_and_storage(self):
+        with tempfile.TemporaryDirectory() as root:
+            core = LocalCore(spool_dir=os.path.join(root, 'spool'), storage_dir=os.path.join(root, 'storage'),
+                             visibility_timeout=30, max_deliveries=3)
+            topic = core.get_topic(topic_name='requests', max_concurrent_messages=4)
+
+            self.assertIsInstance(topic, SpoolTopic)
+            self.assertEqual(topic.max_concurrent_messages, 4)
+            self.assertEqual(topic.visibility_timeout, 30)
+            self.assertTrue(os.path.isdir(os.path.join(root, 'spool', 'requests', 'ready')))
+            self.assertIsInstance(core.get_storage_client(), DirectoryStorageClient)
+            self.assertIsNotNone(core.get_authorizer(config={'provider': 'Simulated', 'api_url': None}))
+
+    def test_topic_needs_a_name(self):
+        with tempfile.TemporaryDirectory() as root:
+            core = LocalCore(spool_dir=os.path.join(root, 'spool'), storage_dir=os.path.join(root, 'storage'))
+            for topic_name in (None, ''):
+                with self.assertRaises(ValueError):
+                    core.get_topic(topic_name=topic_name)
+            self.assertFalse(os.path.exists(os.path.join(root, 'spool', 'ready')))
+
+
+if __name__ == '__main__':
+    unittest.main()
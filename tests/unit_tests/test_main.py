@@ -1,13 +1,22 @@
+import sys
 import unittest
+import subprocess
+from pathlib import Path
+from unittest.mock import patch, MagicMock
 from fastapi import status
 from fastapi.testclient import TestClient
-from src.main import app, get_settings
+from src.main import app, get_settings, start_validator
+from src.runtime_config import runtime_config
 
 
 class TestApp(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(app)
 
+    def tearDown(self):
+        app.ready.clear()
+        app.validator = None
+
     def test_root(self):
         response = self.client.get("/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -18,9 +27,94 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.text.strip('\"'), "I'm healthy !!")
 
+    def test_ready_before_validator_loaded(self):
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.text.strip('\"'), 'Starting')
+
+    def test_ready_once_validator_loaded(self):
+        app.ready.set()
+        for path in ('/ready', '/health/ready'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.text.strip('\"'), 'Ready')
+
+    @patch('src.main.memory_governor')
+    @patch('src.osw_validator.OSWValidator')
+    def test_start_validator(self, mock_validator, mock_governor):
+        validator = MagicMock()
+        mock_validator.return_value = validator
+        start_validator()
+        self.assertIs(app.validator, validator)
+        self.assertTrue(app.ready.is_set())
+        mock_governor.freeze.assert_called_once()
+
+    def test_import_does_not_load_validator(self):
+        # The validator's dependencies are imported by start_validator, not with the app
+        code = ('import sys, src.main; '
+                'print(",".join(m for m in ("python_osw_validation", "geopandas", "src.osw_validator") '
+                'if m in sys.modules))')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '')
+
+    def test_metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('osw_validation_stage_seconds', response.text)
+
+    def test_validate_upload(self):
+        with open(f'{Path.cwd()}/tests/unit_tests/test_files/valid.zip', 'rb') as file:
+            response = self.client.post('/validate', content=file.read())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['is_valid'])
+
+    def test_validate_upload_rejects_invalid_max_errors(self):
+        response = self.client.post('/validate?max_errors=0', content=b'')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @patch('src.main.runtime_config')
+    def test_reload_config(self, mock_runtime_config):
+        mock_runtime_config.settings.config_reload_token = 'secret'
+        mock_runtime_config.reload.return_value = ['max_errors']
+        mock_runtime_config.version = 2
+
+        response = self.client.post('/config/reload', headers={'Authorization': 'Bearer secret'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'changed': ['max_errors'], 'version': 2})
+
+    @patch('src.main.runtime_config')
+    def test_reload_config_invalid(self, mock_runtime_config):
+        mock_runtime_config.settings.config_reload_token = 'secret'
+        mock_runtime_config.reload.side_effect = ValueError('max_errors is not a valid integer')
+        mock_runtime_config.version = 1
+
+        response = self.client.post('/config/reload', headers={'Authorization': 'Bearer secret'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['version'], 1)
+
+    @patch('src.main.runtime_config')
+    def test_reload_config_requires_token(self, mock_runtime_config):
+        mock_runtime_config.settings.config_reload_token = 'secret'
+
+        for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'secret'}):
+            response = self.client.post('/config/reload', headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        mock_runtime_config.reload.assert_not_called()
+
+    @patch('src.main.runtime_config')
+    def test_reload_config_disabled_without_token(self, mock_runtime_config):
+        mock_runtime_config.settings.config_reload_token = ''
+
+        response = self.client.post('/config/reload', headers={'Authorization': 'Bearer '})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        mock_runtime_config.reload.assert_not_called()
+
     def test_get_settings(self):
         settings = get_settings()
-        self.assertIsNotNone(settings)
+        self.assertIs(settings, runtime_config.settings)
 
 
 if __name__ == '__main__':
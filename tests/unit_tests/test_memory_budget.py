@@ -0,0 +1,134 @@
+import time
+import threading
+import unittest
+from src.memory_budget import MemoryBudget, estimate_memory, MB, STANDARD_LANE, LARGE_LANE
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.budget = MemoryBudget(budget_bytes=1000 * MB, large_file_bytes=20 * MB, large_lane_concurrency=1,
+                                   estimate_factor=20, estimate_base_bytes=50 * MB)
+
+    def test_estimate(self):
+        self.assertEqual(estimate_memory(10 * MB, 20, 50 * MB), 250 * MB)
+        self.assertEqual(self.budget.estimate(1 * MB), 70 * MB)
+        # Unknown sizes are estimated as a large file
+        self.assertEqual(self.budget.estimate(None), 450 * MB)
+
+    def test_lane(self):
+        self.assertEqual(self.budget.lane(1 * MB), STANDARD_LANE)
+        self.assertEqual(self.budget.lane(20 * MB), LARGE_LANE)
+        self.assertEqual(self.budget.lane(None), LARGE_LANE)
+
+    def test_small_files_share_the_budget(self):
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with self.budget.admit(1 * MB):
+                with lock:
+                    peak.append(self.budget.active[STANDARD_LANE])
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 70 MB each, 14 fit in 1000 MB
+        self.assertEqual(max(peak), 14)
+        self.assertEqual(self.budget.in_use, 0)
+
+    def test_large_lane_runs_one_at_a_time(self):
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with self.budget.admit(25 * MB):
+                with lock:
+                    peak.append(self.budget.active[LARGE_LANE])
+                time.sleep(0.02)
+
+        # 550 MB each, the budget alone would not stop a second one, the lane does
+        self.budget.budget_bytes = 10000 * MB
+        threads = [threading.Thread(target=work) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(self.budget.active[LARGE_LANE], 0)
+
+    def test_oversized_file_runs_alone(self):
+        small_running = threading.Event()
+        release_small = threading.Event()
+        order = []
+
+        def small():
+            with self.budget.admit(1 * MB):
+                order.append('small')
+                small_running.set()
+                release_small.wait()
+
+        def huge():
+            # Estimated above the whole budget
+            with self.budget.admit(100 * MB):
+                order.append('huge')
+                self.assertEqual(self.budget.active[STANDARD_LANE], 0)
+
+        small_thread = threading.Thread(target=small)
+        small_thread.start()
+        small_running.wait()
+        huge_thread = threading.Thread(target=huge)
+        huge_thread.start()
+        self.assertTrue(wait_until(lambda: self.budget.waiting[LARGE_LANE] == 1))
+        release_small.set()
+        small_thread.join()
+        huge_thread.join()
+        self.assertEqual(order, ['small', 'huge'])
+
+    def test_waiting_large_file_holds_back_small_files(self):
+        release = threading.Event()
+
+        def hold(blob_size):
+            with self.budget.admit(blob_size):
+                release.wait()
+
+        # 700 MB standard reservations in use, the large file needs 550 MB
+        holders = [threading.Thread(target=hold, args=(15 * MB,)) for _ in range(2)]
+        for thread in holders:
+            thread.start()
+        self.assertTrue(wait_until(lambda: self.budget.active[STANDARD_LANE] == 2))
+        large = threading.Thread(target=hold, args=(25 * MB,))
+        large.start()
+        self.assertTrue(wait_until(lambda: self.budget.waiting[LARGE_LANE] == 1))
+
+        # A small file would fit on its own, but not beside the waiting large file
+        late = threading.Thread(target=hold, args=(1 * MB,))
+        late.start()
+        self.assertTrue(wait_until(lambda: self.budget.waiting[STANDARD_LANE] == 1))
+        release.set()
+        for thread in holders + [large, late]:
+            thread.join()
+        self.assertEqual(self.budget.in_use, 0)
+
+    def test_released_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.budget.admit(1 * MB):
+                raise ValueError('boom')
+        self.assertEqual(self.budget.in_use, 0)
+        self.assertEqual(self.budget.stats()[STANDARD_LANE], {'reserved': 0, 'active': 0, 'waiting': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
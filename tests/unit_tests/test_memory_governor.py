@@ -0,0 +1,94 @@
+import gc
+import unittest
+from unittest.mock import patch
+from src.memory_governor import MemoryGovernor, MB
+
+
+class TestMemoryGovernor(unittest.TestCase):
+
+    def setUp(self):
+        self.governor = MemoryGovernor(soft_watermark_mb=100, hard_watermark_mb=200)
+
+    def tearDown(self):
+        gc.callbacks.remove(self.governor._on_gc)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_no_collection_below_watermarks(self, mock_collect):
+        with patch.object(self.governor, 'rss', return_value=50 * MB):
+            self.assertIsNone(self.governor.checkpoint())
+
+        mock_collect.assert_not_called()
+        self.assertEqual(self.governor.collections, 0)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_young_collection_above_soft_watermark(self, mock_collect):
+        with patch.object(self.governor, 'rss', return_value=150 * MB):
+            self.assertEqual(self.governor.checkpoint(), 1)
+
+        mock_collect.assert_called_once_with(1)
+        self.assertEqual(self.governor.collections, 1)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_full_collection_above_hard_watermark(self, mock_collect):
+        with patch.object(self.governor, 'rss', return_value=250 * MB):
+            self.assertEqual(self.governor.checkpoint(), 2)
+
+        mock_collect.assert_called_once_with(2)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_collects_again_only_after_growing_past_the_last_collection(self, mock_collect):
+        with patch.object(self.governor, 'rss', side_effect=[150 * MB, 140 * MB, 150 * MB, 160 * MB, 150 * MB]):
+            self.assertEqual(self.governor.checkpoint(), 1)
+            # Still above the watermark, but below 10% over what the collection left
+            self.assertIsNone(self.governor.checkpoint())
+            self.assertEqual(self.governor.checkpoint(), 1)
+
+        self.assertEqual(mock_collect.call_count, 2)
+        self.assertEqual(self.governor.skipped, 1)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_dropping_below_the_watermarks_rearms(self, mock_collect):
+        with patch.object(self.governor, 'rss', side_effect=[150 * MB, 140 * MB, 50 * MB, 120 * MB, 120 * MB]):
+            self.governor.checkpoint()
+            self.assertIsNone(self.governor.checkpoint())
+            self.assertEqual(self.governor.checkpoint(), 1)
+
+        self.assertEqual(mock_collect.call_count, 2)
+
+    @patch('src.memory_governor.gc.collect')
+    def test_disabled_watermarks_never_collect(self, mock_collect):
+        governor = MemoryGovernor(soft_watermark_mb=0, hard_watermark_mb=0)
+        try:
+            with patch.object(governor, 'rss', return_value=10000 * MB):
+                self.assertIsNone(governor.checkpoint())
+        finally:
+            gc.callbacks.remove(governor._on_gc)
+        mock_collect.assert_not_called()
+
+    def test_track_reports_gc_pause(self):
+        with self.governor.track('message-1') as stats:
+            gc.collect()
+
+        self.assertEqual(stats['message_id'], 'message-1')
+        self.assertGreater(stats['gc_pause_ms'], 0)
+        self.assertGreater(self.governor.pause_seconds, 0)
+
+    @patch('src.memory_governor.gc.freeze')
+    @patch('src.memory_governor.gc.collect')
+    def test_freeze(self, mock_collect, mock_freeze):
+        self.governor.freeze()
+
+        mock_collect.assert_called_once()
+        mock_freeze.assert_called_once()
+
+    def test_stats(self):
+        stats = self.governor.stats()
+
+        self.assertGreater(stats['rss_mb'], 0)
+        self.assertEqual(stats['collections'], 0)
+        self.assertIn('gc_pause_ms', stats)
+        self.assertIn('frozen_objects', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
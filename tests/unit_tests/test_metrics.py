@@ -0,0 +1,96 @@
+import unittest
+import itertools
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+from prometheus_client import REGISTRY
+from src import metrics
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_observe_stage_uses_current_message_type(self):
+        labels = {'stage': 'download', 'message_type': 'metrics_stage_test'}
+        before = sample('osw_validation_stage_seconds_count', labels)
+
+        with metrics.track_message('metrics_stage_test'):
+            with metrics.observe_stage('download'):
+                pass
+
+        self.assertEqual(sample('osw_validation_stage_seconds_count', labels), before + 1)
+
+    def test_observe_stage_without_message(self):
+        labels = {'stage': 'cleanup', 'message_type': metrics.UNKNOWN_MESSAGE_TYPE}
+        before = sample('osw_validation_stage_seconds_count', labels)
+
+        with metrics.observe_stage('cleanup'):
+            pass
+
+        self.assertEqual(sample('osw_validation_stage_seconds_count', labels), before + 1)
+
+    def test_track_message_in_flight_gauge(self):
+        labels = {'message_type': 'metrics_in_flight_test'}
+
+        with metrics.track_message('metrics_in_flight_test'):
+            self.assertEqual(sample('osw_validation_in_flight_messages', labels), 1)
+            self.assertEqual(metrics.current_message_type.get(), 'metrics_in_flight_test')
+
+        self.assertEqual(sample('osw_validation_in_flight_messages', labels), 0)
+        self.assertEqual(metrics.current_message_type.get(), metrics.UNKNOWN_MESSAGE_TYPE)
+
+    def test_track_message_records_queue_wait(self):
+        labels = {'stage': 'queue_wait', 'message_type': 'metrics_queue_test'}
+        published = (datetime.now(timezone.utc) - timedelta(seconds=30)).isoformat().replace('+00:00', 'Z')
+
+        with metrics.track_message('metrics_queue_test', published_date=published):
+            pass
+
+        self.assertEqual(sample('osw_validation_stage_seconds_count', labels), 1)
+        self.assertGreaterEqual(sample('osw_validation_stage_seconds_sum', labels), 30)
+
+    @patch('src.metrics._messages_started', new_callable=itertools.count)
+    def test_track_message_first_and_steady(self, _):
+        for _ in range(3):
+            with metrics.track_message('metrics_phase_test'):
+                pass
+
+        self.assertEqual(sample('osw_validation_message_seconds_count',
+                                {'message_type': 'metrics_phase_test', 'phase': 'first'}), 1)
+        self.assertEqual(sample('osw_validation_message_seconds_count',
+                                {'message_type': 'metrics_phase_test', 'phase': 'steady'}), 2)
+
+    def test_queue_wait_seconds(self):
+        naive = str(datetime.now() - timedelta(seconds=5))
+        self.assertGreaterEqual(metrics.queue_wait_seconds(naive), 5)
+        self.assertIsNone(metrics.queue_wait_seconds(None))
+        self.assertIsNone(metrics.queue_wait_seconds('not a date'))
+        future = (datetime.now(timezone.utc) + timedelta(seconds=60)).isoformat()
+        self.assertEqual(metrics.queue_wait_seconds(future), 0.0)
+
+    def test_record_outcome_and_download(self):
+        with metrics.track_message('metrics_outcome_test'):
+            metrics.record_outcome('invalid')
+            metrics.observe_download(2048)
+
+        self.assertEqual(sample('osw_validation_messages_total',
+                                {'message_type': 'metrics_outcome_test', 'outcome': 'invalid'}), 1)
+        self.assertEqual(sample('osw_validation_download_bytes_sum', {'message_type': 'metrics_outcome_test'}), 2048)
+
+    def test_record_precheck_rejection(self):
+        with metrics.track_message('metrics_precheck_test'):
+            metrics.record_precheck_rejection('malformed_json')
+
+        self.assertEqual(sample('osw_validation_precheck_rejections_total',
+                                {'message_type': 'metrics_precheck_test', 'reason': 'malformed_json'}), 1)
+
+    def test_render(self):
+        content, content_type = metrics.render()
+        self.assertIn(b'osw_validation_stage_seconds', content)
+        self.assertTrue(content_type.startswith('text/plain'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import os
 import json
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch, call
 from src.osw_validator import OSWValidator
+from src.scratch_space import scratch_space
 from src.models.queue_message_content import ValidationResult, Upload
 
 current_dir = os.path.dirname(os.path.abspath(os.path.join(__file__, '../')))
@@ -22,6 +24,13 @@ class PermissionResponse:
 class TestOSWValidator(unittest.TestCase):
 
     def setUp(self):
+        # Scratch directories go to a temporary root, never the repository's downloads/
+        scratch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch_dir.cleanup)
+        scratch_root = patch.object(scratch_space, 'root', scratch_dir.name)
+        scratch_root.start()
+        self.addCleanup(scratch_root.stop)
+        self.addCleanup(scratch_space.drain)
         with patch.object(OSWValidator, '__init__', return_value=None):
             self.validator = OSWValidator()
             self.validator._subscription_name = MagicMock()
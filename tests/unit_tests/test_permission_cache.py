@@ -0,0 +1,125 @@
+import time
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from src.permission_cache import PermissionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPermissionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = PermissionCache(positive_ttl=60, negative_ttl=10, max_entries=2, clock=self.clock)
+
+    def test_make_key_ignores_role_order(self):
+        self.assertEqual(PermissionCache.make_key('user', 'group', ['poc', 'tdei-admin']),
+                         PermissionCache.make_key('user', 'group', ['tdei-admin', 'poc']))
+
+    def test_positive_decision_cached_until_ttl(self):
+        loader = MagicMock(return_value=True)
+
+        self.assertTrue(self.cache.get_or_load('key', loader))
+        self.clock.now = 59
+        self.assertTrue(self.cache.get_or_load('key', loader))
+        self.assertEqual(loader.call_count, 1)
+
+        self.clock.now = 61
+        self.cache.get_or_load('key', loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_negative_decision_uses_negative_ttl(self):
+        loader = MagicMock(return_value=False)
+
+        self.assertFalse(self.cache.get_or_load('key', loader))
+        self.clock.now = 9
+        self.cache.get_or_load('key', loader)
+        self.assertEqual(loader.call_count, 1)
+
+        self.clock.now = 11
+        self.cache.get_or_load('key', loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_errors_and_none_not_cached(self):
+        loader = MagicMock(side_effect=[Exception('permission service down'), None, True])
+
+        with self.assertRaises(Exception):
+            self.cache.get_or_load('key', loader)
+        self.assertIsNone(self.cache.get_or_load('key', loader))
+        self.assertTrue(self.cache.get_or_load('key', loader))
+        self.assertEqual(loader.call_count, 3)
+
+    def test_least_recently_used_entry_evicted(self):
+        self.cache.get_or_load('first', lambda: True)
+        self.cache.get_or_load('second', lambda: True)
+        self.cache.get_or_load('first', lambda: True)
+        self.cache.get_or_load('third', lambda: True)
+
+        loader = MagicMock(return_value=True)
+        self.cache.get_or_load('first', loader)
+        loader.assert_not_called()
+        self.cache.get_or_load('second', loader)
+        loader.assert_called_once()
+
+    def test_concurrent_lookups_share_one_call(self):
+        cache = PermissionCache(positive_ttl=60, negative_ttl=10, max_entries=10)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return True
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while cache.stats()['coalesced'] < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['coalesced'], 4)
+
+    def test_stats(self):
+        self.cache.get_or_load('key', lambda: True)
+        self.cache.get_or_load('key', lambda: True)
+
+        stats = self.cache.stats()
+
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertGreaterEqual(stats['avg_lookup_ms'], 0)
+
+    @patch('src.permission_cache.metrics')
+    def test_exports_lookups_and_latency(self, mock_metrics):
+        self.cache.get_or_load('key', lambda: True)
+        self.cache.get_or_load('key', lambda: True)
+
+        mock_metrics.PERMISSION_LOOKUPS.labels.assert_any_call('miss')
+        mock_metrics.PERMISSION_LOOKUPS.labels.assert_any_call('hit')
+        self.assertEqual(mock_metrics.PERMISSION_LOOKUPS.labels.return_value.inc.call_count, 2)
+        self.assertEqual(mock_metrics.PERMISSION_LOOKUP_SECONDS.observe.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import time
+import threading
+import unittest
+from contextlib import nullcontext
+from src.pipeline import Stage, ValidationPipeline, pipeline_stage
+
+
+class TestStage(unittest.TestCase):
+
+    def test_slot_limits_concurrency(self):
+        stage = Stage('download', 2)
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with stage.slot():
+                with lock:
+                    peak.append(stage.active)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(stage.active, 0)
+        self.assertEqual(stage.waiting, 0)
+
+    def test_slot_released_on_error(self):
+        stage = Stage('validation', 1)
+        with self.assertRaises(ValueError):
+            with stage.slot():
+                raise ValueError('boom')
+        self.assertEqual(stage.active, 0)
+        with stage.slot():
+            self.assertEqual(stage.active, 1)
+
+
+class TestValidationPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = ValidationPipeline(download_concurrency=1, validation_concurrency=1,
+                                           publish_concurrency=1, prefetch_depth=1)
+
+    def test_max_in_flight(self):
+        self.assertEqual(self.pipeline.max_in_flight, 2)
+
+    def test_admit_applies_backpressure(self):
+        admitted = threading.Event()
+
+        def third_message():
+            with self.pipeline.admit():
+                admitted.set()
+
+        with self.pipeline.admit(), self.pipeline.admit():
+            thread = threading.Thread(target=third_message)
+            thread.start()
+            self.assertFalse(admitted.wait(0.05))
+        thread.join(1)
+        self.assertTrue(admitted.is_set())
+
+    def test_download_overlaps_validation(self):
+        events = []
+
+        def message(index):
+            with self.pipeline.admit():
+                with self.pipeline.stage('download'):
+                    events.append(('download', index))
+                    time.sleep(0.02)
+                with self.pipeline.stage('validation'):
+                    events.append(('validate', index))
+                    time.sleep(0.05)
+                    events.append(('validated', index))
+
+        threads = [threading.Thread(target=message, args=(index,)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Both zips were downloaded before the first validation finished
+        first_validated = [event[0] for event in events].index('validated')
+        self.assertEqual([event[0] for event in events[:first_validated]].count('download'), 2)
+
+    def test_stats(self):
+        with self.pipeline.stage('publish'):
+            self.assertEqual(self.pipeline.stats()['publish'], {'active': 1, 'waiting': 0})
+
+    def test_pipeline_stage_without_pipeline(self):
+        self.assertIsInstance(pipeline_stage(None, 'download'), nullcontext)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import zipfile
+import tempfile
+import unittest
+from pathlib import Path
+from python_osw_validation import OSWValidation
+from src.precheck import StructuralPrecheck, JsonStructureScanner, MalformedJson
+
+SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
+FIXTURES = ['valid.zip', 'invalid.zip', '_id_missing.zip', 'edges_invalid.zip', 'nodes_invalid.zip',
+            'points_invalid.zip', 'invalid_geometry.zip', 'missing_identifier.zip', 'no_entity.zip',
+            'wrong_datatype.zip']
+
+
+def scan(document: bytes, chunk_size: int = 3):
+    scanner = JsonStructureScanner()
+    for offset in range(0, len(document), chunk_size):
+        scanner.feed(document[offset:offset + chunk_size])
+    scanner.close()
+
+
+class TestJsonStructureScanner(unittest.TestCase):
+
+    def test_well_formed(self):
+        scan(b'{"type": "FeatureCollection", "features": [{"a": "x\\"}]y", "b": [1.5, -2e3, true, null]}]}')
+        scan(b'\xef\xbb\xbf{"bom": 1}', chunk_size=1)
+        scan('{"name": "Café {["}'.encode())
+
+    def test_truncated(self):
+        with self.assertRaisesRegex(MalformedJson, 'truncated'):
+            scan(b'{"features": [{"a": 1}')
+        with self.assertRaisesRegex(MalformedJson, 'ends inside a string'):
+            scan(b'{"features": "abc')
+
+    def test_empty(self):
+        with self.assertRaisesRegex(MalformedJson, 'empty'):
+            scan(b'  \n')
+
+    def test_not_an_object(self):
+        with self.assertRaisesRegex(MalformedJson, 'not a JSON object'):
+            scan(b'[1, 2]')
+
+    def test_binary(self):
+        with self.assertRaisesRegex(MalformedJson, 'unexpected byte'):
+            scan(b'{"a": \x00\x01}')
+
+
+class TestStructuralPrecheck(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.precheck = StructuralPrecheck(max_members=20, max_ratio=200, max_uncompressed_bytes=0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_zip(self, members: dict, name: str = 'upload.zip') -> str:
+        path = os.path.join(self.directory.name, name)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for member, content in members.items():
+                archive.writestr(member, content)
+        return path
+
+    def test_fixtures_pass(self):
+        # Invalid fixtures fail on schema or integrity rules, never on structure
+        for fixture in FIXTURES:
+            self.assertIsNone(self.precheck.check(f'{SAVED_FILE_PATH}/{fixture}'), fixture)
+
+    def test_not_a_zip(self):
+        path = os.path.join(self.directory.name, 'broken.zip')
+        with open(path, 'wb') as file:
+            file.write(b'not a zip file')
+        failure = self.precheck.check(path)
+        self.assertEqual(failure.reason, 'corrupt_zip')
+        self.assertEqual(failure.message, 'Error extracting ZIP file: File is not a zip file')
+
+    def test_empty_zip(self):
+        failure = self.precheck.check(self.make_zip({}))
+        self.assertEqual(failure.reason, 'corrupt_zip')
+        self.assertEqual(failure.message, 'Error extracting ZIP file: ZIP file is empty')
+
+    def test_dataset_file_rules_match_validator(self):
+        failure = self.precheck.check(f'{SAVED_FILE_PATH}/invalid_files.zip')
+        self.assertEqual(failure.reason, 'dataset_files')
+        self.assertEqual(failure.issues()[0]['filename'], 'invalid_files.zip')
+        self.assertIn('Unsupported .geojson files present: a.geojson', failure.message)
+
+    def test_file_name_rules_agree_with_validator(self):
+        feature_collection = '{"type": "FeatureCollection", "features": []}'
+        layouts = [
+            {'data/': '', 'data/a.geojson': feature_collection},
+            {'data/': '', 'data/x.nodes.geojson': feature_collection, 'data/y.nodes.geojson': feature_collection},
+            {'opensidewalks.nodes.geojson': feature_collection, 'city.edges.geojson': feature_collection},
+            {'opensidewalks.nodes.geojson': feature_collection, 'a/opensidewalks.nodes.geojson': feature_collection},
+            {'data/': '', 'data/.hidden.geojson': feature_collection, 'data/deep/er/a.geojson': feature_collection},
+            {'data/readme.txt': 'hello', 'data/sub/a.geojson': feature_collection},
+        ]
+        for index, members in enumerate(layouts):
+            path = self.make_zip(members, name=f'layout{index}.zip')
+            failure = self.precheck.check(path)
+            self.assertIsNotNone(failure, members)
+            self.assertEqual(failure.reason, 'dataset_files')
+            self.assertEqual(OSWValidation(zipfile_path=path).validate().errors, [failure.message], members)
+
+    def test_dataset_files(self):
+        self.assertEqual(StructuralPrecheck.dataset_files(['data/', 'data/city.nodes.geojson', 'data/ext/x.edges.geojson',
+                                                           'data/._city.nodes.geojson', 'other.geojson']),
+                         (['data/ext/x.edges.geojson', 'data/city.nodes.geojson'], None))
+
+    def test_no_geojson(self):
+        failure = self.precheck.check(self.make_zip({'data/readme.txt': 'hello'}))
+        self.assertEqual(failure.reason, 'dataset_files')
+
+    def test_truncated_geojson(self):
+        path = self.make_zip({'data/': '', 'data/city.nodes.geojson': '{"type": "FeatureCollection", "features": [{'})
+        failure = self.precheck.check(path)
+        self.assertEqual(failure.reason, 'malformed_json')
+        self.assertEqual(failure.issues(), [{'filename': 'city.nodes.geojson', 'feature_index': None,
+                                             'error_message': "Invalid JSON in 'city.nodes.geojson': brackets are "
+                                                              "not balanced, the file is truncated"}])
+
+    def test_compression_ratio(self):
+        path = self.make_zip({'data/': '', 'data/city.nodes.geojson': '{"a": "' + ' ' * (8 * 1024 * 1024) + '"}'})
+        failure = self.precheck.check(path)
+        self.assertEqual(failure.reason, 'compression_ratio')
+
+    def test_uncompressed_size(self):
+        self.precheck.max_uncompressed_bytes = 1024
+        path = self.make_zip({'data/': '', 'data/city.nodes.geojson': '{"a": [' + '1,' * 1000 + '1]}'})
+        self.assertEqual(self.precheck.check(path).reason, 'uncompressed_size')
+
+    def test_too_many_members(self):
+        members = {f'data/{index}.txt': '' for index in range(25)}
+        self.assertEqual(self.precheck.check(self.make_zip(members)).reason, 'too_many_members')
+
+    def test_unsafe_path(self):
+        failure = self.precheck.check(self.make_zip({'../city.nodes.geojson': '{}'}))
+        self.assertEqual(failure.reason, 'unsafe_path')
+
+
+if __name__ == '__main__':
+    unittest.main()
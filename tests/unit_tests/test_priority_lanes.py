@@ -0,0 +1,146 @@
+import time
+import threading
+import unittest
+from unittest.mock import patch
+from src.priority_lanes import PriorityLanes, INTERACTIVE_LANE, STANDARD_LANE, BULK_LANE, MB
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPriorityLanes(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.lanes = PriorityLanes(concurrency=2, reserved={INTERACTIVE_LANE: 1}, bulk_file_bytes=100 * MB,
+                                   max_wait=60, clock=self.clock)
+        self.releases = []
+        self.order = []
+        self.threads = []
+
+    def tearDown(self):
+        for release in self.releases:
+            release.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    # Starts a thread holding a slot of the lane until its event is set
+    def hold(self, lane, name):
+        admitted = threading.Event()
+        release = threading.Event()
+        self.releases.append(release)
+
+        def run():
+            with self.lanes.admit(lane):
+                self.order.append(name)
+                admitted.set()
+                release.wait()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return admitted, release
+
+    def wait_for_waiting(self, lane, count):
+        deadline = time.monotonic() + 2
+        while self.lanes.stats()[lane]['waiting'] < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_lane_classification(self):
+        self.assertEqual(self.lanes.lane('VALIDATION_ONLY', 10 * MB), INTERACTIVE_LANE)
+        self.assertEqual(self.lanes.lane('OSW_VALIDATION_ONLY', None), INTERACTIVE_LANE)
+        self.assertEqual(self.lanes.lane('workflow_identifier', 10 * MB), STANDARD_LANE)
+        self.assertEqual(self.lanes.lane(None, None), STANDARD_LANE)
+        # Large zips go to the bulk lane whatever their type
+        self.assertEqual(self.lanes.lane('VALIDATION_ONLY', 100 * MB), BULK_LANE)
+        self.assertEqual(self.lanes.lane('workflow_identifier', 500 * MB), BULK_LANE)
+
+    def test_reserved_slot_kept_for_its_lane(self):
+        first, _ = self.hold(BULK_LANE, 'bulk-1')
+        self.assertTrue(first.wait(1))
+        second, _ = self.hold(BULK_LANE, 'bulk-2')
+        self.assertFalse(second.wait(0.1))
+
+        interactive, _ = self.hold(INTERACTIVE_LANE, 'interactive')
+        self.assertTrue(interactive.wait(1))
+        self.assertEqual(self.lanes.stats()[INTERACTIVE_LANE]['active'], 1)
+
+    def test_shared_slot_goes_to_the_highest_lane(self):
+        lanes = PriorityLanes(concurrency=1, clock=self.clock, max_wait=60)
+        self.lanes = lanes
+        first, release_first = self.hold(BULK_LANE, 'bulk-1')
+        self.assertTrue(first.wait(1))
+        bulk, _ = self.hold(BULK_LANE, 'bulk-2')
+        self.wait_for_waiting(BULK_LANE, 1)
+        standard, _ = self.hold(STANDARD_LANE, 'standard')
+        self.wait_for_waiting(STANDARD_LANE, 1)
+        interactive, release_interactive = self.hold(INTERACTIVE_LANE, 'interactive')
+        self.wait_for_waiting(INTERACTIVE_LANE, 1)
+
+        release_first.set()
+        self.assertTrue(interactive.wait(1))
+        self.assertFalse(standard.is_set())
+        release_interactive.set()
+        self.assertTrue(standard.wait(1))
+        self.assertEqual(self.order, ['bulk-1', 'interactive', 'standard'])
+
+    def test_lane_is_first_in_first_out(self):
+        lanes = PriorityLanes(concurrency=1, clock=self.clock)
+        self.lanes = lanes
+        first, release_first = self.hold(STANDARD_LANE, 'first')
+        self.assertTrue(first.wait(1))
+        second, release_second = self.hold(STANDARD_LANE, 'second')
+        self.wait_for_waiting(STANDARD_LANE, 1)
+        third, _ = self.hold(STANDARD_LANE, 'third')
+        self.wait_for_waiting(STANDARD_LANE, 2)
+
+        release_first.set()
+        self.assertTrue(second.wait(1))
+        release_second.set()
+        self.assertTrue(third.wait(1))
+        self.assertEqual(self.order, ['first', 'second', 'third'])
+
+    def test_starved_lane_goes_first(self):
+        lanes = PriorityLanes(concurrency=1, clock=self.clock, max_wait=60)
+        self.lanes = lanes
+        first, release_first = self.hold(STANDARD_LANE, 'standard-1')
+        self.assertTrue(first.wait(1))
+        bulk, _ = self.hold(BULK_LANE, 'bulk')
+        self.wait_for_waiting(BULK_LANE, 1)
+        self.clock.now = 61
+        standard, _ = self.hold(STANDARD_LANE, 'standard-2')
+        self.wait_for_waiting(STANDARD_LANE, 1)
+
+        release_first.set()
+        self.assertTrue(bulk.wait(1))
+        self.assertFalse(standard.is_set())
+        self.assertEqual(lanes.promoted, 1)
+
+    def test_unreserved_lanes_keep_a_shared_slot(self):
+        lanes = PriorityLanes(concurrency=1, reserved={INTERACTIVE_LANE: 1})
+        self.assertEqual(lanes.concurrency, 2)
+        self.assertEqual(lanes.shared, 1)
+
+    @patch('src.priority_lanes.metrics')
+    def test_reports_queue_wait_per_lane(self, mock_metrics):
+        mock_metrics.queue_wait_seconds.return_value = 12.5
+        with self.lanes.admit(BULK_LANE, published_date='2024-01-01T00:00:00Z'):
+            pass
+
+        mock_metrics.queue_wait_seconds.assert_called_once_with('2024-01-01T00:00:00Z')
+        mock_metrics.LANE_QUEUE_WAIT.labels.assert_called_once_with(BULK_LANE)
+        mock_metrics.LANE_QUEUE_WAIT.labels.return_value.observe.assert_called_once_with(12.5)
+
+    def test_slot_released_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.lanes.admit(STANDARD_LANE):
+                raise RuntimeError('failed')
+        self.assertEqual(self.lanes.stats()[STANDARD_LANE], {'reserved': 0, 'active': 0, 'waiting': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from azure.servicebus.exceptions import MessageSizeExceededError
+from python_ms_core.core.queue.models.queue_message import QueueMessage
+from src.publisher import ResultPublisher
+
+
+def make_message(message_id):
+    return QueueMessage.data_from({'messageId': message_id, 'messageType': 'workflow', 'data': {'success': True}})
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+class TestResultPublisher(unittest.TestCase):
+
+    def test_publish_immediately_without_batching(self):
+        topic = MagicMock()
+        publisher = ResultPublisher(topic=topic)
+        message = make_message('1')
+
+        publisher.publish(data=message)
+
+        topic.publish.assert_called_once_with(data=message)
+        self.assertFalse(publisher.is_batching)
+        self.assertEqual(publisher.published, 1)
+
+    def test_publish_errors_propagate_without_batching(self):
+        topic = MagicMock()
+        topic.publish.side_effect = Exception('bus down')
+        publisher = ResultPublisher(topic=topic)
+
+        with self.assertRaises(Exception):
+            publisher.publish(data=make_message('1'))
+
+    def test_batch_sent_when_size_reached(self):
+        topic = MagicMock(spec=['publish'])
+        publisher = ResultPublisher(topic=topic, batch_size=3, batch_interval=60)
+
+        for message_id in ('1', '2', '3'):
+            publisher.publish(data=make_message(message_id))
+
+        self.assertTrue(wait_until(lambda: topic.publish.call_count == 3))
+        self.assertEqual(publisher.published, 3)
+        publisher.close(timeout=5)
+
+    def test_batch_sent_after_interval(self):
+        topic = MagicMock(spec=['publish'])
+        publisher = ResultPublisher(topic=topic, batch_size=10, batch_interval=0.05)
+
+        publisher.publish(data=make_message('1'))
+
+        self.assertTrue(wait_until(lambda: topic.publish.call_count == 1))
+        publisher.close(timeout=5)
+
+    def test_close_flushes_pending_messages(self):
+        topic = MagicMock(spec=['publish'])
+        publisher = ResultPublisher(topic=topic, batch_size=10, batch_interval=60)
+        publisher.publish(data=make_message('1'))
+        publisher.publish(data=make_message('2'))
+
+        publisher.close(timeout=5)
+
+        self.assertEqual(topic.publish.call_count, 2)
+        with self.assertRaises(RuntimeError):
+            publisher.publish(data=make_message('3'))
+
+    def test_service_bus_batches_split_when_full(self):
+        topic = MagicMock()
+        first_batch, second_batch = MagicMock(), MagicMock()
+        first_batch.add_message.side_effect = [None, MessageSizeExceededError(message='full')]
+        topic.publisher.create_message_batch.side_effect = [first_batch, second_batch]
+        publisher = ResultPublisher(topic=topic, batch_size=3, batch_interval=60)
+
+        publisher._send_batch([make_message('1'), make_message('2'), make_message('3')])
+
+        self.assertEqual(topic.publisher.send_messages.call_count, 2)
+        topic.publisher.send_messages.assert_any_call(first_batch)
+        topic.publisher.send_messages.assert_any_call(second_batch)
+        self.assertEqual(second_batch.add_message.call_count, 2)
+        topic.publish.assert_not_called()
+        self.assertEqual(publisher.published, 3)
+        publisher.close(timeout=5)
+
+    def test_failed_batch_is_counted(self):
+        topic = MagicMock(spec=['publish'])
+        topic.publish.side_effect = Exception('bus down')
+        publisher = ResultPublisher(topic=topic, batch_size=2, batch_interval=60)
+
+        publisher._send_batch([make_message('1'), make_message('2')])
+
+        self.assertEqual(publisher.failed, 2)
+        self.assertEqual(publisher.published, 0)
+        publisher.close(timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
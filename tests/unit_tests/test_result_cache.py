@@ -0,0 +1,90 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.result_cache import ResultCache
+from src.models.queue_message_content import ValidationResult
+
+
+def make_result(is_valid, validation_message=''):
+    result = ValidationResult()
+    result.is_valid = is_valid
+    result.validation_message = validation_message
+    return result
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'cache', 'results.db')
+        self.cache = ResultCache(path=self.path, max_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    @patch('src.result_cache.python_osw_validation')
+    def test_make_key(self, mock_osw_validation):
+        mock_osw_validation.__version__ = '9.9.9'
+        self.assertEqual(ResultCache.make_key('abc', 20), 'abc:9.9.9:20:0')
+        self.assertNotEqual(ResultCache.make_key('abc', 20), ResultCache.make_key('abc', 10))
+        self.assertNotEqual(ResultCache.make_key('abc', 20, 4096), ResultCache.make_key('abc', 20))
+
+    def test_database_created_lazily(self):
+        self.assertFalse(os.path.exists(self.path))
+        self.cache.get('missing')
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_get_miss_and_hit(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.put('key', make_result(False, '[{"error": 1}]'))
+
+        result = self.cache.get('key')
+
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.validation_message, '[{"error": 1}]')
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'hit_rate': 0.5})
+
+    def test_least_recently_used_entry_evicted(self):
+        self.cache.put('first', make_result(True))
+        time.sleep(0.01)
+        self.cache.put('second', make_result(True))
+        time.sleep(0.01)
+        self.cache.get('first')
+        time.sleep(0.01)
+        self.cache.put('third', make_result(True))
+
+        self.assertIsNotNone(self.cache.get('first'))
+        self.assertIsNone(self.cache.get('second'))
+        self.assertIsNotNone(self.cache.get('third'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    @patch('src.result_cache.metrics')
+    def test_exports_lookups_and_evictions(self, mock_metrics):
+        self.cache.get('first')
+        for key in ('first', 'second', 'third'):
+            self.cache.put(key, make_result(True))
+        self.cache.get('third')
+
+        self.assertEqual([call.args for call in mock_metrics.record_result_cache_lookup.call_args_list],
+                         [('miss',), ('hit',)])
+        mock_metrics.RESULT_CACHE_EVICTIONS.inc.assert_called_once_with(1)
+
+    def test_entries_persist_across_instances(self):
+        self.cache.put('key', make_result(True))
+        self.cache.close()
+
+        reopened = ResultCache(path=self.path, max_entries=2)
+        try:
+            self.assertTrue(reopened.get('key').is_valid)
+        finally:
+            reopened.close()
+
+    def test_stats_without_lookups(self):
+        self.assertEqual(self.cache.stats()['hit_rate'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
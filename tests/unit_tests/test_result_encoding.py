@@ -0,0 +1,88 @@
+import gzip
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from python_ms_core.core.storage.providers.azure.azure_file_entity import AzureFileEntity
+from src.result_encoding import ResultCompactor, encode_issues
+
+
+def make_issues(count: int) -> list:
+    return [{'filename': 'edges' if index % 2 else 'nodes', 'feature_index': index,
+             'error_message': [f"'highway' is a required property ({index})"]} for index in range(count)]
+
+
+class TestEncodeIssues(unittest.TestCase):
+
+    def test_same_json_as_json_module(self):
+        issues = make_issues(3) + [{'filename': 'Café', 'feature_index': None, 'error_message': 'x'}]
+        self.assertEqual(json.loads(encode_issues(issues)), issues)
+
+    @patch('src.result_encoding.orjson', None)
+    def test_fallback_without_orjson(self):
+        issues = make_issues(3)
+        self.assertEqual(encode_issues(issues), json.dumps(issues, separators=(',', ':')).encode())
+
+
+class TestResultCompactor(unittest.TestCase):
+
+    def setUp(self):
+        self.container = MagicMock()
+        self.container.create_file.return_value.get_remote_url.return_value = 'https://storage/osw/issues.json.gz'
+        self.compactor = ResultCompactor(max_bytes=2048, container=self.container, prefix='validation-issues')
+
+    def test_small_list_is_inline(self):
+        issues = make_issues(2)
+        self.assertEqual(json.loads(self.compactor.compact(issues, key='abc')), issues)
+        self.container.create_file.assert_not_called()
+
+    def test_large_list_is_offloaded(self):
+        issues = make_issues(500)
+
+        message = self.compactor.compact(issues, key='abc')
+
+        self.assertLessEqual(len(message.encode()), 2048)
+        self.container.create_file.assert_called_once_with('validation-issues/abc.json.gz')
+        uploaded = self.container.create_file.return_value.upload.call_args[0][0]
+        self.assertEqual(json.loads(gzip.decompress(uploaded)), issues)
+        shown = json.loads(message)
+        summary = shown.pop()
+        self.assertEqual(shown, issues[:len(shown)])
+        self.assertGreater(len(shown), 0)
+        self.assertEqual(summary['total_issues'], 500)
+        self.assertEqual(summary['issues_per_file'], {'nodes': 250, 'edges': 250})
+        self.assertEqual(summary['issues_url'], 'https://storage/osw/issues.json.gz')
+        self.assertTrue(summary['error_message'].startswith(f'Showing {len(shown)} of 500 issues.'))
+
+    def test_azure_blob_is_overwritten(self):
+        container_client = MagicMock()
+        container_client.upload_blob.return_value.url = 'https://storage/osw/abc.json.gz'
+        self.container.create_file.side_effect = lambda name: AzureFileEntity(name, container_client)
+
+        message = self.compactor.compact(make_issues(500), key='abc')
+
+        name, uploaded = container_client.upload_blob.call_args[0]
+        self.assertEqual(name, 'validation-issues/abc.json.gz')
+        self.assertEqual(len(json.loads(gzip.decompress(uploaded))), 500)
+        self.assertTrue(container_client.upload_blob.call_args[1]['overwrite'])
+        self.assertEqual(json.loads(message)[-1]['issues_url'], 'https://storage/osw/abc.json.gz')
+
+    def test_failed_upload_still_caps_message(self):
+        self.container.create_file.return_value.upload.side_effect = Exception('forbidden')
+
+        message = self.compactor.compact(make_issues(500), key='abc')
+
+        self.assertLessEqual(len(message.encode()), 2048)
+        self.assertIsNone(json.loads(message)[-1]['issues_url'])
+
+    def test_without_storage(self):
+        compactor = ResultCompactor(max_bytes=2048)
+        summary = json.loads(compactor.compact(make_issues(500)))[-1]
+        self.assertEqual(summary['error_message'].split('. ', 1)[1], 'The full list could not be stored')
+
+    def test_no_cap(self):
+        compactor = ResultCompactor(max_bytes=0, container=self.container)
+        self.assertEqual(len(json.loads(compactor.compact(make_issues(500)))), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.runtime_config import RuntimeConfig
+
+
+class TestRuntimeConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_file = os.path.join(self.temp_dir.name, '.env')
+        self.environ = patch.dict(os.environ, {'MAX_ERRORS': '20', 'PERMISSION_CACHE_TTL': '60'})
+        self.environ.start()
+        self.write('MAX_ERRORS=20\n')
+        self.config = RuntimeConfig(env_file=self.env_file, interval=0.05)
+
+    def tearDown(self):
+        self.config.stop_watching()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def write(self, content):
+        with open(self.env_file, 'w') as file:
+            file.write(content)
+
+    def test_reload_applies_changed_values(self):
+        listener = MagicMock()
+        self.config.subscribe(listener)
+        self.write('MAX_ERRORS=50\n')
+
+        changed = self.config.reload()
+
+        self.assertEqual(changed, ['max_errors'])
+        self.assertEqual(self.config.settings.max_errors, 50)
+        self.assertEqual(self.config.version, 2)
+        listener.assert_called_once_with(self.config.settings, ['max_errors'])
+
+    def test_reload_unchanged(self):
+        listener = MagicMock()
+        self.config.subscribe(listener)
+
+        self.assertEqual(self.config.reload(), [])
+        self.assertEqual(self.config.version, 1)
+        listener.assert_not_called()
+
+    def test_reload_keeps_deployment_values_of_unchanged_lines(self):
+        os.environ['MAX_ERRORS'] = '30'
+        self.write('MAX_ERRORS=20\nPERMISSION_CACHE_TTL=5\n')
+
+        changed = self.config.reload()
+
+        self.assertCountEqual(changed, ['max_errors', 'permission_cache_ttl'])
+        self.assertEqual(self.config.settings.max_errors, 30)
+        self.assertEqual(self.config.settings.permission_cache_ttl, 5)
+
+    def test_reload_rejects_invalid_values(self):
+        settings = self.config.settings
+        self.write('MAX_ERRORS=many\n')
+
+        with self.assertRaises(ValueError):
+            self.config.reload()
+
+        self.assertIs(self.config.settings, settings)
+        self.assertEqual(os.environ['MAX_ERRORS'], '20')
+        self.assertEqual(self.config.version, 1)
+
+    def test_unsubscribe(self):
+        listener = MagicMock()
+        self.config.subscribe(listener)
+        self.config.unsubscribe(listener)
+        self.write('MAX_ERRORS=50\n')
+
+        self.config.reload()
+
+        listener.assert_not_called()
+
+    def test_failing_listener_does_not_stop_the_others(self):
+        failing = MagicMock(side_effect=RuntimeError('boom'))
+        listener = MagicMock()
+        self.config.subscribe(failing)
+        self.config.subscribe(listener)
+        self.write('MAX_ERRORS=50\n')
+
+        self.config.reload()
+
+        listener.assert_called_once()
+
+    def test_watch_reloads_when_file_changes(self):
+        self.config.start_watching()
+        time.sleep(0.01)
+        self.write('MAX_ERRORS=70\n')
+        os.utime(self.env_file, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+
+        deadline = time.monotonic() + 5
+        while self.config.settings.max_errors != 70 and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        self.assertEqual(self.config.settings.max_errors, 70)
+
+    def test_watch_disabled_without_interval(self):
+        config = RuntimeConfig(env_file=self.env_file, interval=0)
+        config.start_watching()
+        self.assertIsNone(config._thread)
+
+    def test_missing_file(self):
+        config = RuntimeConfig(env_file=os.path.join(self.temp_dir.name, 'missing.env'))
+        self.assertEqual(config.reload(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
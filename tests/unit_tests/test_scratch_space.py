@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from src.scratch_space import ScratchSpace, ScratchSpaceFull, MB
+
+
+class TestScratchSpace(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, 'scratch')
+        self.scratch = ScratchSpace(root=self.root, quota_bytes=100 * MB, expansion_factor=4, admission_timeout=2)
+
+    def tearDown(self):
+        self.scratch.drain()
+        self.temp_dir.cleanup()
+
+    def test_estimate(self):
+        self.assertEqual(self.scratch.estimate(10 * MB), 50 * MB)
+        self.assertEqual(self.scratch.estimate(10 * MB, in_archive=True), 10 * MB)
+
+    def test_allocate_creates_directory_named_after_process(self):
+        path = self.scratch.allocate()
+
+        self.assertTrue(os.path.isdir(path))
+        self.assertTrue(os.path.basename(path).startswith(f'{os.getpid()}-'))
+        self.assertNotEqual(self.scratch.allocate(), path)
+
+    def test_release_removes_in_background(self):
+        path = self.scratch.allocate()
+        with open(os.path.join(path, 'upload.zip'), 'wb') as file:
+            file.write(b'zip')
+        self.scratch.reserve(path, 1 * MB)
+
+        self.scratch.release(path)
+        self.scratch.drain()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.scratch.stats()['reserved'], 0)
+        self.assertEqual(self.scratch.stats()['directories'], 0)
+
+    def test_release_outside_root_ignored(self):
+        outside = os.path.join(self.temp_dir.name, 'keep.zip')
+        with open(outside, 'wb') as file:
+            file.write(b'zip')
+
+        self.scratch.release(outside)
+        self.scratch.drain()
+
+        self.assertTrue(os.path.exists(outside))
+
+    def test_reserve_waits_for_reclaimed_space(self):
+        first = self.scratch.allocate()
+        self.scratch.reserve(first, 15 * MB)
+        admitted = threading.Event()
+
+        def reserve_second():
+            self.scratch.reserve(self.scratch.allocate(), 10 * MB)
+            admitted.set()
+        threading.Thread(target=reserve_second, daemon=True).start()
+
+        self.assertFalse(admitted.wait(0.1))
+        self.scratch.release(first)
+        self.assertTrue(admitted.wait(2))
+
+    def test_configure_admits_waiting_reservations(self):
+        self.scratch.reserve(self.scratch.allocate(), 15 * MB)
+        admitted = threading.Event()
+
+        def reserve_second():
+            self.scratch.reserve(self.scratch.allocate(), 10 * MB)
+            admitted.set()
+        threading.Thread(target=reserve_second, daemon=True).start()
+
+        self.assertFalse(admitted.wait(0.1))
+        self.scratch.configure(quota_bytes=200 * MB, expansion_factor=4, admission_timeout=2)
+        self.assertTrue(admitted.wait(2))
+
+    def test_reserve_times_out(self):
+        self.scratch.admission_timeout = 0.05
+        self.scratch.reserve(self.scratch.allocate(), 15 * MB)
+
+        with self.assertRaises(ScratchSpaceFull):
+            self.scratch.reserve(self.scratch.allocate(), 10 * MB)
+
+    def test_oversized_and_unknown_reservations_run_alone(self):
+        path = self.scratch.allocate()
+        self.scratch.reserve(path, 500 * MB)
+        self.assertEqual(self.scratch.stats()['reserved'], 2500 * MB)
+        self.scratch.release(path)
+        self.scratch.drain()
+
+        self.scratch.reserve(self.scratch.allocate(), None)
+        self.assertEqual(self.scratch.stats()['reserved'], 100 * MB)
+
+    def test_no_quota_never_waits(self):
+        self.scratch.quota_bytes = 0
+        self.scratch.reserve(self.scratch.allocate(), 500 * MB)
+        self.scratch.reserve(self.scratch.allocate(), 500 * MB)
+        self.assertEqual(self.scratch.stats()['reserved'], 0)
+
+    @patch('src.scratch_space.psutil.pid_exists')
+    def test_sweep_removes_orphans(self, mock_pid_exists):
+        mock_pid_exists.side_effect = lambda pid: pid == 4242
+        allocated = self.scratch.allocate()
+        orphans = [os.path.join(self.root, f'{pid}-{"a" * 24}') for pid in (os.getpid(), 999999)]
+        for orphan in orphans:
+            os.makedirs(orphan)
+        other_process = os.path.join(self.root, f'4242-{"b" * 24}')
+        os.makedirs(other_process)
+
+        self.assertEqual(self.scratch.sweep(), 2)
+
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         sorted([os.path.basename(allocated), os.path.basename(other_process)]))
+
+    @patch('src.scratch_space.psutil.pid_exists', return_value=False)
+    def test_sweep_leaves_other_programs_alone(self, mock_pid_exists):
+        # The root may be a shared mount such as /tmp or /dev/shm
+        others = ['5f1c9a7e0b2d11ee', '999999-crashed', f'999999-{"a" * 23}', f'999999-{"A" * 24}', 'stray.zip']
+        os.makedirs(self.root)
+        for name in others[:-1]:
+            os.makedirs(os.path.join(self.root, name))
+        with open(os.path.join(self.root, 'stray.zip'), 'wb') as file:
+            file.write(b'zip')
+
+        self.assertEqual(self.scratch.sweep(), 0)
+
+        self.assertEqual(sorted(os.listdir(self.root)), sorted(others))
+
+    def test_temp_files_go_under_root(self):
+        previous_tempdir = tempfile.tempdir
+        temp_dir = self.scratch.use_for_temp_files()
+        try:
+            self.assertEqual(os.path.dirname(temp_dir), self.root)
+            self.assertEqual(tempfile.gettempdir(), temp_dir)
+            self.assertEqual(self.scratch.use_for_temp_files(), temp_dir)
+            # Allocated like any other directory, a later process sweeps it after a crash
+            self.assertEqual(self.scratch.sweep(), 0)
+        finally:
+            self.scratch.restore_temp_files()
+
+        self.assertEqual(tempfile.tempdir, previous_tempdir)
+        self.scratch.drain()
+        self.assertFalse(os.path.exists(temp_dir))
+
+    def test_sweep_missing_root(self):
+        self.assertEqual(ScratchSpace(root=os.path.join(self.root, 'missing')).sweep(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,14 @@
+import time
+import tempfile
 import unittest
+import threading
 from unittest.mock import patch, MagicMock
+from python_ms_core.core.queue.models.queue_message import QueueMessage
 from src.osw_validator import OSWValidator
+from src.runtime_config import runtime_config
+from src.in_flight import Draining
+from src.dedup_store import DedupStore
+from src.scratch_space import scratch_space, ScratchSpaceFull
 from src.models.queue_message_content import Upload
 from src.models.queue_message_content import ValidationResult
 
@@ -10,6 +18,15 @@ class TestOSWValidatorService(unittest.TestCase):
     @patch('src.osw_validator.Settings')
     @patch('src.osw_validator.Core')
     def setUp(self, mock_core, mock_settings):
+        # Scratch directories go to a temporary root, never the repository's downloads/
+        scratch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch_dir.cleanup)
+        scratch_root = patch.object(scratch_space, 'root', scratch_dir.name)
+        scratch_root.start()
+        self.addCleanup(scratch_root.stop)
+        self.addCleanup(scratch_space.drain)
+        # OSWValidator points tempfile under the scratch root, put it back before the root goes
+        self.addCleanup(scratch_space.restore_temp_files)
         # Mock Settings
         mock_settings.return_value.event_bus.upload_subscription = 'test_subscription'
         mock_settings.return_value.event_bus.upload_topic = 'test_request_topic'
@@ -22,8 +39,9 @@ class TestOSWValidatorService(unittest.TestCase):
         mock_core.return_value.get_topic.return_value = MagicMock()
         mock_core.return_value.get_storage_client.return_value = MagicMock()
 
-        # Initialize OSWValidator with mocked dependencies
-        self.service = OSWValidator()
+        # Initialize OSWValidator with mocked dependencies, without a dedup store on disk
+        with patch.object(runtime_config.settings, 'dedup_ttl', 0):
+            self.service = OSWValidator()
         self.service.storage_client = MagicMock()
         self.service.container_name = 'test_container'
         self.service.auth = MagicMock()
@@ -54,6 +72,7 @@ class TestOSWValidatorService(unittest.TestCase):
         callback(mock_message)
 
         # Assert
+        mock_request_message.data_from.assert_called_once_with(mock_message)
         self.service.validate.assert_called_once_with(received_message=mock_request_message.data_from())
 
     @patch('src.osw_validator.Validation')
@@ -164,6 +183,290 @@ class TestOSWValidatorService(unittest.TestCase):
         self.assertTrue(actual_result.is_valid)
         self.assertEqual(actual_upload_message, mock_request_message)
 
+    @patch('src.osw_validator.warm_up')
+    @patch('src.osw_validator.ValidationPool')
+    @patch('src.osw_validator.Core')
+    def test_validation_pool_created_when_workers_configured(self, mock_core, mock_validation_pool, mock_warm_up):
+        with patch.object(runtime_config.settings, 'validation_workers', 4), \
+                patch.object(runtime_config.settings, 'validation_max_tasks_per_child', 10):
+            service = OSWValidator()
+
+        mock_validation_pool.assert_called_once_with(max_workers=4, max_tasks_per_child=10, in_archive=False,
+                                                     start_method='forkserver')
+        self.assertEqual(service.validation_pool, mock_validation_pool.return_value)
+        # Workers are started once the parent is warm
+        mock_warm_up.assert_called_once_with(in_archive=False)
+        mock_validation_pool.return_value.start.assert_called_once()
+
+        service.stop_listening()
+        mock_validation_pool.return_value.shutdown.assert_called_once_with(wait=False)
+
+    @patch('src.osw_validator.warm_up')
+    @patch('src.osw_validator.ValidationPool')
+    @patch('src.osw_validator.Core')
+    def test_warm_up_disabled(self, mock_core, mock_validation_pool, mock_warm_up):
+        with patch.object(runtime_config.settings, 'validation_workers', 2), \
+                patch.object(runtime_config.settings, 'warm_up', False):
+            service = OSWValidator()
+
+        mock_warm_up.assert_not_called()
+        mock_validation_pool.return_value.start.assert_not_called()
+        service.stop_listening()
+
+    def test_validation_pool_disabled_by_default(self):
+        self.assertIsNone(self.service.validation_pool)
+
+    @patch('src.osw_validator.Core')
+    def test_pipeline_created_when_prefetch_configured(self, mock_core):
+        with patch.object(runtime_config.settings, 'prefetch_depth', 3), \
+                patch.object(runtime_config.settings, 'validation_concurrency', 0), \
+                patch.object(runtime_config.settings, 'max_concurrent_messages', 2):
+            service = OSWValidator()
+
+        self.assertEqual(service.pipeline.stages['validation'].concurrency, 2)
+        self.assertEqual(service.pipeline.max_in_flight, 5)
+        mock_core.return_value.get_topic.assert_any_call(topic_name=unittest.mock.ANY, max_concurrent_messages=5)
+        service.stop_listening()
+
+    @patch('src.osw_validator.LocalCore')
+    @patch('src.osw_validator.Core')
+    def test_local_transport(self, mock_core, mock_local_core):
+        with patch.object(runtime_config.settings, 'transport', 'local'), \
+                patch.object(runtime_config.settings, 'spool_dir', '/tmp/spool'), \
+                patch.object(runtime_config.settings, 'local_storage_dir', '/tmp/storage'):
+            service = OSWValidator()
+
+        mock_core.assert_not_called()
+        mock_local_core.assert_called_once_with(spool_dir='/tmp/spool', storage_dir='/tmp/storage',
+                                                visibility_timeout=runtime_config.settings.spool_visibility_timeout,
+                                                max_deliveries=runtime_config.settings.spool_max_deliveries)
+        self.assertEqual(service.storage_client, mock_local_core.return_value.get_storage_client.return_value)
+        service.stop_listening()
+
+    @patch('src.osw_validator.Core')
+    def test_memory_budget_created_when_configured(self, mock_core):
+        with patch.object(runtime_config.settings, 'memory_budget_mb', 1024), \
+                patch.object(runtime_config.settings, 'large_file_mb', 100):
+            service = OSWValidator()
+
+        self.assertEqual(service.memory_budget.budget_bytes, 1024 * 1024 * 1024)
+        self.assertEqual(service.memory_budget.large_file_bytes, 100 * 1024 * 1024)
+        service.stop_listening()
+
+    @patch('src.osw_validator.Core')
+    def test_priority_lanes_created_when_configured(self, mock_core):
+        with patch.object(runtime_config.settings, 'priority_lanes', True), \
+                patch.object(runtime_config.settings, 'lane_concurrency', 3), \
+                patch.object(runtime_config.settings, 'interactive_message_types', 'VALIDATION_ONLY, QUICK_CHECK'), \
+                patch.object(runtime_config.settings, 'large_file_mb', 100):
+            service = OSWValidator()
+
+        self.assertEqual(service.priority_lanes.concurrency, 3)
+        self.assertEqual(service.priority_lanes.reserved['interactive'], 1)
+        self.assertEqual(service.priority_lanes.interactive_types, ['VALIDATION_ONLY', 'QUICK_CHECK'])
+        self.assertEqual(service.priority_lanes.bulk_file_bytes, 100 * 1024 * 1024)
+        # One more message is received than validates, for the reserved interactive slot
+        self.assertEqual(service.receive_capacity, 4)
+        service.stop_listening()
+
+    @patch('src.osw_validator.Core')
+    def test_priority_lanes_reserve_on_top_of_max_concurrent_messages(self, mock_core):
+        with patch.object(runtime_config.settings, 'priority_lanes', True), \
+                patch.object(runtime_config.settings, 'lane_concurrency', 0), \
+                patch.object(runtime_config.settings, 'max_concurrent_messages', 2):
+            service = OSWValidator()
+
+        self.assertEqual(service.priority_lanes.concurrency, 3)
+        self.assertEqual(service.priority_lanes.shared, 2)
+        mock_core.return_value.get_topic.assert_any_call(topic_name=unittest.mock.ANY, max_concurrent_messages=4)
+        service.stop_listening()
+
+    @patch('src.osw_validator.Core')
+    def test_priority_lanes_warn_when_they_cannot_reorder(self, mock_core):
+        with patch.object(runtime_config.settings, 'priority_lanes', True), \
+                patch.object(runtime_config.settings, 'lane_concurrency', 2), \
+                patch.object(runtime_config.settings, 'interactive_lane_reserved', 0), \
+                patch.object(runtime_config.settings, 'max_concurrent_messages', 2), \
+                self.assertLogs('OSW_VALIDATOR', level='WARNING') as logs:
+            service = OSWValidator()
+
+        self.assertIn('cannot reorder', logs.output[0])
+        service.stop_listening()
+
+    @patch('src.osw_validator.Validation')
+    def test_validate_waits_for_priority_lane(self, mock_validation):
+        message = Upload.data_from(self.sample_message)
+        message.message_type = 'VALIDATION_ONLY'
+        self.service.priority_lanes = MagicMock()
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.return_value = ValidationResult()
+        mock_validation.return_value.validate.return_value.is_valid = True
+
+        self.service.validate(message)
+
+        self.assertEqual(mock_validation.call_args[1]['priority_lanes'], self.service.priority_lanes)
+        self.assertEqual(mock_validation.call_args[1]['message_type'], 'VALIDATION_ONLY')
+        mock_validation.return_value.lane_admission.return_value.__enter__.assert_called_once()
+
+    @patch('src.osw_validator.Validation')
+    def test_validate_passes_memory_budget(self, mock_validation):
+        mock_request_message = MagicMock()
+        mock_request_message.data.file_upload_path = 'test_dataset_url'
+        self.service.memory_budget = MagicMock()
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.return_value = ValidationResult()
+
+        self.service.validate(mock_request_message)
+
+        self.assertEqual(mock_validation.call_args[1]['memory_budget'], self.service.memory_budget)
+
+    @patch('src.osw_validator.ConcurrencyController')
+    @patch('src.osw_validator.Core')
+    def test_adaptive_concurrency(self, mock_core, mock_controller):
+        with patch.object(runtime_config.settings, 'adaptive_concurrency', True), \
+                patch.object(runtime_config.settings, 'min_concurrent_messages', 1), \
+                patch.object(runtime_config.settings, 'max_concurrent_messages', 6):
+            service = OSWValidator()
+
+        # Messages are received up to the maximum, the limit starts at the minimum
+        mock_core.return_value.get_topic.assert_any_call(topic_name=unittest.mock.ANY, max_concurrent_messages=6)
+        self.assertEqual(service.concurrency_limit.limit, 1)
+        self.assertEqual(service.concurrency_limit.maximum, 6)
+        mock_controller.return_value.start.assert_called_once()
+        service.stop_listening()
+        mock_controller.return_value.stop.assert_called_once()
+
+    def test_apply_config_changes_max_concurrent_messages(self):
+        self.service.receive_capacity = 4
+        self.service.apply_config(MagicMock(max_concurrent_messages=2), ['max_concurrent_messages'])
+        self.assertEqual(self.service.listening_topic.max_concurrent_messages, 2)
+
+        # Capped at what the topic was created for
+        self.service.apply_config(MagicMock(max_concurrent_messages=8), ['max_concurrent_messages'])
+        self.assertEqual(self.service.listening_topic.max_concurrent_messages, 4)
+
+    def test_apply_config_ignored_while_draining(self):
+        self.service.listening_topic.max_concurrent_messages = 0
+        self.service.in_flight.drain(0)
+
+        self.service.apply_config(MagicMock(max_concurrent_messages=2), ['max_concurrent_messages'])
+
+        self.assertEqual(self.service.listening_topic.max_concurrent_messages, 0)
+
+    def test_apply_config_updates_caches(self):
+        self.service.permission_cache = MagicMock(positive_ttl=60, max_entries=1024)
+        settings = MagicMock(permission_cache_ttl='5', permission_cache_size='10', dedup_ttl='3600')
+
+        self.service.apply_config(settings, ['permission_cache_ttl', 'permission_cache_size', 'dedup_ttl'])
+
+        self.assertEqual(self.service.permission_cache.positive_ttl, 5.0)
+        self.assertEqual(self.service.permission_cache.max_entries, 10)
+
+    @patch('src.osw_validator.scratch_space')
+    def test_apply_config_resizes_scratch_space(self, mock_scratch_space):
+        settings = MagicMock(scratch_quota_mb=10, scratch_expansion_factor=5, scratch_admission_timeout=30)
+
+        self.service.apply_config(settings, ['scratch_quota_mb'])
+
+        mock_scratch_space.configure.assert_called_once_with(quota_bytes=10 * 1024 * 1024, expansion_factor=5.0,
+                                                             admission_timeout=30.0)
+
+    @patch('src.osw_validator.runtime_config')
+    @patch('src.osw_validator.Validation')
+    def test_validate_uses_reloaded_max_errors(self, mock_validation, mock_runtime_config):
+        mock_runtime_config.settings.max_errors = 7
+        mock_validation.return_value.validate.return_value = ValidationResult()
+        mock_validation.return_value.validate.return_value.is_valid = True
+        mock_validation.return_value.validate.return_value.validation_message = ''
+        message = Upload.data_from(self.sample_message)
+        message.message_type = 'VALIDATION_ONLY'
+        self.service.send_status = MagicMock()
+
+        self.service.validate(message)
+
+        mock_validation.return_value.validate.assert_called_once_with(max_errors=7)
+
+    @patch('src.osw_validator.Validation')
+    def test_validate_takes_concurrency_slot(self, mock_validation):
+        mock_request_message = MagicMock()
+        mock_request_message.data.file_upload_path = 'test_dataset_url'
+        self.service.concurrency_limit = MagicMock()
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.return_value = ValidationResult()
+
+        self.service.validate(mock_request_message)
+
+        self.service.concurrency_limit.slot.assert_called_once()
+
+    def test_pipeline_disabled_by_default(self):
+        self.assertIsNone(self.service.pipeline)
+
+    @patch('src.osw_validator.Validation')
+    def test_validate_admits_through_pipeline(self, mock_validation):
+        mock_request_message = MagicMock()
+        mock_request_message.data.file_upload_path = 'test_dataset_url'
+        self.service.pipeline = MagicMock()
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.return_value = ValidationResult()
+
+        self.service.validate(mock_request_message)
+
+        self.service.pipeline.admit.assert_called_once()
+        self.assertEqual(mock_validation.call_args[1]['pipeline'], self.service.pipeline)
+
+    def make_dedup_store(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        store = DedupStore(path=f'{temp_dir.name}/dedup.db', ttl=60, max_entries=10)
+        self.addCleanup(store.close)
+        return store
+
+    @patch('src.osw_validator.Validation')
+    def test_redelivered_message_publishes_stored_result(self, mock_validation):
+        self.service.dedup_store = self.make_dedup_store()
+        self.service.send_status = MagicMock()
+        result = ValidationResult()
+        result.is_valid = False
+        result.validation_message = '[{"error_message": "stored"}]'
+        mock_validation.return_value.validate.return_value = result
+        message = Upload.data_from(self.sample_message)
+        message.message_type = 'VALIDATION_ONLY'
+
+        self.service.validate(message)
+        self.service.validate(message)
+
+        mock_validation.return_value.validate.assert_called_once()
+        self.assertEqual(self.service.send_status.call_count, 2)
+        republished = self.service.send_status.call_args[1]['result']
+        self.assertFalse(republished.is_valid)
+        self.assertEqual(republished.validation_message, result.validation_message)
+        self.assertEqual(self.service.dedup_store.stats()['hits'], 1)
+
+    @patch('src.osw_validator.Validation')
+    def test_failed_validation_not_stored(self, mock_validation):
+        self.service.dedup_store = self.make_dedup_store()
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.side_effect = Exception('download failed')
+        message = Upload.data_from(self.sample_message)
+        message.message_type = 'VALIDATION_ONLY'
+
+        self.service.validate(message)
+        self.service.validate(message)
+
+        self.assertEqual(mock_validation.return_value.validate.call_count, 2)
+
+    @patch('src.osw_validator.Validation')
+    def test_scratch_space_full_defers_message(self, mock_validation):
+        self.service.send_status = MagicMock()
+        mock_validation.return_value.validate.side_effect = ScratchSpaceFull('no room')
+        message = Upload.data_from(self.sample_message)
+        message.message_type = 'VALIDATION_ONLY'
+
+        # Raised to the topic so the message is redelivered instead of failed
+        with self.assertRaises(ScratchSpaceFull):
+            self.service.validate(message)
+        self.service.send_status.assert_not_called()
+
     @patch('src.osw_validator.threading.Thread')
     def test_stop_listening(self, mock_thread):
         # Arrange
@@ -179,6 +482,54 @@ class TestOSWValidatorService(unittest.TestCase):
         mock_thread_instance.join.assert_called_once_with(timeout=0)
         self.assertIsNone(result)
 
+    def test_stop_listening_drains_in_flight_messages(self):
+        finished = []
+        started = threading.Event()
+
+        def work():
+            with self.service.in_flight.track('message-1'):
+                started.set()
+                time.sleep(0.1)
+                finished.append('message-1')
+        thread = threading.Thread(target=work)
+        thread.start()
+        started.wait()
+
+        self.service.stop_listening(grace_period=5)
+
+        self.assertEqual(finished, ['message-1'])
+        self.assertEqual(self.service.listening_topic.max_concurrent_messages, 0)
+        thread.join()
+
+    def test_malformed_message_publishes_a_failed_result(self):
+        self.service.validate = MagicMock()
+        self.service.send_status = MagicMock()
+        self.service.start_listening()
+        callback = self.service.listening_topic.subscribe.call_args[1]['callback']
+        message = QueueMessage.data_from(self.sample_message)
+        message.data = {'file_upload_path': 42}
+
+        callback(message)
+
+        self.service.validate.assert_not_called()
+        result = self.service.send_status.call_args[1]['result']
+        upload_message = self.service.send_status.call_args[1]['upload_message']
+        self.assertFalse(result.is_valid)
+        self.assertIn('file_upload_path must be a string', result.validation_message)
+        self.assertEqual(upload_message.message_id, message.messageId)
+        self.assertEqual(upload_message.message_type, message.messageType)
+
+    def test_message_refused_while_draining(self):
+        self.service.validate = MagicMock()
+        self.service.start_listening()
+        callback = self.service.listening_topic.subscribe.call_args[1]['callback']
+        self.service.stop_listening(grace_period=0)
+
+        # The topic abandons the message, another instance picks it up
+        with self.assertRaises(Draining):
+            callback(QueueMessage.data_from(self.sample_message))
+        self.service.validate.assert_not_called()
+
     def test_has_permission_success(self):
         mock_message = Upload(data={
             'data': {
@@ -242,6 +593,26 @@ class TestOSWValidatorService(unittest.TestCase):
         self.assertFalse(result)
         self.service.auth.has_permission.assert_called_once()
 
+    def test_has_permission_uses_cache(self):
+        mock_message = Upload(data={
+            'data': {
+                'user_id': '1233',
+                'tdei_project_group_id': '444444'
+            },
+            'message': 'test_message',
+            'messageType': 'message_type',
+            'messageId': '123'
+        })
+
+        self.service.auth.has_permission = MagicMock()
+        self.service.auth.has_permission.return_value = True
+
+        for roles in (['tdei-admin', 'poc'], ['poc', 'tdei-admin']):
+            self.assertTrue(self.service.has_permission(roles=roles, queue_message=mock_message))
+
+        self.service.auth.has_permission.assert_called_once()
+        self.assertEqual(self.service.permission_cache.stats()['hits'], 1)
+
     def test_send_status_success(self):
         validation_result = ValidationResult()
         validation_result.is_valid = True
@@ -263,6 +634,12 @@ class TestOSWValidatorService(unittest.TestCase):
         self.service.send_status(result=validation_result, upload_message=mock_message)
 
         mock_publish.assert_called_once()
+        published = mock_publish.call_args.kwargs['data']
+        self.assertEqual(published.messageId, '123')
+        self.assertEqual(published.messageType, 'message_type')
+        self.assertTrue(published.data['success'])
+        self.assertEqual(published.data['user_id'], '1233')
+        self.assertIn('package', published.data)
 
     def test_send_status_failure(self):
         validation_result = ValidationResult()
@@ -309,6 +686,45 @@ class TestOSWValidatorService(unittest.TestCase):
 
         mock_publish.assert_called_once()
 
+    @patch('src.osw_validator.metrics')
+    @patch('src.osw_validator.Validation')
+    def test_validate_records_outcome(self, mock_validation, mock_metrics):
+        mock_request_message = MagicMock()
+        mock_request_message.data.file_upload_path = 'test_dataset_url'
+        mock_request_message.message_type = 'VALIDATION_ONLY'
+        mock_validation.return_value.validate.return_value.is_valid = False
+        self.service.send_status = MagicMock()
+
+        self.service.validate(mock_request_message)
+        mock_metrics.record_outcome.assert_called_once_with('invalid')
+
+        mock_metrics.reset_mock()
+        mock_request_message.data.file_upload_path = None
+        self.service.validate(mock_request_message)
+        mock_metrics.record_outcome.assert_called_once_with('error')
+
+    def test_send_status_reuses_publisher_topic(self):
+        validation_result = ValidationResult()
+        validation_result.is_valid = True
+        validation_result.validation_message = ''
+
+        mock_message = Upload(data={
+            'data': {
+                'user_id': '1233',
+                'tdei_project_group_id': '444444'
+            },
+            'message': 'test_message',
+            'messageType': 'message_type',
+            'messageId': '123'
+        })
+        get_topic_calls = self.service.core.get_topic.call_count
+
+        for _ in range(3):
+            self.service.send_status(result=validation_result, upload_message=mock_message)
+
+        self.assertEqual(self.service.core.get_topic.call_count, get_topic_calls)
+        self.assertEqual(self.service.publisher.topic.publish.call_count, 3)
+
     def test_validate_with_unauthorized(self):
         # Arrange
         self.service.has_permission = MagicMock()
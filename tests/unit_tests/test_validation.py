@@ -1,11 +1,17 @@
 import os
 import json
+import hashlib
+import tempfile
 import unittest
 from pathlib import Path
 from src.validation import Validation
+from src.validation_pool import ValidationWorkerError
+from src.precheck import StructuralPrecheck
+from src.scratch_space import scratch_space, ScratchSpaceFull
+from src.result_cache import ResultCache
 from unittest.mock import patch, MagicMock
+from python_ms_core.core.storage.providers.azure.azure_file_entity import AzureFileEntity
 
-DOWNLOAD_FILE_PATH = f'{Path.cwd()}/downloads'
 SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
 
 SUCCESS_FILE_NAME = 'valid.zip'
@@ -23,10 +29,21 @@ WRONG_DATATYPE_FILE_NAME = 'wrong_datatype.zip'
 
 class TestValidation(unittest.TestCase):
 
-    @patch('src.validation.Settings')
-    def setUp(self, mock_settings):
+    @patch('src.validation.runtime_config')
+    def setUp(self, mock_runtime_config):
+        # Scratch directories go to a temporary root, never the repository's downloads/
+        scratch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch_dir.cleanup)
+        scratch_root = patch.object(scratch_space, 'root', scratch_dir.name)
+        scratch_root.start()
+        self.addCleanup(scratch_root.stop)
+        self.addCleanup(scratch_space.drain)
         # Mock Settings and storage client to avoid actual dependencies
-        mock_settings.return_value.event_bus.container_name = 'test_container'
+        mock_runtime_config.settings.event_bus.container_name = 'test_container'
+        mock_runtime_config.settings.validate_in_archive = False
+        mock_runtime_config.settings.precheck_enabled = False
+        mock_runtime_config.settings.result_message_max_bytes = 128 * 1024
+        mock_runtime_config.settings.result_overflow_prefix = 'validation-issues'
 
         self.mock_storage_client = MagicMock()
 
@@ -34,20 +51,14 @@ class TestValidation(unittest.TestCase):
         self.file_path = '/path/to/test.zip'
         self.validation = Validation(file_path=self.file_path, storage_client=self.mock_storage_client)
 
-    @patch('os.makedirs')
-    @patch('os.path.exists', return_value=False)
-    @patch('src.validation.uuid.uuid1')
-    def test_validation_init_creates_unique_dir(self, mock_uuid, mock_exists, mock_makedirs):
-        """Test that the Validation class correctly creates directories."""
-        mock_uuid.return_value.hex = 'fixeduuidhex'
-        unique_id = 'fixeduuidhex'[0:24]
-        expected_dir = os.path.join(Path.cwd(), 'downloads', unique_id)
+    def test_validation_init_creates_unique_dir(self):
+        """Test that every Validation gets its own directory in the scratch space."""
+        other = Validation(file_path=self.file_path, storage_client=self.mock_storage_client)
 
-        # Act by reinitializing to trigger the directory creation
-        self.validation = Validation(file_path=self.file_path, storage_client=self.mock_storage_client)
-
-        # Assert that os.makedirs was called for the unique dir path
-        mock_makedirs.assert_called_with(expected_dir)
+        self.assertTrue(os.path.isdir(self.validation.unique_dir_path))
+        self.assertEqual(os.path.dirname(self.validation.unique_dir_path), scratch_space.root)
+        self.assertNotEqual(other.unique_dir_path, self.validation.unique_dir_path)
+        Validation.clean_up(other.unique_dir_path)
 
     @patch('src.validation.Validation.clean_up')
     @patch('src.validation.Validation.download_single_file')
@@ -146,6 +157,257 @@ class TestValidation(unittest.TestCase):
         # Ensure clean_up is called twice (once for the file, once for the folder)
         self.assertEqual(mock_clean_up.call_count, 1)
 
+    @patch('src.validation.OSWValidation')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_on_validation_pool(self, mock_download_file, mock_clean_up, mock_osw_validation):
+        """Test that validation is delegated to the worker pool when configured."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}'
+        self.validation.validation_pool = MagicMock()
+        self.validation.validation_pool.validate.return_value = (False, [{'filename': 'edges', 'feature_index': 1}])
+
+        result = self.validation.validate(max_errors=10)
+
+        self.validation.validation_pool.validate.assert_called_once_with(f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}', 10)
+        mock_osw_validation.assert_not_called()
+        self.assertFalse(result.is_valid)
+        self.assertEqual(json.loads(result.validation_message), [{'filename': 'edges', 'feature_index': 1}])
+
+    @patch('src.validation.OSWValidation')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_in_archive(self, mock_download_file, mock_clean_up, mock_osw_validation):
+        """Test that archive mode validates the zip without the extracting validator."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}'
+        self.validation.validate_in_archive = True
+
+        result = self.validation.validate(max_errors=10)
+
+        mock_osw_validation.assert_not_called()
+        self.assertFalse(result.is_valid)
+        self.assertNotEqual(len(json.loads(result.validation_message)), 0)
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_admits_by_blob_size(self, mock_download_file, mock_clean_up):
+        """Test that the memory budget is reserved with the blob size before downloading."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.mock_storage_client.get_file_from_url.return_value.blob_client.get_blob_properties.return_value.size = 1234
+        self.validation.memory_budget = MagicMock()
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertTrue(result.is_valid)
+        self.validation.memory_budget.admit.assert_called_once_with(1234)
+        self.validation.memory_budget.admit.return_value.__enter__.assert_called_once()
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_admits_in_priority_lane(self, mock_download_file, mock_clean_up):
+        """Test that the message waits for its priority lane, classified by type and blob size."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.mock_storage_client.get_file_from_url.return_value.blob_client.get_blob_properties.return_value.size = 1234
+        self.validation.priority_lanes = MagicMock()
+        self.validation.priority_lanes.lane.return_value = 'interactive'
+        self.validation.message_type = 'VALIDATION_ONLY'
+        self.validation.published_date = '2024-01-01T00:00:00Z'
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertTrue(result.is_valid)
+        self.validation.priority_lanes.lane.assert_called_once_with('VALIDATION_ONLY', 1234)
+        self.validation.priority_lanes.admit.assert_called_once_with('interactive',
+                                                                     published_date='2024-01-01T00:00:00Z')
+        self.mock_storage_client.get_file_from_url.assert_called_once()
+
+    def test_lane_admission_entered_once(self):
+        """Test that validate() inside a held lane slot does not wait for a second one."""
+        self.validation.priority_lanes = MagicMock()
+
+        with self.validation.lane_admission():
+            with self.validation.lane_admission():
+                pass
+
+        self.validation.priority_lanes.admit.assert_called_once()
+
+    @patch('src.validation.Validation.clean_up')
+    def test_file_looked_up_once(self, mock_clean_up):
+        """Test that sizing and downloading the blob share one lookup of the file."""
+        file_mock = MagicMock()
+        file_mock.file_path = 'test.zip'
+        file_mock.blob_client.get_blob_properties.return_value.size = 1234
+        file_mock.blob_client.download_blob.return_value.read.side_effect = [b'zip', b'']
+        self.mock_storage_client.get_file_from_url.return_value = file_mock
+        self.validation.memory_budget = MagicMock()
+
+        self.assertEqual(self.validation.read_blob_size(), 1234)
+        self.assertIsNotNone(self.validation.download_single_file(self.file_path))
+
+        self.mock_storage_client.get_file_from_url.assert_called_once()
+
+    def test_missing_file_is_not_found(self):
+        """Test that the entity class handed back for a missing blob counts as not found."""
+        self.mock_storage_client.get_file_from_url.return_value = AzureFileEntity
+
+        self.assertIsNone(self.validation.remote_file_size(self.file_path))
+        self.assertIsNone(self.validation.download_single_file(self.file_path))
+
+    def test_remote_file_size_unknown(self):
+        """Test that a blob whose properties cannot be read has an unknown size."""
+        self.mock_storage_client.get_file_from_url.return_value.blob_client.get_blob_properties.side_effect = \
+            Exception('forbidden')
+
+        self.assertIsNone(self.validation.remote_file_size(self.file_path))
+
+    @patch('src.validation.metrics.record_precheck_rejection')
+    @patch('src.validation.Validation.run_validator')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_precheck_short_circuits(self, mock_download_file, mock_clean_up, mock_run_validator, mock_rejection):
+        """Test that an upload failing the pre-check never reaches the full validator."""
+        with tempfile.TemporaryDirectory() as directory:
+            broken_path = os.path.join(directory, 'broken.zip')
+            with open(broken_path, 'wb') as file:
+                file.write(b'not a zip file')
+            mock_download_file.return_value = broken_path
+            self.validation.precheck = StructuralPrecheck()
+
+            result = self.validation.validate(max_errors=10)
+
+        self.assertFalse(result.is_valid)
+        issues = json.loads(result.validation_message)
+        self.assertEqual(issues[0]['error_message'], 'Error extracting ZIP file: File is not a zip file')
+        mock_run_validator.assert_not_called()
+        mock_rejection.assert_called_once_with('corrupt_zip')
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_precheck_passes_valid_zip(self, mock_download_file, mock_clean_up):
+        """Test that a valid upload passes the pre-check and is fully validated."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.validation.precheck = StructuralPrecheck()
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertTrue(result.is_valid)
+
+    @patch('src.validation.Validation.run_validator')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_large_issue_list_is_offloaded(self, mock_download_file, mock_clean_up, mock_run_validator):
+        """Test that issues over the message cap are stored and summarized."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}'
+        issues = [{'filename': 'edges', 'feature_index': index, 'error_message': 'bad'} for index in range(1000)]
+        mock_run_validator.return_value = (False, issues)
+        self.validation.result_compactor.max_bytes = 4096
+        create_file = self.mock_storage_client.get_container.return_value.create_file
+        create_file.return_value.get_remote_url.return_value = 'https://storage/osw/validation-issues/abc.json.gz'
+        self.validation.file_sha256 = 'abc'
+
+        result = self.validation.validate(max_errors=1000)
+
+        self.assertLessEqual(len(result.validation_message), 4096)
+        self.assertEqual(json.loads(result.validation_message)[-1]['total_issues'], 1000)
+        create_file.assert_called_once()
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_worker_crash(self, mock_download_file, mock_clean_up):
+        """Test that a crashed validation worker results in a failed validation."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.validation.validation_pool = MagicMock()
+        self.validation.validation_pool.validate.side_effect = ValidationWorkerError('Validation worker crashed: boom')
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.validation_message, 'Validation worker crashed: boom')
+        self.assertEqual(mock_clean_up.call_count, 2)
+
+    @patch('src.validation.OSWValidation')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_uses_cached_result(self, mock_download_file, mock_clean_up, mock_osw_validation):
+        """Test that a cached result for the same zip hash skips validation."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.validation.file_sha256 = 'abc123'
+        self.validation.result_cache = MagicMock()
+        cached = self.validation.result_cache.get.return_value
+        cached.is_valid = True
+        cached.validation_message = ''
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertIs(result, cached)
+        mock_osw_validation.assert_not_called()
+        self.validation.result_cache.put.assert_not_called()
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_validate_stores_result_in_cache(self, mock_download_file, mock_clean_up):
+        """Test that a validation result is stored in the cache on a miss."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.validation.file_sha256 = 'abc123'
+        self.validation.result_cache = MagicMock()
+        self.validation.result_cache.get.return_value = None
+
+        result = self.validation.validate(max_errors=10)
+
+        self.assertTrue(result.is_valid)
+        key = self.validation.result_cache.get.call_args[0][0]
+        self.assertTrue(key.startswith('abc123:'))
+        self.assertEqual(key, ResultCache.make_key('abc123', 10, self.validation.result_compactor.max_bytes))
+        self.validation.result_cache.put.assert_called_once_with(key, result)
+
+    @patch('src.validation.Validation.run_validator')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_cut_list_not_cached_when_not_stored(self, mock_download_file, mock_clean_up, mock_run_validator):
+        """Test that a list cut to the message cap is not cached when the full list could not be stored."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}'
+        issues = [{'filename': 'edges', 'feature_index': index, 'error_message': 'bad'} for index in range(1000)]
+        mock_run_validator.return_value = (False, issues)
+        self.validation.result_compactor.max_bytes = 4096
+        create_file = self.mock_storage_client.get_container.return_value.create_file
+        create_file.return_value.upload.side_effect = Exception('forbidden')
+        self.validation.file_sha256 = 'abc123'
+        self.validation.result_cache = MagicMock()
+        self.validation.result_cache.get.return_value = None
+
+        result = self.validation.validate(max_errors=1000)
+
+        self.assertIn('could not be stored', result.validation_message)
+        self.validation.result_cache.put.assert_not_called()
+
+    @patch('src.validation.Validation.run_validator')
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_full_list_without_message_cap(self, mock_download_file, mock_clean_up, mock_run_validator):
+        """Test that max_message_bytes=0 keeps every issue, as POST /validate returns them."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{FAILURE_FILE_NAME}'
+        issues = [{'filename': 'edges', 'feature_index': index, 'error_message': 'bad'} for index in range(1000)]
+        mock_run_validator.return_value = (False, issues)
+        validation = Validation(file_path=self.file_path, storage_client=None, max_message_bytes=0)
+
+        result = validation.validate(max_errors=1000)
+
+        self.assertEqual(json.loads(result.validation_message), issues)
+
+    @patch('src.validation.Validation.clean_up')
+    @patch('src.validation.Validation.download_single_file')
+    def test_worker_crash_not_cached(self, mock_download_file, mock_clean_up):
+        """Test that a crashed worker result is never cached."""
+        mock_download_file.return_value = f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}'
+        self.validation.file_sha256 = 'abc123'
+        self.validation.result_cache = MagicMock()
+        self.validation.result_cache.get.return_value = None
+        self.validation.validation_pool = MagicMock()
+        self.validation.validation_pool.validate.side_effect = ValidationWorkerError('Validation worker crashed')
+
+        self.validation.validate(max_errors=10)
+
+        self.validation.result_cache.put.assert_not_called()
+
     @patch('src.validation.Validation.download_single_file')
     def test_validate_unknown_file_format(self, mock_download_file):
         """Test validation failure for unknown file format."""
@@ -164,59 +426,90 @@ class TestValidation(unittest.TestCase):
         self.assertEqual(result.validation_message, 'Failed to validate because unknown file format')
 
     @patch('src.validation.Validation.download_single_file', return_value=f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}')
-    @patch('gc.collect')
-    @patch('shutil.rmtree')
-    @patch('os.remove')
-    def test_gc_collect_called(self, mock_remove, mock_rmtree, mock_gc, mock_download_file):
-        """Test if garbage collection is called."""
-        # Mock the storage client to return a bytes-like stream
-        file_mock = MagicMock()
-        file_mock.get_stream.return_value = b'file content'
-
-        # Replace self.validation.storage_client.get_file_from_url to return the mocked file object
-        self.validation.storage_client.get_file_from_url.return_value = file_mock
-
+    @patch('src.validation.memory_governor')
+    @patch('src.validation.scratch_space')
+    def test_memory_checkpoint_called(self, mock_scratch_space, mock_governor, mock_download_file):
+        """Test that the memory governor is consulted once validation finishes."""
         # Simulate validation process
         self.validation.validate(max_errors=10)
 
-        # Ensure garbage collection is called
-        mock_gc.assert_called()
+        # Ensure the governor decides on garbage collection once per validation
+        mock_governor.checkpoint.assert_called_once()
 
-        # Ensure cleanup methods are called for valid paths
-        mock_remove.assert_called_once_with(f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}')
+        # Ensure the downloaded file and the directory are handed to the scratch space
+        mock_scratch_space.release.assert_any_call(f'{SAVED_FILE_PATH}/{SUCCESS_FILE_NAME}')
+        mock_scratch_space.release.assert_called_with(self.validation.unique_dir_path)
 
-    @patch('os.remove')
-    @patch('os.path.isfile', return_value=True)
-    def test_clean_up_file(self, mock_isfile, mock_remove):
+    def test_clean_up_file(self):
         """Test the static clean_up method with a file path."""
-        # Act
-        Validation.clean_up('/path/to/file.zip')
+        path = os.path.join(self.validation.unique_dir_path, 'file.zip')
+        with open(path, 'wb') as file:
+            file.write(b'zip')
 
-        # Assert that os.remove is called for a file
-        mock_remove.assert_called_once_with('/path/to/file.zip')
+        Validation.clean_up(path)
+        scratch_space.drain()
 
-    @patch('os.remove')
-    @patch('shutil.rmtree')
-    def test_clean_up_directory(self, mock_rmtree, mock_remove):
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.isdir(self.validation.unique_dir_path))
+
+    def test_clean_up_directory(self):
         """Test the static clean_up method with a directory path."""
-        # Act
-        Validation.clean_up('/path/to/directory')
+        with open(os.path.join(self.validation.unique_dir_path, 'file.zip'), 'wb') as file:
+            file.write(b'zip')
 
-        # Assert that shutil.rmtree is called for a directory
-        mock_rmtree.assert_called_once_with('/path/to/directory', ignore_errors=False)
-        mock_remove.assert_not_called()
+        Validation.clean_up(self.validation.unique_dir_path)
+        scratch_space.drain()
 
-    @patch('src.validation.uuid.uuid1')
-    def test_get_unique_id(self, mock_uuid):
-        """Test get_unique_id to ensure correct ID generation."""
-        # Arrange
-        mock_uuid.return_value.hex = 'mockuuidhex'
+        self.assertFalse(os.path.exists(self.validation.unique_dir_path))
 
-        # Act
-        unique_id = self.validation.get_unique_id()
+    @patch('src.validation.Validation.download_single_file')
+    def test_scratch_space_full_is_raised(self, mock_download_file):
+        """Test that a validation without scratch space fails before downloading."""
+        with patch.object(scratch_space, 'reserve', side_effect=ScratchSpaceFull('no room')):
+            with self.assertRaises(ScratchSpaceFull):
+                self.validation.validate(max_errors=10)
+        mock_download_file.assert_not_called()
+
+    def test_download_single_file_streams_in_chunks(self):
+        """Test that blob content is written chunk by chunk and hashed while streaming."""
+        content = os.urandom(10 * 1024 + 7)
+        downloader = MagicMock()
+        reads = [content[i:i + 1024] for i in range(0, len(content), 1024)] + [b'']
+        downloader.read.side_effect = reads
+        file_mock = MagicMock()
+        file_mock.file_path = 'test.zip'
+        file_mock.blob_client.download_blob.return_value = downloader
+        self.validation.storage_client.get_file_from_url.return_value = file_mock
+        self.validation.download_chunk_size = 1024
+
+        downloaded_path = self.validation.download_single_file(self.file_path)
+
+        with open(downloaded_path, 'rb') as downloaded:
+            self.assertEqual(downloaded.read(), content)
+        downloader.read.assert_called_with(1024)
+        self.assertEqual(downloader.read.call_count, len(reads))
+        file_mock.get_stream.assert_not_called()
+        self.assertEqual(self.validation.file_size, len(content))
+        self.assertEqual(self.validation.file_sha256, hashlib.sha256(content).hexdigest())
+        Validation.clean_up(self.validation.unique_dir_path)
+
+    def test_download_single_file_without_streaming_api(self):
+        """Test the fallback for storage providers that only expose get_stream."""
+        file_mock = MagicMock(spec=['file_path', 'get_stream'])
+        file_mock.file_path = 'test.zip'
+        file_mock.get_stream.return_value = b'file content'
+        self.validation.storage_client.get_file_from_url.return_value = file_mock
+        self.validation.download_chunk_size = 5
+
+        chunks = [bytes(chunk) for chunk in Validation.iter_file_chunks(file_mock, 5)]
+        downloaded_path = self.validation.download_single_file(self.file_path)
 
-        # Assert that the unique ID is generated as expected
-        self.assertEqual(unique_id, 'mockuuidhex'[0:24])
+        self.assertEqual(chunks, [b'file ', b'conte', b'nt'])
+        with open(downloaded_path, 'rb') as downloaded:
+            self.assertEqual(downloaded.read(), b'file content')
+        self.assertEqual(self.validation.file_size, 12)
+        self.assertEqual(self.validation.file_sha256, hashlib.sha256(b'file content').hexdigest())
+        Validation.clean_up(self.validation.unique_dir_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+import multiprocessing
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from src.validation_pool import FORKSERVER_PRELOAD, ValidationPool, ValidationWorkerError, run_validation, \
+    run_validation_in_worker, warm_up
+
+SAVED_FILE_PATH = f'{Path.cwd()}/tests/unit_tests/test_files'
+
+
+class TestValidationPool(unittest.TestCase):
+
+    def test_run_validation_returns_picklable_result(self):
+        is_valid, issues = run_validation(f'{SAVED_FILE_PATH}/valid.zip', 10)
+        self.assertTrue(is_valid)
+        self.assertIsInstance(issues, list)
+
+    def test_run_validation_in_archive(self):
+        self.assertEqual(run_validation(f'{SAVED_FILE_PATH}/invalid.zip', 10, in_archive=True),
+                         run_validation(f'{SAVED_FILE_PATH}/invalid.zip', 10))
+
+    def test_worker_extracts_into_message_directory(self):
+        extracted = []
+
+        def mkdtemp():
+            extracted.append(original_mkdtemp())
+            return extracted[-1]
+
+        original_mkdtemp = tempfile.mkdtemp
+        previous_tempdir = tempfile.tempdir
+        with tempfile.TemporaryDirectory() as directory:
+            zipfile_path = shutil.copy(f'{SAVED_FILE_PATH}/valid.zip', directory)
+            with patch('python_osw_validation.zipfile_handler.tempfile.mkdtemp', side_effect=mkdtemp):
+                is_valid, _ = run_validation_in_worker(zipfile_path, 10)
+
+        self.assertTrue(is_valid)
+        self.assertEqual(len(extracted), 1)
+        self.assertEqual(os.path.dirname(extracted[0]), directory)
+        self.assertEqual(tempfile.tempdir, previous_tempdir)
+
+    def test_validate_in_worker_process(self):
+        pool = ValidationPool(max_workers=1)
+        try:
+            is_valid, issues = pool.validate(f'{SAVED_FILE_PATH}/invalid.zip', 10)
+        finally:
+            pool.shutdown()
+        self.assertFalse(is_valid)
+        self.assertNotEqual(len(issues), 0)
+
+    def test_warm_up_validates_bundled_fixture(self):
+        self.assertIsNotNone(warm_up())
+        self.assertIsNotNone(warm_up(in_archive=True))
+
+    def test_warm_up_failure_does_not_raise(self):
+        self.assertIsNone(warm_up(fixture=f'{SAVED_FILE_PATH}/missing.zip'))
+
+    def test_start_forks_every_worker(self):
+        pool = ValidationPool(max_workers=2)
+        try:
+            pool.start()
+            self.assertEqual(len(pool._executor._processes), 2)
+            self.assertEqual(pool._submitted, 0)
+            is_valid, _ = pool.validate(f'{SAVED_FILE_PATH}/valid.zip', 10)
+        finally:
+            pool.shutdown()
+        self.assertTrue(is_valid)
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_workers_warm_up_without_fork(self, mock_executor_cls):
+        ValidationPool(max_workers=1, in_archive=True, start_method='spawn').start()
+        kwargs = mock_executor_cls.call_args.kwargs
+        self.assertIs(kwargs['initializer'], warm_up)
+        self.assertEqual(kwargs['initargs'], (True,))
+
+        ValidationPool(max_workers=1, start_method='fork').start()
+        self.assertNotIn('initializer', mock_executor_cls.call_args.kwargs)
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_workers_come_from_preloaded_fork_server(self, mock_executor_cls):
+        context = multiprocessing.get_context('forkserver')
+        with patch.object(context, 'set_forkserver_preload') as mock_preload:
+            pool = ValidationPool(max_workers=1)
+        mock_preload.assert_called_once_with(FORKSERVER_PRELOAD)
+        self.assertIn('src.validation_pool', FORKSERVER_PRELOAD)
+
+        # Recycled workers come from the fork server as well, never from this threaded process
+        pool.max_tasks_per_child = 1
+        mock_executor_cls.return_value.submit.return_value.result.return_value = (True, [])
+        for _ in range(2):
+            pool.validate('/path/to/test.zip', 10)
+        self.assertEqual(mock_executor_cls.call_count, 2)
+        for call in mock_executor_cls.call_args_list:
+            self.assertIs(call.kwargs['mp_context'], context)
+            self.assertIs(call.kwargs['initializer'], warm_up)
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_worker_crash_raises_and_replaces_executor(self, mock_executor_cls):
+        broken_executor = MagicMock()
+        broken_executor.submit.return_value.result.side_effect = BrokenProcessPool('worker died')
+        healthy_executor = MagicMock()
+        healthy_executor.submit.return_value.result.return_value = (True, [])
+        mock_executor_cls.side_effect = [broken_executor, healthy_executor]
+        pool = ValidationPool(max_workers=2)
+
+        with self.assertRaises(ValidationWorkerError):
+            pool.validate('/path/to/test.zip', 10)
+        broken_executor.shutdown.assert_called_once_with(wait=False)
+
+        self.assertEqual(pool.validate('/path/to/test.zip', 10), (True, []))
+        self.assertEqual(mock_executor_cls.call_count, 2)
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_workers_recycled_after_max_tasks_per_child(self, mock_executor_cls):
+        first, second = MagicMock(), MagicMock()
+        first.submit.return_value.result.return_value = (True, [])
+        second.submit.return_value.result.return_value = (True, [])
+        mock_executor_cls.side_effect = [first, second]
+        pool = ValidationPool(max_workers=2, max_tasks_per_child=2)
+
+        for _ in range(5):
+            pool.validate('/path/to/test.zip', 10)
+
+        self.assertEqual(first.submit.call_count, 4)
+        first.shutdown.assert_called_once_with(wait=False)
+        self.assertEqual(second.submit.call_count, 1)
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_recycling_never_shuts_down_an_executor_in_use(self, mock_executor_cls):
+        class Executor:
+            def __init__(self, **_):
+                self.is_shutdown = False
+
+            def submit(self, fn, *args):
+                # Lets another thread run between taking the executor and submitting to it
+                time.sleep(0.0005)
+                if self.is_shutdown:
+                    raise RuntimeError('cannot schedule new futures after shutdown')
+                future = Future()
+                future.set_result((True, []))
+                return future
+
+            def shutdown(self, wait=True):
+                self.is_shutdown = True
+        mock_executor_cls.side_effect = Executor
+        pool = ValidationPool(max_workers=2, max_tasks_per_child=1)
+        errors = []
+
+        def validate_many():
+            for _ in range(25):
+                try:
+                    pool.validate('/path/to/test.zip', 10)
+                except Exception as e:
+                    errors.append(e)
+        threads = [threading.Thread(target=validate_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_no_recycling_by_default(self, mock_executor_cls):
+        mock_executor_cls.return_value.submit.return_value.result.return_value = (True, [])
+        pool = ValidationPool(max_workers=1)
+
+        for _ in range(10):
+            pool.validate('/path/to/test.zip', 10)
+
+        mock_executor_cls.assert_called_once()
+
+    @patch('src.validation_pool.ProcessPoolExecutor')
+    def test_shutdown(self, mock_executor_cls):
+        mock_executor_cls.return_value.submit.return_value.result.return_value = (True, [])
+        pool = ValidationPool(max_workers=1)
+        pool.validate('/path/to/test.zip', 10)
+
+        pool.shutdown(wait=False)
+
+        mock_executor_cls.return_value.shutdown.assert_called_once_with(wait=False)
+
+
+if __name__ == '__main__':
+    unittest.main()